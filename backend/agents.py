@@ -3,22 +3,29 @@
 # 2. Financial Report Agent - get_company_financials_tool - Read past financial data for a company and answer questions accordingly
 # 3. Company Background Agent - get_company_background_information_tool - Read past company background information and answer questions accordingly
 # 4. Upstox Trading Agent - view_upstox_account_balance_tool, place_upstox_order_tool, get_live_market_price_tool - Make Trades on the Upstox platform on behalf of the user
+# 5. Screening Agent - screen_companies_tool - Compare, filter and rank all NIFTY 50 companies on their financials
 
 from llm_calls import query_gemini, query_open_ai
 import sys
 from datetime import datetime, timedelta
 import json
 import os
+import time
 
 from tools import (
     get_stock_price_range_tool,
     get_company_financials_tool,
     get_company_background_information_tool,
+    screen_companies_tool,
     view_upstox_account_balance_tool,
     place_upstox_order_tool,
     get_live_market_price_tool
 )
 
+from conversation_store import get_conversation_store
+from date_ranges import MAX_DATE, MIN_DATE, parse_date_range
+from financial_screener import METRICS
+from intent_router import LOCAL_ROUTING, log_decision, route_query
 from templates import INSTRUMENT_KEYS
 from fingreat import to_json
 
@@ -53,6 +60,20 @@ TOOL_DESCRIPTIONS = {
         },
         "returns": "A summary of all the background information of the company."
     },
+    "screen_companies_tool": {
+        "description": "Filters and ranks all NIFTY 50 companies on derived financial metrics in one pass.",
+        "parameters": {
+            "filters": "List of conditions '<metric> <op> <number>' with op one of >, >=, <, <=, ==, != (e.g. ['roe_last >= 15']).",
+            "sort_by": "Metric to rank by.",
+            "descending": "true to rank highest first (default), false for lowest first.",
+            "limit": "Maximum number of companies to return (default 10).",
+            "sector": "Optional sector or industry keyword, e.g. 'bank', 'IT', 'pharma'.",
+            "tickers": "Optional list of tickers to restrict the screen to.",
+            "columns": "Optional list of extra metrics to show."
+        },
+        "metrics": METRICS,
+        "returns": "A compact table with one row per matching company (ticker, latest quarter, requested metrics)."
+    },
     "view_upstox_account_balance_tool": {
         "description": "Returns the available funds for buying stocks/equity from the Upstox trading account.",
         "parameters": {},
@@ -110,6 +131,32 @@ Here is the company background:
 Be very consice and to the point. Do not add any extra information. Answer in a paragraph.
 """
 
+SCREENING_SYSTEM_PROMPT = f"""
+You are a financial screening assistant for the NIFTY 50 companies. Turn the user's question into arguments for this tool:
+
+screen_companies_tool: {json.dumps(TOOL_DESCRIPTIONS["screen_companies_tool"])}
+
+Respond ONLY with JSON in this format, leaving out the arguments you don't need:
+{{
+  "filters": ["<metric> <op> <number>"],
+  "sort_by": "<metric>",
+  "descending": true,
+  "limit": 10,
+  "sector": "<sector keyword>",
+  "tickers": ["<ticker>"]
+}}
+Use only the metric names listed above.
+"""
+
+SCREENING_ANSWER_PROMPT = """You are a financial expert AI. Answer the user's question about NIFTY 50 companies using this screening result:
+
+{screen_table}
+
+Metrics: {metrics}
+
+Be very consice and to the point. Do not add any extra information. Answer in a paragraph. All amounts are in Cr Rupees.
+"""
+
 TRADING_SYSTEM_PROMPT = f"""
 You are a highly reliable Upstox trading assistant.
 
@@ -148,26 +195,23 @@ In case you need it, here are the company name to instrument keys mappings: {INS
 """
 
 # ----------------------------------------------
-# Global Per-Agent Conversation Store (Per User)
+# Per-Agent Conversation Store (Per User), see conversation_store.py
 # ----------------------------------------------
 
-user_conversations = {
-    "stock_agent": {},
-    "financial_agent": {},
-    "background_agent": {},
-    "trading_agent": {},
-    "master_agent": {}
-}
+AGENT_CONVERSATIONS = ("stock_agent", "financial_agent", "background_agent", "trading_agent", "screening_agent", "master_agent")
+# The OHLC prompt the stock agent answers follow-ups from
+STOCK_DATA_CONTEXT = "stock_data"
+
+conversations = get_conversation_store()
+
+def conversation_text(user_id, agent_type):
+    return "\n".join([f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conversations.history(user_id, agent_type)])
 
 
 # ----------------------------------------------
 # Agent 1: Stock Price Agent
 # ----------------------------------------------
 
-MIN_DATE = "2003-01-01"
-MAX_DATE = "2025-04-28"
-last_stock_data_context = {}  # Stores last data context per user
-
 def check_if_data_required(query, company_name, existing_start=None, existing_end=None):
     existing_range_str = (
         f"We already have stock price data for {company_name} from {existing_start} to {existing_end}."
@@ -197,6 +241,11 @@ def check_if_data_required(query, company_name, existing_start=None, existing_en
 
 
 def infer_date_range_from_query(query):
+    # "last 3 months", "in 2022", ... are resolved locally; only the rest needs the LLM
+    date_range = parse_date_range(query)
+    if date_range is not None:
+        return date_range.start, date_range.end
+
     system_prompt = f"""
     You are an intelligent assistant helping extract date ranges for stock price analysis.
     Given a user query, infer a suitable `start_date` and `end_date` for analysis based on user intent.
@@ -239,9 +288,8 @@ def extract_dates_from_prompt(prompt):
     return None, None
 
 def stock_price_agent(user_id, company_name, query):
-    conv = user_conversations["stock_agent"].setdefault(user_id, [])
-    conv.append({"user": query})
-    existing_context = last_stock_data_context.get(user_id, "")
+    turn = conversations.add_turn(user_id, "stock_agent", query)
+    existing_context = conversations.get_context(user_id, STOCK_DATA_CONTEXT, "")
     existing_start, existing_end = extract_dates_from_prompt(existing_context)  # Your utility to pull from the stored string
 
     # needs_data = check_if_data_required(query, company_name, existing_start, existing_end)
@@ -253,29 +301,28 @@ def stock_price_agent(user_id, company_name, query):
         start_date, end_date = infer_date_range_from_query(query)
         df = get_stock_price_range_tool(company_name, start_date, end_date)
         if df.empty:
-            conv[-1]["assistant"] = f"No stock data found for {company_name} between {start_date} and {end_date}."
-            return conv[-1]["assistant"]
+            result = f"No stock data found for {company_name} between {start_date} and {end_date}."
+            conversations.set_reply(user_id, "stock_agent", turn, result)
+            return result
 
         ohlc_str = df.to_string(index=False)
-        last_stock_data_context[user_id] = STOCK_ANALYSIS_SYSTEM_PROMPT.format(
+        stock_data_context = STOCK_ANALYSIS_SYSTEM_PROMPT.format(
             company=company_name,
             start_date=start_date,
             end_date=end_date,
             ohlc_data=ohlc_str
         )
+        conversations.set_context(user_id, STOCK_DATA_CONTEXT, stock_data_context)
         # Isolate query to be processed freshly
-        conversation_text = f"User: {query}"
-        result = query_gemini(system_prompt=last_stock_data_context[user_id], prompts=conversation_text)
+        result = query_gemini(system_prompt=stock_data_context, prompts=f"User: {query}")
 
     else:
         # Use old context if exists (for follow-ups)
         # print("No data required!!")
-        # print("prior context:", last_stock_data_context)
-        prior_context = last_stock_data_context.get(user_id, "")
-        conversation_text = "\n".join([f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conv])
-        result = query_gemini(system_prompt=prior_context, prompts=conversation_text)
+        # print("prior context:", existing_context)
+        result = query_gemini(system_prompt=existing_context, prompts=conversation_text(user_id, "stock_agent"))
 
-    conv[-1]["assistant"] = result
+    conversations.set_reply(user_id, "stock_agent", turn, result)
     # save_conversation_to_file(user_id, "stock_agent", conv)
     return result
 
@@ -290,12 +337,9 @@ def financial_metrics_agent(user_id, company_name, query):
 
     system_prompt = FINANCIALS_SYSTEM_PROMPT.format(company=company_name, financial_report=report)
 
-    conv = user_conversations["financial_agent"].setdefault(user_id, [])
-    conv.append({"user": query})
-    conversation_text = "\n".join([f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conv])
-
-    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text)
-    conv[-1]["assistant"] = result
+    turn = conversations.add_turn(user_id, "financial_agent", query)
+    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text(user_id, "financial_agent"))
+    conversations.set_reply(user_id, "financial_agent", turn, result)
     return result
 
 # ----------------------------------------------
@@ -309,12 +353,9 @@ def company_background_agent(user_id, company_name, query):
 
     system_prompt = BACKGROUND_SYSTEM_PROMPT.format(company=company_name, company_background=summary)
 
-    conv = user_conversations["background_agent"].setdefault(user_id, [])
-    conv.append({"user": query})
-    conversation_text = "\n".join([f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conv])
-
-    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text)
-    conv[-1]["assistant"] = result
+    turn = conversations.add_turn(user_id, "background_agent", query)
+    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text(user_id, "background_agent"))
+    conversations.set_reply(user_id, "background_agent", turn, result)
     return result
 
 # ----------------------------------------------
@@ -329,26 +370,21 @@ def trading_agent(user_id, query, company=None):
     # )
 
     # Maintain the conversation history.
-    conv = user_conversations["trading_agent"].setdefault(user_id, [])
-    conv.append({"user": query})
+    turn = conversations.add_turn(user_id, "trading_agent", query)
 
     # Loop until the agent response does not ask for a function call.
     while True:
         # print("Conversations")
-        # print(conv)
+        # print(conversations.history(user_id, "trading_agent"))
 
-        conversation_text = "\n".join(
-            [f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conv]
-        )
-        
         # Query Gemini with the current system prompt and conversation history.
-        agent_reply = query_gemini(system_prompt=TRADING_SYSTEM_PROMPT, prompts=conversation_text)
+        agent_reply = query_gemini(system_prompt=TRADING_SYSTEM_PROMPT, prompts=conversation_text(user_id, "trading_agent"))
 
         try:
             agent_json = to_json(agent_reply)
         except Exception as e:
             # If JSON parsing fails, add the plain response and exit the loop.
-            conv[-1]["assistant"] = agent_reply
+            conversations.set_reply(user_id, "trading_agent", turn, agent_reply)
             return agent_reply
 
         function_name = agent_json.get("function")
@@ -357,7 +393,7 @@ def trading_agent(user_id, query, company=None):
         print("Calling function:", function_name, response_text)
 
         # Record the assistant's response.
-        conv[-1]["assistant"] = response_text
+        conversations.set_reply(user_id, "trading_agent", turn, response_text)
 
         if function_name in TOOL_DESCRIPTIONS.keys():
             # If Gemini indicates a tool should be called, prepare the arguments.
@@ -372,7 +408,7 @@ def trading_agent(user_id, query, company=None):
                 print(f"Error: {e}")
 
             # Append the result of the tool call to the conversation.
-            conv.append({"user": f"The tool {function_name} returned: {tool_result}. Please summarize the result to the user. Can we reply to the user now or do we need have to make some more tool calls?"})
+            turn = conversations.add_turn(user_id, "trading_agent", f"The tool {function_name} returned: {tool_result}. Please summarize the result to the user. Can we reply to the user now or do we need have to make some more tool calls?")
         else:
             # No tool is being called, so break out of the loop.
             break
@@ -391,6 +427,39 @@ def call_trading_tools(name, args):
     else:
         return f"Unknown tool: {name}"
     
+# ----------------------------------------------
+# Agent 5: Screening Agent
+# ----------------------------------------------
+
+SCREENING_ARGUMENTS = ("filters", "sort_by", "descending", "limit", "sector", "tickers", "columns")
+
+def parse_screening_arguments(answer):
+    """screen_companies_tool arguments from the LLM answer; ValueError if it holds no JSON object.
+    Not fingreat.to_json, which exits the process on a bad answer."""
+    arguments = json.loads(answer[answer.find("{"):answer.rfind("}") + 1])
+    if not isinstance(arguments, dict):
+        raise ValueError(f"expected a JSON object, got {answer!r}")
+    return {key: value for key, value in arguments.items() if key in SCREENING_ARGUMENTS and value not in (None, "", [])}
+
+
+def screening_agent(user_id, query):
+    turn = conversations.add_turn(user_id, "screening_agent", query)
+
+    try:
+        arguments = parse_screening_arguments(query_gemini(query, system_prompt=SCREENING_SYSTEM_PROMPT))
+        print("Screening with:", arguments)
+        screen_table = screen_companies_tool(**arguments)
+    except (ValueError, TypeError) as e:
+        screen_table = f"The screen could not be run: {e}"
+
+    used = [column for column in screen_table.splitlines()[0].split(" | ") if column in METRICS]
+    system_prompt = SCREENING_ANSWER_PROMPT.format(
+        screen_table=screen_table, metrics={metric: METRICS[metric] for metric in used}
+    )
+    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text(user_id, "screening_agent"))
+    conversations.set_reply(user_id, "screening_agent", turn, result)
+    return result
+
 def call_agent(user_id, agent_type, query, company=None):
     if agent_type == "stock_price_agent":
         return stock_price_agent(user_id, company, query)
@@ -400,12 +469,16 @@ def call_agent(user_id, agent_type, query, company=None):
         return company_background_agent(user_id, company, query)
     elif agent_type == "trading_agent":
         return trading_agent(user_id, query, company=company)
+    elif agent_type == "screening_agent":
+        return screening_agent(user_id, query)
     else:
         return f"Unknown agent type: {agent_type}"
 
 
 def get_conversation_history(user_id, agent_type):
-    return user_conversations.get(agent_type, {}).get(user_id, [])
+    if agent_type not in AGENT_CONVERSATIONS:
+        return []
+    return conversations.history(user_id, agent_type)
 
 
 MASTER_AGENT_PROMPT = """
@@ -417,6 +490,7 @@ MASTER_AGENT_PROMPT = """
     2. Financial Report Agent - Read past financial data for a company and answer questions accordingly
     3. Company Background Agent - Read past company background information and answer questions accordingly
     4. Upstox Trading Agent - Handles tasks related to viewing the LIVE MARKET PRICE of a company and making trades/view account details on the Upstox platform on behalf of the user
+    5. Screening Agent - Compares, filters and ranks all NIFTY 50 companies on their financials (growth, margins, ROE, ...), for questions about more than one company
 
     Always respond in this JSON format:
     {{
@@ -428,7 +502,7 @@ MASTER_AGENT_PROMPT = """
     If you are delegating to a specific agent, include the agent name. Otherwise leave it blank.
     response_to_agent field is the query which will be sent to the agent.
     response_to_user field is the response you will give to the user if you are not delegating to any agent.
-    Agent names are: stock_price_agent, financial_metrics_agent, company_background_agent, trading_agent. These agent names should only be used in agent field.
+    Agent names are: stock_price_agent, financial_metrics_agent, company_background_agent, trading_agent, screening_agent. These agent names should only be used in agent field.
     
     NOTE:
     1. IF YOU ARE DELEGATING TO AN AGENT, THEN response_to_user FIELD DOESN'T NEED TO BE FILLED, LEAVE IT BLANK. ONLY ADD SOME VALUE IN IT IF YOU ARE NOT DELEGATING TO AN AGENT.
@@ -436,10 +510,7 @@ MASTER_AGENT_PROMPT = """
 """
 
 def master_agent(user_id, query, news = None, movement_prediction=None, explanation=None, company=None):
-    conv = user_conversations["master_agent"].setdefault(user_id, [])
-    conv.append({"user": query})
-
-    conversation_text = "\n".join([f"User: {c['user']}\nAssistant: {c.get('assistant', '')}" for c in conv])
+    turn = conversations.add_turn(user_id, "master_agent", query)
 
     additional_prompt = ""
     if news and movement_prediction and explanation:
@@ -450,11 +521,29 @@ def master_agent(user_id, query, news = None, movement_prediction=None, explanat
         You can use this information to better answer the user's query or to delegate to the right agent with this extra information.
         """
 
+    # Confident cases skip the routing LLM call, see intent_router.py. With news context
+    # the LLM may answer from it directly, so it always decides then.
+    route = None
+    if LOCAL_ROUTING and not additional_prompt:
+        started = time.perf_counter()
+        route = route_query(query)
+        if route.local:
+            log_decision(query, route.agent, "local", route, (time.perf_counter() - started) * 1000)
+            print(f"Master Agent routed locally to {route.agent} (score {route.score:.2f}, margin {route.margin:.2f})")
+            try:
+                result = call_agent(user_id, route.agent, query, company)
+            except Exception as e:
+                result = f"Error processing query: {str(e)}"
+            conversations.set_reply(user_id, "master_agent", turn, result)
+            return result
+
     system_prompt = MASTER_AGENT_PROMPT + additional_prompt
 
     # print("Master Agent System Prompt:", system_prompt)
 
-    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text)
+    started = time.perf_counter()
+    result = query_gemini(system_prompt=system_prompt, prompts=conversation_text(user_id, "master_agent"))
+    routing_ms = (time.perf_counter() - started) * 1000
 
     print("Master Agent Result:", result)
 
@@ -463,27 +552,27 @@ def master_agent(user_id, query, news = None, movement_prediction=None, explanat
         agent_name = result_json.get("agent")
         response_to_agent = result_json.get("response_to_agent", "")
         response_to_user = result_json.get("response_to_user", "")
+        log_decision(query, agent_name, "llm", route, routing_ms)
 
         if agent_name:
             result = call_agent(user_id, agent_name, response_to_agent, company)
-            conv[-1]["assistant"] = result
+            conversations.set_reply(user_id, "master_agent", turn, result)
             return result
         else:
-            conv[-1]["assistant"] = response_to_user
+            conversations.set_reply(user_id, "master_agent", turn, response_to_user)
             return response_to_user
 
     except Exception as e:
-        conv[-1]["assistant"] = f"Error processing query: {str(e)}"
+        conversations.set_reply(user_id, "master_agent", turn, f"Error processing query: {str(e)}")
         return f"Error processing query: {str(e)}"
 
 
 def clear_conversation_history(user_id, agent_type):
     if agent_type == "master_agent":
-        for agent in user_conversations:
-            user_conversations[agent].pop(user_id, None)
+        conversations.clear(user_id)
         return
-    if agent_type in user_conversations:
-        user_conversations[agent_type].pop(user_id, None)
+    if agent_type in AGENT_CONVERSATIONS:
+        conversations.clear(user_id, agent_type, contexts=[STOCK_DATA_CONTEXT] if agent_type == "stock_agent" else ())
     else:
         print(f"Agent type {agent_type} not found.")
 
@@ -0,0 +1,250 @@
+# ASGI entry point, run with: uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+#
+# Serves the same routes as app.py. Streams are driven by the event loop, so a client
+# waiting on /process_news or /jobs/<id>/events no longer pins a server thread between
+# stages; only the blocking pipeline steps borrow a thread from the shared pool.
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+import anyio
+from dotenv import load_dotenv
+load_dotenv()
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from fetch_latest_price_for_csv import fetch_price_for_company
+from jobs import FAILED, QueueFullError, job_manager
+from market_feed import fetch_market_data_loop, market_data
+from warmup import NotReadyError, warmup
+
+# Upper bound on blocking pipeline steps running at the same time
+ASGI_THREADPOOL_SIZE = int(os.getenv("ASGI_THREADPOOL_SIZE", "64"))
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+
+@asynccontextmanager
+async def lifespan(app):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ASGI_THREADPOOL_SIZE
+    # Heavy modules and the FAISS index load in the background, see warmup.py
+    warmup.start()
+    job_manager.start()
+    # The market feed shares the server's event loop instead of a private one
+    market_feed_task = asyncio.create_task(fetch_market_data_loop())
+    try:
+        yield
+    finally:
+        market_feed_task.cancel()
+
+
+async def get_market_prices(request):
+    return JSONResponse(market_data)
+
+
+async def get_symbol_price(request):
+    symbol = request.path_params["symbol"].upper()
+    if symbol in market_data:
+        return JSONResponse(market_data[symbol])
+    return JSONResponse({"error": "Symbol not found"}, status_code=404)
+
+
+async def handle_not_ready(request, exc):
+    return JSONResponse(
+        {"error": f"Server is still starting up ({exc})", "resources": warmup.status()["resources"]},
+        status_code=503, headers={"Retry-After": "5"},
+    )
+
+
+async def healthz(request):
+    return JSONResponse(dict(warmup.status(), status="ok"))
+
+
+async def readyz(request):
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+async def get_metrics(request):
+    # Imported here so numpy and the cache files are not loaded before the server can answer
+    from company_summaries import summary_cache_stats
+    from financial_analysis import analysis_cache_stats
+    metrics = {"jobs": job_manager.stats(), "startup": warmup.status(), "company_summaries": summary_cache_stats(),
+               "financial_analyses": analysis_cache_stats()}
+    if warmup.is_ready("similarity_search"):
+        metrics["embedding_cache"] = warmup.get("similarity_search").embedding_cache_stats()
+    return JSONResponse(metrics)
+
+
+async def process_news(request):
+    news_pipeline = warmup.get("news_pipeline")
+    warmup.get("similarity_search")
+    data = await request.json()
+    news_article, company_ticker, date_of_publish = news_pipeline.parse_news_request(data)
+    include_trace = request.query_params.get("trace") == "1"
+
+    async def generate():
+        async for event in iterate_in_threadpool(news_pipeline.run_news_pipeline(news_article, company_ticker, date_of_publish, include_trace=include_trace)):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+async def submit_news_job(request):
+    news_pipeline = warmup.get("news_pipeline")
+    data = await request.json()
+    try:
+        news_article, company_ticker, date_of_publish = news_pipeline.parse_news_request(data)
+    except (KeyError, TypeError):
+        return JSONResponse({"error": "Please send news_article, company_ticker and date_of_publish"}, status_code=400)
+
+    try:
+        job = job_manager.submit(news_pipeline.run_news_pipeline, news_article, company_ticker, date_of_publish, include_trace=request.query_params.get("trace") == "1")
+    except QueueFullError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "30"})
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+async def get_jobs_stats(request):
+    return JSONResponse(job_manager.stats())
+
+
+async def get_job(request):
+    job = job_manager.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+
+async def stream_job_events(request):
+    job = job_manager.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    try:
+        offset = max(int(request.query_params.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+
+    async def generate():
+        position = offset
+        while True:
+            # timeout=0 never blocks, we wait on the event loop instead
+            events, finished = job.wait_for_events(position, timeout=0)
+            for event in events:
+                yield json.dumps(event) + "\n"
+            position += len(events)
+            if finished and position >= len(job.events):
+                break
+            if not events:
+                await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+        if job.state == FAILED:
+            yield json.dumps({"error": job.error, "job_id": job.id}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+async def screen_companies(request):
+    financial_screener = warmup.get("financial_screener")
+    params = request.query_params
+    try:
+        limit = int(params.get("limit", financial_screener.SCREEN_LIMIT))
+        result = financial_screener.screen(
+            params.getlist("filter"), sort_by=params.get("sort_by"), descending=params.get("order", "desc") != "asc",
+            limit=limit, tickers=_split_list(params.get("tickers")), sector=params.get("sector"),
+            columns=_split_list(params.get("columns")),
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(result)
+
+
+async def get_screen_metrics(request):
+    return JSONResponse(warmup.get("financial_screener").METRICS)
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+async def get_time_series_price(request):
+    params = request.query_params
+    result = await run_in_threadpool(fetch_price_for_company, params.get("company"), params.get("from_date"), params.get("to_date"))
+    return JSONResponse(result)
+
+
+async def get_conversations(request):
+    # The SQLite store can wait on its write lock; keep that off the event loop
+    conversations = await run_in_threadpool(
+        warmup.get("agents").get_conversation_history, request.path_params["user_id"], request.path_params["agent_name"]
+    )
+    return JSONResponse(conversations)
+
+
+async def clear_conversations(request):
+    await run_in_threadpool(
+        warmup.get("agents").clear_conversation_history, request.path_params["user_id"], request.path_params["agent_name"]
+    )
+    return JSONResponse({"message": "Conversations cleared successfully"})
+
+
+async def query_master_agent(request):
+    agents = warmup.get("agents")
+    data = await request.json()
+
+    movement_prediction, explanation, news = (data.get('movement_prediction', None), data.get('explanation', None), data.get('news', None))
+    if (movement_prediction is None or explanation is None or news is None) and not (movement_prediction is None and explanation is None and news is None):
+        return JSONResponse({"error": "Either provide all of movement_prediction, explanation, and news, or none of them"}, status_code=400)
+
+    company = data.get('company', None)
+    if not company:
+        return JSONResponse({"error": "Please send company name"}, status_code=400)
+
+    query = data.get('query', None)
+    if not query:
+        return JSONResponse({"error": "Please send user query"}, status_code=400)
+
+    response = await run_in_threadpool(
+        agents.master_agent, request.path_params["user_id"], query,
+        movement_prediction=movement_prediction, explanation=explanation, news=news, company=company
+    )
+    return PlainTextResponse(response, media_type="text/html")
+
+
+async def index(request):
+    return PlainTextResponse("Welcome to FinGReaT!", media_type="text/html")
+
+
+routes = [
+    Route("/healthz", healthz, methods=["GET"]),
+    Route("/readyz", readyz, methods=["GET"]),
+    Route("/market_prices", get_market_prices, methods=["GET"]),
+    Route("/market_price/{symbol}", get_symbol_price, methods=["GET"]),
+    Route("/metrics", get_metrics, methods=["GET"]),
+    Route("/process_news", process_news, methods=["POST"]),
+    Route("/jobs", submit_news_job, methods=["POST"]),
+    Route("/jobs", get_jobs_stats, methods=["GET"]),
+    Route("/jobs/{job_id}", get_job, methods=["GET"]),
+    Route("/jobs/{job_id}/events", stream_job_events, methods=["GET"]),
+    Route("/screen", screen_companies, methods=["GET"]),
+    Route("/screen/metrics", get_screen_metrics, methods=["GET"]),
+    Route("/time_series_price", get_time_series_price, methods=["GET"]),
+    Route("/{user_id}/agents/{agent_name}/conversations", get_conversations, methods=["GET"]),
+    Route("/{user_id}/agents/{agent_name}/conversations", clear_conversations, methods=["DELETE"]),
+    Route("/{user_id}/agents/master_agent", query_master_agent, methods=["POST"]),
+    Route("/", index, methods=["GET"]),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    exception_handlers={NotReadyError: handle_not_ready},
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,146 @@
+"""
+Benchmarks for similarity_search. Run from the backend directory:
+
+    python benchmark_search.py batch --queries 256 --batch-sizes 1 4 16 64
+"""
+import argparse
+import time
+
+import similarity_search
+
+
+def sample_queries(n):
+    """Use article titles from the corpus as realistic queries."""
+    titles = [t for t in similarity_search.get_snapshot().news.column("title") if t.strip()]
+    return [titles[i % len(titles)] for i in range(n)]
+
+
+def benchmark_batch(args):
+    queries = sample_queries(args.queries)
+    # Warm up the model and index so the first measurement isn't penalised
+    similarity_search.search_similar_batch(queries[:8], top_k=args.top_k)
+
+    print(f"{'batch':>6} {'queries/s':>10} {'ms/query':>10}")
+    for batch_size in args.batch_sizes:
+        started = time.perf_counter()
+        for i in range(0, len(queries), batch_size):
+            similarity_search.search_similar_batch(queries[i:i + batch_size], top_k=args.top_k, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"{batch_size:>6} {len(queries) / elapsed:>10.1f} {elapsed * 1000 / len(queries):>10.2f}")
+
+
+def benchmark_cache(args):
+    """Replay a workload where a share of the queries repeat earlier ones."""
+    import random
+
+    unique = sample_queries(args.queries)
+    rng = random.Random(0)
+    workload = []
+    for i in range(args.queries):
+        if workload and rng.random() < args.repeat_ratio:
+            workload.append(rng.choice(workload))
+        else:
+            workload.append(unique[i])
+
+    similarity_search.search_similar(workload[0])  # load resources
+    for use_cache in (False, True):
+        similarity_search._embedding_cache.clear(reset_stats=True)
+        started = time.perf_counter()
+        for query in workload:
+            if not use_cache:
+                similarity_search._embedding_cache.clear()
+            similarity_search.search_similar(query, top_k=args.top_k)
+        elapsed = time.perf_counter() - started
+        label = "cached" if use_cache else "uncached"
+        print(f"{label:>10}: {elapsed * 1000 / len(workload):.2f} ms/query  hit rate {similarity_search.embedding_cache_stats()['hit_rate']:.2f}")
+
+
+def _aggregate_with_dict(chunks, indices, distances):
+    """The per-hit Python dict loop search_similar used before the NumPy group-by, kept as a baseline."""
+    article_scores = {}
+    for idx, score in zip(indices, distances):
+        if idx != -1:
+            article_idx = int(chunks.article_idx[idx])
+            entry = article_scores.setdefault(article_idx, {'min_score': float('inf'), 'total_score': 0, 'chunk_count': 0, 'chunks': []})
+            entry['min_score'] = min(entry['min_score'], score)
+            entry['total_score'] += score
+            entry['chunk_count'] += 1
+            entry['chunks'].append({'text': chunks.text(idx), 'score': score, 'position': int(chunks.chunk_position[idx])})
+    return sorted(article_scores.items(), key=lambda item: item[1]['min_score'])
+
+
+def benchmark_aggregate(args):
+    """Chunk->article aggregation cost alone, for increasing numbers of fetched chunks."""
+    snapshot = similarity_search.get_snapshot()
+    queries = sample_queries(args.queries)
+    vectors = similarity_search.encode_queries(queries)
+
+    print(f"{'k':>7} {'dict loop ms':>13} {'numpy ms':>9} {'speedup':>8}")
+    for k in args.k:
+        k = min(k, snapshot.index.ntotal)
+        distances, indices = snapshot.index.search(vectors, k)
+        timings = []
+        for aggregate in (_aggregate_with_dict, similarity_search._aggregate_chunk_hits):
+            started = time.perf_counter()
+            for row_indices, row_distances in zip(indices, distances):
+                aggregate(snapshot.chunks, row_indices, row_distances)
+            timings.append((time.perf_counter() - started) * 1000 / len(queries))
+        print(f"{k:>7} {timings[0]:>13.3f} {timings[1]:>9.3f} {timings[0] / timings[1]:>7.1f}x")
+
+
+def benchmark_filtered(args):
+    """How many returned articles are usable downstream (mention a NIFTY 50 company), and what filtering costs."""
+    from news_filters import parse_news_stocks
+    from templates import NIFTY_50_COMPANIES
+
+    queries = sample_queries(args.queries)
+    similarity_search.search_similar_batch(queries[:8], tickers=NIFTY_50_COMPANIES, hybrid=True)  # build filters / BM25
+
+    modes = [
+        ("vector", {}),
+        ("filtered", {"tickers": NIFTY_50_COMPANIES}),
+        ("hybrid", {"tickers": NIFTY_50_COMPANIES, "hybrid": True}),
+        ("hybrid-all", {"hybrid": True}),
+    ]
+    print(f"{'mode':>10} {'ms/query':>9} {'results':>8} {'usable':>7}")
+    for label, kwargs in modes:
+        started = time.perf_counter()
+        results = [similarity_search.search_similar(query, top_k=args.top_k, **kwargs) for query in queries]
+        elapsed = time.perf_counter() - started
+        returned = [article for result in results for article in result]
+        usable = sum(1 for article in returned if parse_news_stocks(article["article_stocks"]))
+        print(f"{label:>10} {elapsed * 1000 / len(queries):>9.2f} {len(returned):>8} {usable / max(len(returned), 1):>6.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="similarity_search benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="Throughput of search_similar_batch for different batch sizes")
+    batch.add_argument("--queries", type=int, default=256)
+    batch.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    batch.add_argument("--top-k", type=int, default=3)
+    batch.set_defaults(func=benchmark_batch)
+
+    cache = sub.add_parser("cache", help="Latency with and without the embedding cache on a repeating workload")
+    cache.add_argument("--queries", type=int, default=500)
+    cache.add_argument("--repeat-ratio", type=float, default=0.5)
+    cache.add_argument("--top-k", type=int, default=3)
+    cache.set_defaults(func=benchmark_cache)
+
+    aggregate = sub.add_parser("aggregate", help="Dict-loop vs NumPy chunk->article aggregation at high k")
+    aggregate.add_argument("--queries", type=int, default=50)
+    aggregate.add_argument("--k", type=int, nargs="+", default=[9, 100, 1000, 10000])
+    aggregate.set_defaults(func=benchmark_aggregate)
+
+    filtered = sub.add_parser("filtered", help="Share of NIFTY 50 articles returned with and without pre-filtering / hybrid")
+    filtered.add_argument("--queries", type=int, default=200)
+    filtered.add_argument("--top-k", type=int, default=3)
+    filtered.set_defaults(func=benchmark_filtered)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
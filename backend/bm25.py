@@ -0,0 +1,120 @@
+"""
+BM25 inverted index over news titles and descriptions.
+
+Postings are stored CSR-style (term -> slice of doc ids / term frequencies) so scoring a
+query is a handful of NumPy gathers. similarity_search fuses these lexical scores with the
+vector ranking, which brings back articles that name the company or event exactly but sit
+a little further away in embedding space.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+BM25_DIR = "bm25_index"
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+class BM25Index:
+    def __init__(self, vocabulary, offsets, doc_ids, term_freqs, doc_lengths):
+        self.vocabulary = vocabulary  # term -> term id
+        self.offsets = offsets        # int64 [n_terms + 1], postings of term t are offsets[t]:offsets[t + 1]
+        self.doc_ids = doc_ids        # int32 [n_postings]
+        self.term_freqs = term_freqs  # float32 [n_postings]
+        self.doc_lengths = doc_lengths
+        self.doc_count = len(doc_lengths)
+        self.avg_doc_length = float(doc_lengths.mean()) if self.doc_count else 0.0
+        doc_freqs = np.diff(offsets)
+        self.idf = np.log1p((self.doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, documents):
+        vocabulary = {}
+        postings = []  # (term id, doc id, tf)
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                term_id = vocabulary.setdefault(token, len(vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            postings.extend((term_id, doc_id, tf) for term_id, tf in counts.items())
+
+        postings = np.asarray(postings, dtype=np.int64).reshape(-1, 3)
+        order = np.lexsort((postings[:, 1], postings[:, 0]))
+        postings = postings[order]
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(postings[:, 0], minlength=len(vocabulary)), out=offsets[1:])
+        return cls(vocabulary, offsets, postings[:, 1].astype(np.int32), postings[:, 2].astype(np.float32), doc_lengths)
+
+    def save(self, directory):
+        # Workers share the snapshot directory: each file is written aside and renamed into place,
+        # postings.npz last since load_bm25_index only reads the index once it exists
+        os.makedirs(directory, exist_ok=True)
+        suffix = f".tmp-{os.getpid()}"
+        vocabulary_path = os.path.join(directory, "vocabulary.json")
+        with open(vocabulary_path + suffix, "w") as f:
+            json.dump(self.vocabulary, f)
+        os.replace(vocabulary_path + suffix, vocabulary_path)
+        postings_path = os.path.join(directory, "postings.npz")
+        with open(postings_path + suffix, "wb") as f:
+            np.savez(f, offsets=self.offsets, doc_ids=self.doc_ids,
+                     term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+        os.replace(postings_path + suffix, postings_path)
+
+    @classmethod
+    def load(cls, directory):
+        data = np.load(os.path.join(directory, "postings.npz"))
+        with open(os.path.join(directory, "vocabulary.json")) as f:
+            vocabulary = json.load(f)
+        return cls(vocabulary, data["offsets"], data["doc_ids"], data["term_freqs"], data["doc_lengths"])
+
+    def scores(self, query, mask=None):
+        """BM25 score of every document for `query`; documents outside `mask` score 0."""
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term_id in {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_doc_length)
+            scores[docs] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + norm)
+        if mask is not None:
+            scores[~mask] = 0
+        return scores
+
+    def top(self, query, n, mask=None):
+        """(doc ids, scores) of the n best-scoring documents with a non-zero score."""
+        scores = self.scores(query, mask)
+        n = min(n, int(np.count_nonzero(scores)))
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best]
+
+
+def load_bm25_index(directory, news):
+    """Load the snapshot's BM25 index, building and caching it next to the stores on first use."""
+    path = os.path.join(directory, BM25_DIR)
+    if os.path.exists(os.path.join(path, "postings.npz")):
+        index = BM25Index.load(path)
+        # A rebuild racing this read can pair a new vocabulary with the old postings
+        if index.doc_count == len(news) and len(index.vocabulary) == len(index.offsets) - 1:
+            return index
+    print(f"🔄 Building BM25 index for {len(news)} articles...")
+    titles, descriptions = news.column("title"), news.column("description")
+    index = BM25Index.build([f"{title} {description}" for title, description in zip(titles, descriptions)])
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"⚠️ Could not cache BM25 index at {path}: {e}")
+    return index
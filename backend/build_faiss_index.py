@@ -0,0 +1,191 @@
+"""
+Builds approximate FAISS indexes from the vectors stored in faiss_index.bin and
+benchmarks them against exact search.
+
+    python build_faiss_index.py build --variant hnsw
+    python build_faiss_index.py build --variant ivf_pq --nlist 1024 --pq-m 48
+    python build_faiss_index.py benchmark --variants flat ivf_flat ivf_pq hnsw --k 9
+
+similarity_search.load_resources picks the variant from FAISS_INDEX_VARIANT.
+"""
+import argparse
+import math
+import os
+import time
+
+import faiss
+import numpy as np
+
+EXACT_INDEX_FILE = "faiss_index.bin"
+VARIANTS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Search-time knobs, applied when the index is loaded
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+
+def index_path_for_variant(variant, exact_index_file=EXACT_INDEX_FILE):
+    """flat is the original exact index, the others sit next to it as faiss_index_<variant>.bin."""
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown FAISS index variant {variant!r}, expected one of {VARIANTS}")
+    if variant == "flat":
+        return exact_index_file
+    root, ext = os.path.splitext(exact_index_file)
+    return f"{root}_{variant}{ext}"
+
+
+def apply_search_params(index, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    """Set nprobe on IVF indexes and efSearch on HNSW indexes; flat indexes are left alone."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw"):
+        hnsw_index.hnsw.efSearch = ef_search
+    return index
+
+
+def search_params_with_selector(index, selector):
+    """
+    SearchParameters restricting a search to `selector`, carrying over the index's own
+    nprobe / efSearch (per-call parameters replace them rather than inheriting).
+    """
+    try:
+        ivf_index = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf_index = None
+    if ivf_index is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf_index.nprobe)
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw_index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def load_vectors(exact_index_file=EXACT_INDEX_FILE):
+    """Reconstruct the stored embeddings from the exact index."""
+    index = faiss.read_index(exact_index_file)
+    vectors = index.reconstruct_n(0, index.ntotal)
+    return np.ascontiguousarray(vectors, dtype=np.float32), index.metric_type
+
+
+def default_nlist(n):
+    # ~4*sqrt(n) lists, while keeping at least 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_index(variant, vectors, metric=faiss.METRIC_L2, nlist=None, pq_m=48, pq_bits=8, hnsw_m=32, ef_construction=200):
+    n, d = vectors.shape
+    if variant == "flat":
+        index = faiss.IndexFlat(d, metric)
+    elif variant == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlat(d, metric), d, nlist or default_nlist(n), metric)
+    elif variant == "ivf_pq":
+        if d % pq_m:
+            raise ValueError(f"--pq-m must divide the embedding dimension {d}")
+        index = faiss.IndexIVFPQ(faiss.IndexFlat(d, metric), d, nlist or default_nlist(n), pq_m, pq_bits, metric)
+    elif variant == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        raise ValueError(f"Unknown FAISS index variant {variant!r}, expected one of {VARIANTS}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_size_bytes(index):
+    return faiss.serialize_index(index).nbytes
+
+
+def recall_at_k(approx_ids, exact_ids):
+    hits = 0
+    for approx_row, exact_row in zip(approx_ids, exact_ids):
+        hits += len(set(approx_row[approx_row != -1]) & set(exact_row[exact_row != -1]))
+    return hits / exact_ids.size
+
+
+def time_search(index, queries, k):
+    # One query at a time, as the /process_news path does
+    started = time.perf_counter()
+    for i in range(len(queries)):
+        index.search(queries[i:i + 1], k)
+    single_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    started = time.perf_counter()
+    _, ids = index.search(queries, k)
+    batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    return ids, single_ms, batch_ms
+
+
+def build_command(args):
+    vectors, metric = load_vectors(args.source)
+    print(f"🔄 Building {args.variant} index over {len(vectors)} vectors of dim {vectors.shape[1]}...")
+    started = time.perf_counter()
+    index = build_index(args.variant, vectors, metric, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+    output = args.output or index_path_for_variant(args.variant, args.source)
+    faiss.write_index(index, output)
+    print(f"✅ Wrote {output} in {time.perf_counter() - started:.1f}s ({index_size_bytes(index) / 2**20:.1f} MiB)")
+
+
+def benchmark_command(args):
+    vectors, metric = load_vectors(args.source)
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+
+    exact = faiss.IndexFlat(vectors.shape[1], metric)
+    exact.add(vectors)
+    exact_ids, exact_ms, exact_batch_ms = time_search(exact, queries, args.k)
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={args.k}, nprobe={args.nprobe}, efSearch={args.ef_search}")
+    print(f"{'variant':>10} {'recall@k':>9} {'ms/query':>9} {'ms/q batch':>11} {'size MiB':>9} {'build s':>8}")
+    for variant in args.variants:
+        path = index_path_for_variant(variant, args.source)
+        started = time.perf_counter()
+        if variant == "flat":
+            index = exact
+        elif os.path.exists(path) and not args.rebuild:
+            index = faiss.read_index(path)
+        else:
+            index = build_index(variant, vectors, metric, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+        build_s = time.perf_counter() - started
+        apply_search_params(index, nprobe=args.nprobe, ef_search=args.ef_search)
+
+        ids, single_ms, batch_ms = (exact_ids, exact_ms, exact_batch_ms) if index is exact else time_search(index, queries, args.k)
+        print(
+            f"{variant:>10} {recall_at_k(ids, exact_ids):>9.3f} {single_ms:>9.3f} {batch_ms:>11.3f} "
+            f"{index_size_bytes(index) / 2**20:>9.1f} {build_s:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and benchmark approximate FAISS indexes")
+    parser.add_argument("--source", default=EXACT_INDEX_FILE, help="Exact index holding the stored embeddings")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n))")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers, must divide the dimension")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build one index variant and write it next to the exact index")
+    build.add_argument("--variant", choices=VARIANTS[1:], required=True)
+    build.add_argument("--output", default=None)
+    build.set_defaults(func=build_command)
+
+    bench = sub.add_parser("benchmark", help="Report recall@k, latency and size against exact search")
+    bench.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    bench.add_argument("--k", type=int, default=9)
+    bench.add_argument("--queries", type=int, default=500)
+    bench.add_argument("--nprobe", type=int, default=FAISS_NPROBE)
+    bench.add_argument("--ef-search", type=int, default=FAISS_EF_SEARCH)
+    bench.add_argument("--rebuild", action="store_true", help="Rebuild variants instead of reading them from disk")
+    bench.set_defaults(func=benchmark_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Chunk metadata keyed by FAISS id.
+
+Replaces chunk_metadata.pkl, which held every chunk text plus a dict keyed by the text
+itself. Here row i describes FAISS id i:
+
+    article_idx.npy       int32   row of the article in the news corpus
+    chunk_position.npy    int32   position of the chunk inside its article
+    text.offsets.npy      int64   offsets into text.bytes
+    text.bytes                    UTF-8 chunk texts
+
+Everything is memory-mapped on first access. Migrate an existing pickle with:
+
+    python chunk_store.py migrate chunk_metadata.pkl chunk_store
+"""
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+
+from columnar import StringColumn, load_array, replace_directory, write_array, write_string_column
+
+CHUNK_STORE_DIR = "chunk_store"
+
+
+class ChunkMetadata:
+    def __init__(self, directory=CHUNK_STORE_DIR):
+        self.directory = directory
+        self._article_idx = None
+        self._chunk_position = None
+        self.texts = StringColumn(os.path.join(directory, "text"))
+
+    @property
+    def article_idx(self):
+        if self._article_idx is None:
+            self._article_idx = load_array(os.path.join(self.directory, "article_idx.npy"))
+        return self._article_idx
+
+    @property
+    def chunk_position(self):
+        if self._chunk_position is None:
+            self._chunk_position = load_array(os.path.join(self.directory, "chunk_position.npy"))
+        return self._chunk_position
+
+    def open(self):
+        """Map every column now; see news_snapshots.open_snapshot."""
+        # The properties map the numeric arrays on first access
+        self.article_idx
+        self.chunk_position
+        self.texts.open()
+        return self
+
+    def __len__(self):
+        return len(self.article_idx)
+
+    def text(self, faiss_id):
+        return self.texts[faiss_id]
+
+
+def write_chunk_store(directory, texts, article_idx, chunk_position):
+    if not (len(texts) == len(article_idx) == len(chunk_position)):
+        raise ValueError("texts, article_idx and chunk_position must have one entry per FAISS id")
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    write_array(os.path.join(tmp_dir, "article_idx.npy"), article_idx, np.int32)
+    write_array(os.path.join(tmp_dir, "chunk_position.npy"), chunk_position, np.int32)
+    write_string_column(os.path.join(tmp_dir, "text"), texts)
+    replace_directory(tmp_dir, directory)
+
+
+def migrate_from_pickle(pickle_path, directory=CHUNK_STORE_DIR):
+    """
+    Convert chunk_metadata.pkl into a chunk store.
+
+    The pickle maps chunk text -> article, so chunks with identical text were already
+    collapsed onto one article when it was written; those ids keep that article here.
+    """
+    started = time.perf_counter()
+    with open(pickle_path, "rb") as f:
+        all_chunks, article_mapping = pickle.load(f)
+
+    article_idx = np.empty(len(all_chunks), dtype=np.int32)
+    chunk_position = np.empty(len(all_chunks), dtype=np.int32)
+    for i, chunk_text in enumerate(all_chunks):
+        chunk_info = article_mapping[chunk_text]
+        article_idx[i] = chunk_info['article_idx']
+        chunk_position[i] = chunk_info['chunk_position']
+
+    write_chunk_store(directory, all_chunks, article_idx, chunk_position)
+    duplicates = len(all_chunks) - len(article_mapping)
+    print(f"✅ Migrated {len(all_chunks)} chunks to {directory} in {time.perf_counter() - started:.1f}s")
+    if duplicates:
+        print(f"⚠️ {duplicates} chunks share their text with another chunk and inherit its article from the pickle")
+
+
+def load_chunk_metadata(directory=CHUNK_STORE_DIR, pickle_path="chunk_metadata.pkl"):
+    """Open the chunk store, migrating the legacy pickle on first use."""
+    if not os.path.exists(directory) and os.path.exists(pickle_path):
+        print(f"🔄 No chunk store at {directory}, migrating {pickle_path}...")
+        migrate_from_pickle(pickle_path, directory)
+    return ChunkMetadata(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk metadata store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Convert chunk_metadata.pkl into a chunk store")
+    migrate.add_argument("pickle_path", nargs="?", default="chunk_metadata.pkl")
+    migrate.add_argument("directory", nargs="?", default=CHUNK_STORE_DIR)
+    args = parser.parse_args()
+    migrate_from_pickle(args.pickle_path, args.directory)
+
+
+if __name__ == "__main__":
+    main()
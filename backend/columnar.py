@@ -0,0 +1,87 @@
+"""
+Small helpers for the on-disk columnar files used by the news and chunk stores.
+
+Numeric columns are plain .npy files opened with mmap_mode="r". String columns are an
+int64 offsets array (n + 1 entries) next to a blob of UTF-8 bytes, so row i is
+blob[offsets[i]:offsets[i + 1]] and nothing is decoded until it is asked for.
+"""
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+def write_array(path, values, dtype):
+    np.save(path, np.asarray(values, dtype=dtype))
+
+
+def load_array(path):
+    return np.load(path, mmap_mode="r")
+
+
+def write_string_column(prefix, values):
+    """Writes <prefix>.offsets.npy and <prefix>.bytes for a list of strings."""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(f"{prefix}.bytes", "wb") as f:
+        position = 0
+        for i, value in enumerate(values):
+            encoded = ("" if value is None else str(value)).encode("utf-8")
+            f.write(encoded)
+            position += len(encoded)
+            offsets[i + 1] = position
+    np.save(f"{prefix}.offsets.npy", offsets)
+
+
+class StringColumn:
+    """Read-only, memory-mapped string column written by write_string_column."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._offsets = None
+        self._blob = None
+
+    def open(self):
+        """Map the files now instead of on first access."""
+        if self._offsets is None:
+            self._offsets = load_array(f"{self.prefix}.offsets.npy")
+            if self._offsets[-1] > 0:
+                self._blob = np.memmap(f"{self.prefix}.bytes", dtype=np.uint8, mode="r")
+            else:
+                self._blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        self.open()
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        self.open()
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def to_list(self):
+        return [self[i] for i in range(len(self))]
+
+
+def replace_directory(tmp_dir, directory):
+    """
+    Publish a fully written tmp_dir as `directory`.
+
+    `directory` is a symlink to a versioned sibling (<name>.v<ns>-<pid>), switched by one atomic
+    rename, so a reader opening it at any moment finds either the old or the new version, never
+    nothing. A plain directory left by older code is moved aside once, on the first switch.
+    """
+    parent, name = os.path.split(os.path.abspath(directory))
+    version = f"{name}.v{time.time_ns()}-{os.getpid()}"
+    os.replace(tmp_dir, os.path.join(parent, version))
+    old_dir = None
+    if os.path.islink(directory):
+        old_dir = os.path.join(parent, os.readlink(directory))
+    elif os.path.exists(directory):
+        old_dir = f"{directory}.old-{os.getpid()}"
+        os.replace(directory, old_dir)
+    tmp_link = f"{directory}.link-{os.getpid()}"
+    os.symlink(version, tmp_link)  # relative, so the tree can be moved or copied
+    os.replace(tmp_link, directory)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
@@ -1,74 +1,257 @@
+"""
+Company financials (company_financials.json) as a typed, columnar store.
+
+The JSON mixes ints, floats and numeric strings ("-2404", "" for missing) and each company
+has its own set of period keys. FinancialStore normalizes it once into one float64 array
+per section, shaped companies x periods x metrics, with NaN for missing values:
+
+    quarterly    Mar2024, Jun2024, ... sorted by the period calendar
+    yearly       Mar2023, Mar2024, Dec2023, Mar202415m (a 15 month year), ...
+    ttm          TTM
+    cumulative   10Years, 5Years, 3Years, TTM, ... (metrics CompoundedSalesGrowth, ...)
+
+"Sales" (non-financial companies) and "Revenue" (banks, NBFCs) share the Revenue column.
+Reports use each company's latest REPORT_QUARTERS quarters and REPORT_YEARS years, so
+they follow the data instead of hard-coded period keys, and are memoized per company.
+The store is rebuilt only when the JSON file changes.
+
+    python company_financials.py HDFCBANK
+"""
+import argparse
 import json
+import math
+import os
+import re
+import threading
+import time
 
-# Load JSON data
-with open('company_financials.json', 'r') as file:
-    data = json.load(file)
-
-# Helper function to get either "Revenue" or "Sales"
-def get_revenue_or_sales(info):
-    return info.get("Revenue") or info.get("Sales")
-
-# Function to extract quarterly information
-def extract_quarterly_info(data, company_symbol):
-    quarters = ["Dec2024", "Sep2024", "Jun2024", "Mar2024"]
-    return [
-        f"{quarter}: Revenue - {get_revenue_or_sales(info)} Cr Rupees, Net Profit - {info.get('NetProfit')} Cr Rupees"
-        for quarter in quarters
-        if (info := data[company_symbol]["quarterlydata"].get(quarter, {}))
-    ]
-
-# Function to extract yearly information
-def extract_yearly_info(data, company_symbol):
-    years = ["Mar2024", "Mar2023"]
-    return [
-        f"{year}: Revenue - {get_revenue_or_sales(info)} Cr Rupees, Net Profit - {info.get('NetProfit')} Cr Rupees, "
-        f"Total Assets - {info.get('TotalAssets')} Cr Rupees, Net Cash Flow - {info.get('NetCashFlow')} Cr Rupees"
-        for year in years
-        if (info := data[company_symbol]["yearlydata"].get(year, {}))
-    ]
-
-# Function to extract cumulative information (adds % sign to all values)
-def extract_cumulative_info(data, company_symbol):
-    cumulative_data = data[company_symbol]["cumulativedata"]
-
-    def add_percentage(value_dict):
-        return {key: f"{value}%" for key, value in value_dict.items()}
-
-    cumulative_info = {
-        "Compounded Sales Growth": add_percentage(cumulative_data.get("CompoundedSalesGrowth", {})),
-        "Compounded Profit Growth": add_percentage(cumulative_data.get("CompoundedProfitGrowth", {})),
-        "Stock Price CAGR": add_percentage(cumulative_data.get("StockPriceCAGR", {})),
-        "Return on Equity": add_percentage(cumulative_data.get("ReturnonEquity", {}))
-    }
-
-    return [
-        f"{key}: {', '.join([f'{k}: {v}' for k, v in value.items()])}"
-        for key, value in cumulative_info.items()
-    ]
-
-# Function to extract TTM information
-def extract_ttm_info(data, company_symbol):
-    ttm_data = data[company_symbol]["ttm"].get("TTM", {})
-    return f"Total Revenue: {get_revenue_or_sales(ttm_data)} Cr Rupees, Net Profit: {ttm_data.get('NetProfit')} Cr Rupees"
-
-# Function to generate a formatted financial report as a string
-def generate_financial_report(company_symbol):
-    report = []
-    report.append("Quarterly Performance (Last 4 Quarters):")
-    report.extend([f"  - {info}" for info in extract_quarterly_info(data, company_symbol)])
+import numpy as np
+
+from tracing import traced
+
+COMPANY_FINANCIALS_FILE = os.getenv("COMPANY_FINANCIALS_FILE", "company_financials.json")
+REPORT_QUARTERS = int(os.getenv("REPORT_QUARTERS", "4"))
+REPORT_YEARS = int(os.getenv("REPORT_YEARS", "2"))
+
+SECTIONS = {"quarterly": "quarterlydata", "yearly": "yearlydata", "ttm": "ttm", "cumulative": "cumulativedata"}
+METRIC_ALIASES = {"Sales": "Revenue"}
+MONTHS = {month: i for i, month in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+_PERIOD_RE = re.compile(r"^([A-Z][a-z]{2})(\d{4})")
+_PERIOD_LENGTH_RE = re.compile(r"^[A-Z][a-z]{2}\d{4}(\d+)m$")
+
+CUMULATIVE_LABELS = {
+    "CompoundedSalesGrowth": "Compounded Sales Growth",
+    "CompoundedProfitGrowth": "Compounded Profit Growth",
+    "StockPriceCAGR": "Stock Price CAGR",
+    "ReturnonEquity": "Return on Equity",
+}
+
+
+def period_end(label):
+    """(year, month) a period label like 'Dec2024' or 'Mar202415m' ends in, or None for 'TTM', '5Years'."""
+    match = _PERIOD_RE.match(label)
+    if match is None or match.group(1) not in MONTHS:
+        return None
+    return int(match.group(2)), MONTHS[match.group(1)]
+
+
+def period_months(label, default=12):
+    """Length in months of a period written with one, like 'Mar202415m' (15); `default` otherwise."""
+    match = _PERIOD_LENGTH_RE.match(label)
+    return int(match.group(1)) if match else default
+
+
+def to_float(value):
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", "").rstrip("%"))
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def format_number(value):
+    if math.isnan(value):
+        return "N/A"
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+class FinancialSection:
+    """values[company, period, metric]; periods are in calendar order where they have one."""
+
+    def __init__(self, periods, metrics, values):
+        self.periods = periods
+        self.metrics = metrics
+        self.values = values
+        self.period_index = {period: i for i, period in enumerate(periods)}
+        self.metric_index = {metric: i for i, metric in enumerate(metrics)}
+        # A company has a period if any metric is filled in for it
+        self.present = ~np.isnan(values).all(axis=2)
+
+    @classmethod
+    def build(cls, companies, tables):
+        """tables: one {period: {metric: value}} per company."""
+        periods, metrics = {}, {}
+        for table in tables:
+            for period, row in table.items():
+                periods.setdefault(period, None)
+                for metric, value in row.items():
+                    metric = METRIC_ALIASES.get(metric, metric)
+                    if not math.isnan(to_float(value)):
+                        metrics.setdefault(metric, None)
+        # Calendar periods oldest first, then the others (TTM, 10Years, ...) in order of appearance
+        periods = list(periods)
+        order = sorted(range(len(periods)), key=lambda i: (period_end(periods[i]) is None, period_end(periods[i]) or (0, 0), i))
+        periods = [periods[i] for i in order]
+        metrics = list(metrics)
+        values = np.full((len(companies), len(periods), len(metrics)), np.nan)
+        period_index = {period: i for i, period in enumerate(periods)}
+        metric_index = {metric: i for i, metric in enumerate(metrics)}
+        for c, table in enumerate(tables):
+            for period, row in table.items():
+                for metric, value in row.items():
+                    m = metric_index.get(METRIC_ALIASES.get(metric, metric))
+                    if m is not None:
+                        values[c, period_index[period], m] = to_float(value)
+        return cls(periods, metrics, values)
 
-    report.append("\nYearly Performance (Last 2 Years):")
-    report.extend([f"  - {info}" for info in extract_yearly_info(data, company_symbol)])
+    def series(self, metric):
+        """companies x periods array of one metric (all NaN if the metric is unknown)."""
+        m = self.metric_index.get(metric)
+        if m is None:
+            return np.full(self.values.shape[:2], np.nan)
+        return self.values[:, :, m]
+
+    def latest_periods(self, company_id, n):
+        """Indexes of the company's latest n periods, newest first."""
+        return np.flatnonzero(self.present[company_id])[::-1][:n]
+
+
+class FinancialStore:
+    def __init__(self, companies, sections, timestamps):
+        self.companies = companies
+        self.company_index = {company: i for i, company in enumerate(companies)}
+        self.sections = sections
+        self.timestamps = timestamps
+        self._reports = {}
+
+    @classmethod
+    def from_json(cls, path=COMPANY_FINANCIALS_FILE):
+        with open(path, "r") as file:
+            data = json.load(file)
+        companies = list(data)
+        sections = {}
+        for name, key in SECTIONS.items():
+            tables = [data[company].get(key, {}) for company in companies]
+            if name == "cumulative":
+                # Stored metric -> horizon -> value; turn it around to horizon -> metric -> value
+                tables = [_by_period(table) for table in tables]
+            sections[name] = FinancialSection.build(companies, tables)
+        return cls(companies, sections, [data[company].get("timestamp") for company in companies])
+
+    def __contains__(self, company):
+        return company in self.company_index
+
+    def value(self, section, company, period, metric):
+        section = self.sections[section]
+        c = self.company_index[company]
+        p = section.period_index.get(period)
+        m = section.metric_index.get(metric)
+        if p is None or m is None:
+            return math.nan
+        return float(section.values[c, p, m])
+
+    def report(self, company):
+        report = self._reports.get(company)
+        if report is None:
+            report = self._reports[company] = self._build_report(company)
+        return report
+
+    def _build_report(self, company):
+        c = self.company_index[company]
+        quarterly, yearly = self.sections["quarterly"], self.sections["yearly"]
+        report = [f"Quarterly Performance (Last {REPORT_QUARTERS} Quarters):"]
+        for p in quarterly.latest_periods(c, REPORT_QUARTERS):
+            row = self._row(quarterly, c, p)
+            report.append(f"  - {quarterly.periods[p]}: Revenue - {row('Revenue')} Cr Rupees, "
+                          f"Net Profit - {row('NetProfit')} Cr Rupees")
+
+        report.append(f"\nYearly Performance (Last {REPORT_YEARS} Years):")
+        for p in yearly.latest_periods(c, REPORT_YEARS):
+            row = self._row(yearly, c, p)
+            report.append(f"  - {yearly.periods[p]}: Revenue - {row('Revenue')} Cr Rupees, "
+                          f"Net Profit - {row('NetProfit')} Cr Rupees, Total Assets - {row('TotalAssets')} Cr Rupees, "
+                          f"Net Cash Flow - {row('NetCashFlow')} Cr Rupees")
+
+        report.append("\nCumulative Performance Over Time:")
+        cumulative = self.sections["cumulative"]
+        for metric, label in CUMULATIVE_LABELS.items():
+            values = cumulative.series(metric)[c]
+            horizons = [f"{cumulative.periods[p]}: {format_number(values[p])}%"
+                        for p in range(len(cumulative.periods)) if not np.isnan(values[p])]
+            report.append(f"  - {label}: {', '.join(horizons)}")
+
+        report.append("\nTrailing Twelve Months (TTM) Performance:")
+        ttm = self.sections["ttm"]
+        row = self._row(ttm, c, ttm.period_index["TTM"])
+        report.append(f"  - Total Revenue: {row('Revenue')} Cr Rupees, Net Profit: {row('NetProfit')} Cr Rupees")
+        return "\n".join(report)
+
+    @staticmethod
+    def _row(section, company_id, period_id):
+        def get(metric):
+            m = section.metric_index.get(metric)
+            return format_number(float(section.values[company_id, period_id, m])) if m is not None else "N/A"
+        return get
+
+
+def _by_period(table):
+    periods = {}
+    for metric, horizons in table.items():
+        for horizon, value in horizons.items():
+            periods.setdefault(horizon, {})[metric] = value
+    return periods
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_financial_store(path=COMPANY_FINANCIALS_FILE):
+    """The store for `path`, rebuilt only if the file changed since it was loaded."""
+    mtime = os.stat(path).st_mtime_ns
+    loaded = _stores.get(path)
+    if loaded is not None and loaded[0] == mtime:
+        return loaded[1]
+    with _stores_lock:
+        loaded = _stores.get(path)
+        if loaded is None or loaded[0] != mtime:
+            started = time.perf_counter()
+            store = FinancialStore.from_json(path)
+            _stores[path] = (mtime, store)
+            print(f"✅ Loaded financials {path}: {len(store.companies)} companies in "
+                  f"{(time.perf_counter() - started) * 1000:.1f}ms")
+        return _stores[path][1]
+
+
+@traced("financials.generate_report")
+def generate_financial_report(company_symbol):
+    """Formatted financial report of a company, built once per version of the financials file."""
+    return get_financial_store().report(company_symbol)
 
-    report.append("\nCumulative Performance Over Time:")
-    report.extend([f"  - {info}" for info in extract_cumulative_info(data, company_symbol)])
 
-    report.append("\nTrailing Twelve Months (TTM) Performance:")
-    report.append(f"  - {extract_ttm_info(data, company_symbol)}")
+def main():
+    parser = argparse.ArgumentParser(description="Print a company's financial report")
+    parser.add_argument("company_symbol", nargs="?", default="HDFCBANK")
+    parser.add_argument("--path", default=COMPANY_FINANCIALS_FILE)
+    args = parser.parse_args()
+    print(get_financial_store(args.path).report(args.company_symbol))
 
-    return "\n".join(report)
 
 if __name__ == "__main__":
-    company_symbol = "HDFCBANK"
-    financial_report = generate_financial_report(company_symbol)
-    print(financial_report)
\ No newline at end of file
+    main()
@@ -0,0 +1,157 @@
+"""
+Precomputed company background summaries.
+
+get_company_background_information_tool used to send every KG relation of the company to
+Gemini on each company_background_agent turn, getting much the same summary back for an
+unchanged final_kg.txt. Summaries now live in COMPANY_SUMMARIES_FILE, keyed by ticker with
+a hash of the company's KG edges. They are served from memory and regenerated only for
+companies whose edges changed; running servers pick up summaries written by `build`
+(see json_store.py).
+
+    python company_summaries.py build              # all NIFTY 50 companies, only stale / missing ones
+    python company_summaries.py build --force INFY TCS
+    python company_summaries.py report             # fresh / stale / missing per company
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from json_store import get_json_store
+from knowledge_graph import KG_FILE, get_knowledge_graph
+from templates import COMPANY_BACKGROUND_PROMPT_TEMPLATE, KG_NODES_MAPPING, NIFTY_50_COMPANIES
+from tracing import span
+
+COMPANY_SUMMARIES_FILE = os.getenv("COMPANY_SUMMARIES_FILE", "company_summaries.json")
+# Parallel LLM calls when building; llm_calls rotates API keys, so keep this near the number of keys
+SUMMARY_BUILD_WORKERS = int(os.getenv("SUMMARY_BUILD_WORKERS", "8"))
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+# /metrics asks for the counts on every call; they only change with the KG or the summaries file
+_stats_cache = {}
+_stats_lock = threading.Lock()
+
+
+def company_kg_hash(kg, company):
+    """Content hash of the company's KG edges; changes whenever a summary would."""
+    edges = kg.edges(KG_NODES_MAPPING[company])
+    return hashlib.sha256(json.dumps(edges, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def generate_summary(kg, company):
+    from llm_calls import query_gemini
+
+    prompt = COMPANY_BACKGROUND_PROMPT_TEMPLATE.format(company=company, relations=kg.edges(KG_NODES_MAPPING[company]))
+    with span("tools.company_background_summary", company=company):
+        return query_gemini(prompt)
+
+
+def _store(company, summary, kg_hash, path=COMPANY_SUMMARIES_FILE):
+    get_json_store(path).set(company, {"summary": summary, "kg_hash": kg_hash, "generated_at": time.time()})
+
+
+def get_company_summary(company, kg_file=KG_FILE, path=COMPANY_SUMMARIES_FILE):
+    """Background summary of `company`, generated (and stored) only if missing or stale."""
+    kg = get_knowledge_graph(kg_file)
+    kg_hash = company_kg_hash(kg, company)
+    entry = get_json_store(path).get(company)
+    if entry is not None and entry["kg_hash"] == kg_hash:
+        return entry["summary"]
+    print(f"🔄 {'Refreshing stale' if entry else 'Generating'} background summary for {company}...")
+    summary = generate_summary(kg, company)
+    _store(company, summary, kg_hash, path)
+    return summary
+
+
+def staleness_report(companies=NIFTY_50_COMPANIES, kg_file=KG_FILE, path=COMPANY_SUMMARIES_FILE):
+    """{company: {"state": fresh | stale | missing, "age_seconds": ...}}"""
+    kg = get_knowledge_graph(kg_file)
+    summaries = get_json_store(path).data()
+    now = time.time()
+    report = {}
+    for company in companies:
+        entry = summaries.get(company)
+        if entry is None:
+            report[company] = {"state": MISSING, "age_seconds": None}
+        else:
+            state = FRESH if entry["kg_hash"] == company_kg_hash(kg, company) else STALE
+            report[company] = {"state": state, "age_seconds": round(now - entry["generated_at"])}
+    return report
+
+
+def summary_cache_stats(kg_file=KG_FILE, path=COMPANY_SUMMARIES_FILE):
+    """Fresh / stale / missing counts, recomputed only when the KG or the summaries file changed."""
+    # get_knowledge_graph reloads on the same mtime
+    version = (os.stat(kg_file).st_mtime_ns, get_json_store(path).signature())
+    with _stats_lock:
+        cached = _stats_cache.get((kg_file, path))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    report = staleness_report(kg_file=kg_file, path=path)
+    counts = {FRESH: 0, STALE: 0, MISSING: 0}
+    for entry in report.values():
+        counts[entry["state"]] += 1
+    with _stats_lock:
+        _stats_cache[(kg_file, path)] = (version, counts)
+    return counts
+
+
+def build_summaries(companies=NIFTY_50_COMPANIES, force=False, workers=SUMMARY_BUILD_WORKERS,
+                    kg_file=KG_FILE, path=COMPANY_SUMMARIES_FILE):
+    """Generate summaries for every stale or missing company (all of them with force) in parallel."""
+    kg = get_knowledge_graph(kg_file)
+    report = staleness_report(companies, kg_file, path)
+    todo = [company for company in companies if force or report[company]["state"] != FRESH]
+    print(f"🔄 Generating {len(todo)} of {len(companies)} company summaries with {workers} workers...")
+
+    def build(company):
+        kg_hash = company_kg_hash(kg, company)
+        try:
+            summary = generate_summary(kg, company)
+        except Exception as e:
+            print(f"❌ {company}: {e}")
+            return False
+        _store(company, summary, kg_hash, path)
+        print(f"✅ {company}")
+        return True
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = list(executor.map(build, todo))
+    return {"generated": sum(results), "failed": len(results) - sum(results),
+            "skipped": len(companies) - len(todo), "seconds": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed company background summaries")
+    parser.add_argument("--kg-file", default=KG_FILE)
+    parser.add_argument("--path", default=COMPANY_SUMMARIES_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Generate missing and stale summaries")
+    build.add_argument("companies", nargs="*", help="Tickers (default: all NIFTY 50 companies)")
+    build.add_argument("--force", action="store_true", help="Regenerate even fresh summaries")
+    build.add_argument("--workers", type=int, default=SUMMARY_BUILD_WORKERS)
+    sub.add_parser("report", help="Show which summaries are fresh, stale or missing")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        stats = build_summaries(args.companies or NIFTY_50_COMPANIES, args.force, args.workers, args.kg_file, args.path)
+        print(f"Generated {stats['generated']}, failed {stats['failed']}, skipped {stats['skipped']} fresh "
+              f"in {stats['seconds']:.1f}s")
+    else:
+        report = staleness_report(kg_file=args.kg_file, path=args.path)
+        for company, entry in report.items():
+            age = f"{entry['age_seconds'] / 3600:.1f}h old" if entry["age_seconds"] is not None else ""
+            print(f"{company:<12} {entry['state']:<8} {age}")
+        counts = summary_cache_stats(args.kg_file, args.path)
+        print(f"\n{counts[FRESH]} fresh, {counts[STALE]} stale, {counts[MISSING]} missing")
+
+
+if __name__ == "__main__":
+    main()
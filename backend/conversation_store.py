@@ -0,0 +1,347 @@
+"""
+Agent conversations and per-user agent context, bounded and safe to share.
+
+agents.py used to keep these in module-level dicts that grew forever, were mutated from
+request threads without locks, and were lost on restart and not shared between worker
+processes. A store keeps, per user:
+
+    turns      {agent: [{"user": ..., "assistant": ...}, ...]}, at most CONVERSATION_MAX_TURNS per agent
+    contexts   {name: text}, e.g. the OHLC prompt the stock agent answers follow-ups from
+
+Two backends, picked with CONVERSATION_STORE:
+
+    sqlite   (default) CONVERSATION_DB in WAL mode, shared by every worker process
+    memory   in-process, for a single worker
+
+Writes for a user are serialized by a per-user (striped) lock. Sessions idle for longer
+than CONVERSATION_TTL_SECONDS are dropped, and the least recently used ones go first
+once there are more than CONVERSATION_MAX_SESSIONS or their text exceeds
+CONVERSATION_MAX_MB.
+
+    python conversation_store.py stats
+    python conversation_store.py sweep
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "sqlite")
+CONVERSATION_DB = os.getenv("CONVERSATION_DB", "conversations.db")
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", str(24 * 3600)))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "50"))
+CONVERSATION_MAX_MB = float(os.getenv("CONVERSATION_MAX_MB", "256"))
+# Eviction runs after writes, at most this often per process
+SWEEP_INTERVAL_SECONDS = 30
+LOCK_STRIPES = 64
+
+
+class _Store:
+    def __init__(self, ttl_seconds, max_sessions, max_bytes, max_turns):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self.evicted = 0
+        self._user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._last_sweep = 0.0
+
+    def user_lock(self, user_id):
+        return self._user_locks[hash(user_id) % LOCK_STRIPES]
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self.sweep()
+
+
+class MemoryConversationStore(_Store):
+    """Sessions in an OrderedDict kept in least recently used order."""
+
+    def __init__(self, ttl_seconds=CONVERSATION_TTL_SECONDS, max_sessions=CONVERSATION_MAX_SESSIONS,
+                 max_bytes=int(CONVERSATION_MAX_MB * 2**20), max_turns=CONVERSATION_MAX_TURNS):
+        super().__init__(ttl_seconds, max_sessions, max_bytes, max_turns)
+        self._sessions = OrderedDict()  # user_id -> {"turns": {agent: [turn]}, "contexts": {}, "bytes": n, "last_access": t}
+        self._lock = threading.Lock()   # guards _sessions and bytes
+        self._turn_ids = itertools.count(1)
+        self.bytes = 0
+
+    def _session(self, user_id, create=True):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None and create:
+                session = self._sessions[user_id] = {"turns": {}, "contexts": {}, "bytes": 0, "last_access": 0.0}
+            if session is not None and create:
+                session["last_access"] = time.time()
+                self._sessions.move_to_end(user_id)
+            return session
+
+    def _resize(self, session, delta):
+        with self._lock:
+            session["bytes"] += delta
+            self.bytes += delta
+
+    def add_turn(self, user_id, agent, text):
+        with self.user_lock(user_id):
+            session = self._session(user_id)
+            turns = session["turns"].setdefault(agent, [])
+            turn = {"id": next(self._turn_ids), "user": text}
+            turns.append(turn)
+            freed = sum(_turn_bytes(old) for old in turns[:-self.max_turns]) if len(turns) > self.max_turns else 0
+            del turns[:-self.max_turns]
+            self._resize(session, len(text) - freed)
+        self._evict()
+        return turn["id"]
+
+    def set_reply(self, user_id, agent, turn_id, text):
+        with self.user_lock(user_id):
+            session = self._session(user_id, create=False)
+            for turn in reversed(session["turns"].get(agent, []) if session else []):
+                if turn["id"] == turn_id:
+                    self._resize(session, len(text) - len(turn.get("assistant", "")))
+                    turn["assistant"] = text
+                    break
+        self._evict()
+
+    def history(self, user_id, agent):
+        with self.user_lock(user_id):
+            session = self._session(user_id, create=False)
+            turns = session["turns"].get(agent, []) if session else []
+            return [{key: value for key, value in turn.items() if key != "id"} for turn in turns]
+
+    def get_context(self, user_id, name, default=None):
+        with self.user_lock(user_id):
+            session = self._session(user_id, create=False)
+            return session["contexts"].get(name, default) if session else default
+
+    def set_context(self, user_id, name, value):
+        with self.user_lock(user_id):
+            session = self._session(user_id)
+            self._resize(session, len(value) - len(session["contexts"].get(name, "")))
+            session["contexts"][name] = value
+        self._evict()
+
+    def clear(self, user_id, agent=None, contexts=()):
+        """Drop one agent's turns (and the named contexts), or the whole session when agent is None."""
+        with self.user_lock(user_id):
+            session = self._session(user_id, create=False)
+            if session is None:
+                return
+            if agent is None:
+                with self._lock:
+                    self._sessions.pop(user_id, None)
+                    self.bytes -= session["bytes"]
+                return
+            freed = sum(_turn_bytes(turn) for turn in session["turns"].pop(agent, []))
+            freed += sum(len(session["contexts"].pop(name, "")) for name in contexts)
+            self._resize(session, -freed)
+
+    def _evict(self):
+        self._maybe_sweep()
+        with self._lock:
+            while self._sessions and (len(self._sessions) > self.max_sessions or self.bytes > self.max_bytes):
+                _, session = self._sessions.popitem(last=False)
+                self.bytes -= session["bytes"]
+                self.evicted += 1
+
+    def sweep(self):
+        """Drop sessions idle for longer than the TTL; they are at the front of the LRU order."""
+        expired_before = time.time() - self.ttl_seconds
+        evicted = 0
+        with self._lock:
+            while self._sessions:
+                session = next(iter(self._sessions.values()))
+                if session["last_access"] >= expired_before:
+                    break
+                self._sessions.popitem(last=False)
+                self.bytes -= session["bytes"]
+                evicted += 1
+            self.evicted += evicted
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "mb": round(self.bytes / 2**20, 3),
+                    "evicted": self.evicted}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, last_access REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    user_text TEXT NOT NULL,
+    assistant TEXT
+);
+CREATE INDEX IF NOT EXISTS turns_user_agent ON turns (user_id, agent, id);
+CREATE TABLE IF NOT EXISTS contexts (user_id TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (user_id, name));
+"""
+_SESSION_BYTES = """
+SELECT s.user_id,
+       COALESCE((SELECT SUM(LENGTH(user_text) + IFNULL(LENGTH(assistant), 0)) FROM turns t WHERE t.user_id = s.user_id), 0)
+       + COALESCE((SELECT SUM(LENGTH(value)) FROM contexts c WHERE c.user_id = s.user_id), 0)
+FROM sessions s ORDER BY s.last_access
+"""
+
+
+class SqliteConversationStore(_Store):
+    """One SQLite database in WAL mode; every worker process opens its own connections to it."""
+
+    def __init__(self, path=CONVERSATION_DB, ttl_seconds=CONVERSATION_TTL_SECONDS, max_sessions=CONVERSATION_MAX_SESSIONS,
+                 max_bytes=int(CONVERSATION_MAX_MB * 2**20), max_turns=CONVERSATION_MAX_TURNS):
+        super().__init__(ttl_seconds, max_sessions, max_bytes, max_turns)
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _touch(connection, user_id):
+        connection.execute(
+            "INSERT INTO sessions (user_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET last_access = excluded.last_access",
+            (user_id, time.time()),
+        )
+
+    def add_turn(self, user_id, agent, text):
+        with self.user_lock(user_id), self._write() as connection:
+            self._touch(connection, user_id)
+            turn_id = connection.execute(
+                "INSERT INTO turns (user_id, agent, user_text) VALUES (?, ?, ?)", (user_id, agent, text)
+            ).lastrowid
+            connection.execute(
+                "DELETE FROM turns WHERE user_id = ? AND agent = ? AND id <= "
+                "(SELECT id FROM turns WHERE user_id = ? AND agent = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (user_id, agent, user_id, agent, self.max_turns),
+            )
+        self._maybe_sweep()
+        return turn_id
+
+    def set_reply(self, user_id, agent, turn_id, text):
+        with self.user_lock(user_id), self._write() as connection:
+            connection.execute("UPDATE turns SET assistant = ? WHERE id = ? AND user_id = ?", (text, turn_id, user_id))
+
+    def history(self, user_id, agent):
+        rows = self._connection().execute(
+            "SELECT user_text, assistant FROM turns WHERE user_id = ? AND agent = ? ORDER BY id", (user_id, agent)
+        ).fetchall()
+        return [{"user": user, "assistant": assistant} if assistant is not None else {"user": user}
+                for user, assistant in rows]
+
+    def get_context(self, user_id, name, default=None):
+        row = self._connection().execute(
+            "SELECT value FROM contexts WHERE user_id = ? AND name = ?", (user_id, name)
+        ).fetchone()
+        return row[0] if row else default
+
+    def set_context(self, user_id, name, value):
+        with self.user_lock(user_id), self._write() as connection:
+            self._touch(connection, user_id)
+            connection.execute(
+                "INSERT INTO contexts (user_id, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, name) DO UPDATE SET value = excluded.value",
+                (user_id, name, value),
+            )
+        self._maybe_sweep()
+
+    def clear(self, user_id, agent=None, contexts=()):
+        """Drop one agent's turns (and the named contexts), or the whole session when agent is None."""
+        with self.user_lock(user_id), self._write() as connection:
+            if agent is None:
+                self._delete_users(connection, [user_id])
+                return
+            connection.execute("DELETE FROM turns WHERE user_id = ? AND agent = ?", (user_id, agent))
+            connection.executemany("DELETE FROM contexts WHERE user_id = ? AND name = ?",
+                                   [(user_id, name) for name in contexts])
+
+    @staticmethod
+    def _delete_users(connection, user_ids):
+        for table in ("turns", "contexts", "sessions"):
+            connection.executemany(f"DELETE FROM {table} WHERE user_id = ?", [(user_id,) for user_id in user_ids])
+
+    def sweep(self):
+        """Drop expired sessions, then the least recently used ones until both caps hold."""
+        with self._write() as connection:
+            expired = [row[0] for row in connection.execute(
+                "SELECT user_id FROM sessions WHERE last_access < ?", (time.time() - self.ttl_seconds,))]
+            expired_set = set(expired)
+            sessions = [row for row in connection.execute(_SESSION_BYTES) if row[0] not in expired_set]
+            total = sum(size for _, size in sessions)
+            over = len(sessions) - self.max_sessions
+            lru = []
+            for user_id, size in sessions:
+                if len(lru) >= over and total <= self.max_bytes:
+                    break
+                lru.append(user_id)
+                total -= size
+            self._delete_users(connection, expired + lru)
+        self.evicted += len(expired) + len(lru)
+        return len(expired) + len(lru)
+
+    def stats(self):
+        connection = self._connection()
+        sessions = connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        size = connection.execute(
+            "SELECT COALESCE((SELECT SUM(LENGTH(user_text) + IFNULL(LENGTH(assistant), 0)) FROM turns), 0)"
+            " + COALESCE((SELECT SUM(LENGTH(value)) FROM contexts), 0)"
+        ).fetchone()[0]
+        return {"backend": "sqlite", "sessions": sessions, "mb": round(size / 2**20, 3), "evicted": self.evicted}
+
+
+def _turn_bytes(turn):
+    return len(turn["user"]) + len(turn.get("assistant", ""))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SqliteConversationStore() if CONVERSATION_STORE == "sqlite" else MemoryConversationStore()
+                print(f"✅ Conversation store: {CONVERSATION_STORE}")
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent conversation store")
+    parser.add_argument("command", choices=["stats", "sweep"])
+    args = parser.parse_args()
+    store = get_conversation_store()
+    if args.command == "sweep":
+        print(f"Evicted {store.sweep()} sessions")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+Rule-based date ranges for stock price questions.
+
+stock_price_agent used to ask Gemini for the start and end date of every query, even for
+"last 3 months" or "in 2022". parse_date_range resolves the common phrasings locally,
+relative to MAX_DATE (the end of the price data), and snaps the range to trading days
+taken from the price CSVs: the start moves forward and the end back to the nearest day
+with prices, so a weekend or a holiday never ends up as an empty range.
+
+    relative     last 3 months, past week, last 10 trading days, 52 week high, ytd, this month
+    periods      in 2022, march 2024, 15 jan 2024, 2024-03-15, q3 2023, q1 fy25, fy24, 2023-24, h2 2023
+    ranges       from 2019 to 2021, between jan and jun 2022, since 2020, before march 2021
+    points       today, yesterday, current price, 3 months ago, all time
+    nothing      the last 30 days, like the LLM prompt's default
+
+"last year" and "last month" are the trailing 12 months / month; a calendar period needs
+its year ("in 2024"). A query with a date-like word the rules don't cover ("during covid",
+"after the budget") is left to the LLM (parse_date_range returns None).
+
+    python date_ranges.py parse "how did INFY do since march 2024"
+    python date_ranges.py check         # DATE_RANGE_CORPUS: accuracy, coverage, latency saved
+"""
+import argparse
+import bisect
+import calendar
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+MIN_DATE = "2003-01-01"
+MAX_DATE = "2025-04-28"
+DEFAULT_RANGE_DAYS = 30
+STOCK_PRICE_DIR = os.getenv("STOCK_PRICE_DIR", "stock_price")
+
+DateRange = namedtuple("DateRange", "start end rule")
+
+MONTHS = {name: i for i, names in enumerate(
+    ["jan january", "feb february", "mar march", "apr april", "may", "jun june",
+     "jul july", "aug august", "sep sept september", "oct october", "nov november", "dec december"], 1)
+    for name in names.split()}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "couple of": 2, "couple": 2, "few": 3}
+UNIT_MONTHS = {"month": 1, "quarter": 3, "year": 12, "decade": 120}
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_NUMBER = r"\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_UNIT = r"(?P<trading>trading[\s-]+)?(?P<unit>day|week|month|quarter|year|decade|session)s?"
+_ORDINAL = r"(?:st|nd|rd|th)?"
+
+# One alternative per kind of period; at any position the first one that matches wins
+_PERIOD_RE = re.compile("|".join([
+    r"(?P<iso>(?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2}))",
+    r"(?P<dmy>(?P<dmy_d>\d{1,2})[/.](?P<dmy_m>\d{1,2})[/.](?P<dmy_y>\d{4}))",
+    rf"(?P<day_month>(?P<dm_d>\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?(?P<dm_m>{_MONTH})\.?(?:,?\s+(?P<dm_y>\d{{4}}))?)",
+    rf"(?P<month_day>(?P<md_m>{_MONTH})\.?\s+(?P<md_d>\d{{1,2}}){_ORDINAL}(?:,?\s+(?P<md_y>\d{{4}}))?)",
+    rf"(?P<month>(?P<m_m>{_MONTH})\.?(?:[\s,-]*(?P<m_y>\d{{4}})|\s*'(?P<m_yy>\d{{2}}))?)",
+    r"(?P<quarter>q(?P<q_n>[1-4])\s*(?:fy\s*'?(?P<q_fy>\d{4}|\d{2})|(?P<q_y>\d{4})))",
+    r"(?P<half>h(?P<h_n>[12])\s*(?P<h_y>\d{4}))",
+    r"(?P<fy>fy\s*'?(?P<fy_y>\d{4}|\d{2})(?:\s*[-/]\s*(?P<fy_end>\d{2}))?)",
+    r"(?P<split_year>(?P<sy_y>(?:19|20)\d{2})\s*[-/]\s*(?P<sy_end>\d{2})(?!\d))",
+    r"(?P<year>(?:19|20)\d{2})",
+    rf"(?P<ago>(?P<ago_n>{_NUMBER})\s+(?P<ago_unit>day|week|month|year)s?\s+ago)",
+    r"(?P<today>today|yesterday|(?:latest|current|last)\s+(?:closing\s+)?(?:price|close|quote))",
+    r"(?P<to_date>ytd|mtd|year[\s-]to[\s-]date|month[\s-]to[\s-]date|this\s+(?:year|month|week|quarter))",
+    r"(?P<all_time>all[\s-]time|ever|(?:entire|full|whole)\s+history|since\s+(?:listing|inception|ipo)"
+    r"|all\s+(?:the\s+)?(?:available\s+)?data)",
+]).join([r"\b(?:", r")\b"]))
+
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+# "last 3 months", "past week", "last 10 trading days", and a bare "6 month return", "52-week high"
+_TRAILING_RE = re.compile(
+    rf"\b(?:(?:last|past|previous|prior|recent|trailing)\s+(?:(?P<n>{_NUMBER})\s+)?|(?P<bare_n>\d+)[\s-]+){_UNIT}\b"
+    r"(?!\s+ago)")
+
+SINCE_WORDS = {"since", "from", "after", "starting", "post"}
+UNTIL_WORDS = {"until", "till", "before", "upto", "up to", "through", "pre"}
+EXCLUSIVE_WORDS = {"after", "post", "before", "pre"}
+MONTH_WORDS = SINCE_WORDS | UNTIL_WORDS | {"in", "during", "for", "between", "and", "to"}
+FILLER_WORDS = {"the", "of", "start", "beginning", "end", "early", "mid", "late"}
+
+# Words that say the query is about some period the rules above did not understand
+_DATE_CUE_RE = re.compile(
+    r"\d|\b(?:" + "|".join(name for name in MONTHS if name != "may") + r")\b|"
+    r"\b(?:day|week|month|quarter|year|decade|session|fy|q[1-4]|h[12]|since|ago|before|after|during|until|till"
+    r"|between|when|era|period|history|historical|crash|covid|pandemic|lockdown|election|budget|crisis"
+    r"|recession|rally|war|ipo|listing|demoneti[sz]ation|quarterly|annual|monthly|weekly|daily|long[\s-]term)")
+
+
+def to_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def shift_months(day, months):
+    """`day` moved by `months`, clamped to the end of a shorter month (31 Mar - 1 month = 28/29 Feb)."""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def month_range(year, month, months=1):
+    start = date(year, month, 1)
+    return start, shift_months(start, months) - timedelta(days=1)
+
+
+def _number(text):
+    text = re.sub(r"\s+", " ", text)
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def _full_year(text):
+    return int(text) if len(text) == 4 else 2000 + int(text)
+
+
+def _fiscal_year(end_year):
+    """Indian financial year ending in March of `end_year`."""
+    return date(end_year - 1, 4, 1), date(end_year, 3, 31)
+
+
+_trading_days = None
+_trading_days_lock = threading.Lock()
+
+
+def load_trading_days(folder=STOCK_PRICE_DIR):
+    """Sorted dates on which any NIFTY 50 stock has prices in `folder`."""
+    days = set()
+    for name in os.listdir(folder):
+        if name.endswith(".csv"):
+            with open(os.path.join(folder, name)) as f:
+                next(f, None)
+                days.update(line[:10] for line in f if line.strip())
+    return [date.fromisoformat(day) for day in sorted(days)]
+
+
+def get_trading_days():
+    global _trading_days
+    if _trading_days is None:
+        with _trading_days_lock:
+            if _trading_days is None:
+                started = time.perf_counter()
+                try:
+                    _trading_days = load_trading_days()
+                except FileNotFoundError:
+                    print(f"⚠️ No price data in {STOCK_PRICE_DIR}; date ranges are not snapped to trading days")
+                    _trading_days = []
+                else:
+                    print(f"✅ Loaded {len(_trading_days)} trading days in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return _trading_days
+
+
+def is_trading_day(day, trading_days):
+    """A day with prices; past the end of the price data, any weekday."""
+    if trading_days and trading_days[0] <= day <= trading_days[-1]:
+        i = bisect.bisect_left(trading_days, day)
+        return trading_days[i] == day
+    return day.weekday() < 5
+
+
+def snap_to_trading_days(start, end, trading_days):
+    """Moves start forward and end back to trading days."""
+    last = end
+    while start <= end and not is_trading_day(start, trading_days):
+        start += timedelta(days=1)
+    while end >= start and not is_trading_day(end, trading_days):
+        end -= timedelta(days=1)
+    if start > end:
+        # No trading day in the range (a weekend or a holiday): use the last one before it
+        end = last
+        while not is_trading_day(end, trading_days):
+            end -= timedelta(days=1)
+        start = end
+    return start, end
+
+
+class DateRangeParser:
+    def __init__(self, anchor=MAX_DATE, min_date=MIN_DATE, trading_days=None):
+        self.anchor = to_date(anchor)
+        self.min_date = to_date(min_date)
+        self.trading_days = trading_days
+
+    def parse(self, query):
+        """DateRange(start, end, rule) with YYYY-MM-DD dates, or None if the LLM should decide."""
+        text = query.lower()
+        periods = []
+        for match in _PERIOD_RE.finditer(text):
+            period = self._period(match, text)
+            if period is None:
+                return None
+            if period is not False:
+                periods.append((period, match))
+        trailing = [match for match in _TRAILING_RE.finditer(text)
+                    if not any(m.start() <= match.start() < m.end() for _, m in periods)]
+
+        if periods and trailing:
+            return None  # "last quarter of 2023": leave the combination to the LLM
+        if len(trailing) > 1:
+            return None
+        if trailing:
+            start, end, rule = *self._trailing(trailing[0]), "trailing"
+        elif len(periods) > 1:
+            start, end, rule = min(p[0] for p, _ in periods), max(p[1] for p, _ in periods), "range"
+        elif periods:
+            (start, end), match = periods[0]
+            start, end, rule = *self._open_ended(start, end, text, match), "period"
+        elif _DATE_CUE_RE.search(text):
+            return None
+        else:
+            start, end, rule = self.anchor - timedelta(days=DEFAULT_RANGE_DAYS), self.anchor, "default"
+
+        start, end = max(start, self.min_date), min(end, self.anchor)
+        if start > end:
+            return None
+        trading_days = get_trading_days() if self.trading_days is None else self.trading_days
+        start, end = snap_to_trading_days(start, end, trading_days)
+        return DateRange(start.isoformat(), end.isoformat(), rule)
+
+    def _period(self, match, text):
+        """(start, end) of a matched period; None if it can't be resolved, False to ignore the match."""
+        kind, g = match.lastgroup, match.groupdict()
+        try:
+            if kind == "iso":
+                day = date(int(g["iso_y"]), int(g["iso_m"]), int(g["iso_d"]))
+                return day, day
+            if kind == "dmy":
+                day = date(int(g["dmy_y"]), int(g["dmy_m"]), int(g["dmy_d"]))
+                return day, day
+            if kind in ("day_month", "month_day"):
+                prefix = "dm" if kind == "day_month" else "md"
+                month, day = MONTHS[g[f"{prefix}_m"]], int(g[f"{prefix}_d"])
+                year = int(g[f"{prefix}_y"]) if g[f"{prefix}_y"] else self._year_for(text, match, month, day)
+                day = date(year, month, day)
+                return day, day
+        except ValueError:
+            return None  # 2024-02-30
+        if kind == "month":
+            month = MONTHS[g["m_m"]]
+            if g["m_y"] or g["m_yy"]:
+                return month_range(_full_year(g["m_y"] or g["m_yy"]), month)
+            if _preceding_word(text, match.start()) not in MONTH_WORDS:
+                # "may" is usually the verb; any other bare month is a period we can't place
+                return False if g["m_m"] == "may" else None
+            return month_range(self._year_for(text, match, month), month)
+        if kind == "quarter":
+            n = int(g["q_n"])
+            if g["q_fy"]:
+                start, _ = _fiscal_year(_full_year(g["q_fy"]))
+                return month_range(start.year + (start.month + 3 * (n - 1) - 1) // 12,
+                                   (start.month + 3 * (n - 1) - 1) % 12 + 1, 3)
+            return month_range(int(g["q_y"]), 3 * n - 2, 3)
+        if kind == "half":
+            return month_range(int(g["h_y"]), 6 * int(g["h_n"]) - 5, 6)
+        if kind == "fy":
+            year = _full_year(g["fy_y"])
+            if g["fy_end"]:
+                end_year = year - year % 100 + int(g["fy_end"])
+                return _fiscal_year(end_year) if end_year == year + 1 else None
+            return _fiscal_year(year)
+        if kind == "split_year":
+            # "2023-24" is a financial year; anything else ("2024-03") is not something we understand
+            year = int(g["sy_y"])
+            return _fiscal_year(year + 1) if int(g["sy_end"]) == (year + 1) % 100 else None
+        if kind == "year":
+            year = int(g["year"])
+            return date(year, 1, 1), date(year, 12, 31)
+        if kind == "ago":
+            day = self._back(_number(g["ago_n"]), g["ago_unit"])
+            return day, day
+        if kind == "today":
+            day = self.anchor - timedelta(days=1) if match.group() == "yesterday" else self.anchor
+            return day, day
+        if kind == "to_date":
+            phrase = match.group()
+            if phrase in ("ytd", "this year") or phrase.startswith("year"):
+                return date(self.anchor.year, 1, 1), self.anchor
+            if phrase.endswith("quarter"):
+                return date(self.anchor.year, (self.anchor.month - 1) // 3 * 3 + 1, 1), self.anchor
+            if phrase.endswith("week"):
+                return self.anchor - timedelta(days=self.anchor.weekday()), self.anchor
+            return date(self.anchor.year, self.anchor.month, 1), self.anchor
+        return self.min_date, self.anchor  # all_time
+
+    def _year_for(self, text, match, month, day=1):
+        """Year of a date written without one: the next year in the query ("between jan and jun 2022",
+        "from 10 feb to 20 feb 2025"), else the previous one ("from 10 feb 2024 to 20 mar"), else its
+        latest occurrence ("in march", "on 10 feb")."""
+        later = _YEAR_RE.search(text, match.end())
+        if later is not None:
+            return int(later.group())
+        earlier = _YEAR_RE.findall(text, 0, match.start())
+        if earlier:
+            return int(earlier[-1])
+        return self.anchor.year if (month, day) <= (self.anchor.month, self.anchor.day) else self.anchor.year - 1
+
+    def _back(self, n, unit):
+        """The anchor moved back n units; date.min if that is before year 1 ("last 3000 years")."""
+        try:
+            if unit == "day":
+                return self.anchor - timedelta(days=n)
+            if unit == "week":
+                return self.anchor - timedelta(weeks=n)
+            return shift_months(self.anchor, -n * UNIT_MONTHS[unit])
+        except (ValueError, OverflowError):
+            return date.min
+
+    def _trailing(self, match):
+        n = match.group("n") or match.group("bare_n")
+        n = _number(n) if n else 1
+        unit = match.group("unit")
+        if unit == "session" or (match.group("trading") and unit == "day"):
+            # Counted on the price calendar: the n trading days up to and including the anchor
+            trading_days = get_trading_days() if self.trading_days is None else self.trading_days
+            start = self.anchor + timedelta(days=1)
+            while n > 0 and start > self.min_date:
+                start -= timedelta(days=1)
+                n -= is_trading_day(start, trading_days)
+            return start, self.anchor
+        return self._back(n, unit), self.anchor
+
+    def _open_ended(self, start, end, text, match):
+        """'since 2020' runs to the anchor and 'before 2020' from the first day of data."""
+        word = _preceding_word(text, match.start())
+        if word in SINCE_WORDS:
+            return (end + timedelta(days=1) if word in EXCLUSIVE_WORDS else start), self.anchor
+        if word in UNTIL_WORDS:
+            return self.min_date, (start - timedelta(days=1) if word in EXCLUSIVE_WORDS else end)
+        return start, end
+
+
+def _preceding_word(text, position):
+    """The word before a period, skipping "the start of" and the like: since, in, before, ..."""
+    words = re.findall(r"[a-z]+", text[:position])
+    while words and words[-1] in FILLER_WORDS:
+        words.pop()
+    if words[-2:] == ["up", "to"]:
+        return "up to"
+    return words[-1] if words else ""
+
+
+_parser = DateRangeParser()
+
+
+def parse_date_range(query):
+    return _parser.parse(query)
+
+
+# (query, (start, end) or None when the LLM should decide), for MAX_DATE 2025-04-28 and the
+# trading days in stock_price/ (which end on 2025-04-25)
+DATE_RANGE_CORPUS = [
+    ("Show me the stock price of Infosys for the last 3 months", ("2025-01-28", "2025-04-28")),
+    ("How has TCS performed over the past week?", ("2025-04-21", "2025-04-28")),
+    ("Price trend of NTPC over the past few weeks", ("2025-04-07", "2025-04-28")),
+    ("How did Infosys do in the last couple of months?", ("2025-02-28", "2025-04-28")),
+    ("Show me HDFC Bank for the last month", ("2025-03-28", "2025-04-28")),
+    ("How has Reliance moved over the last year?", ("2024-04-29", "2025-04-28")),
+    ("Show Tata Steel for the past 5 years", ("2020-04-28", "2025-04-28")),
+    ("How did Infosys move in the last decade?", ("2015-04-28", "2025-04-28")),
+    ("Show Reliance over the last 3000 years", ("2003-01-01", "2025-04-28")),
+    ("Plot Infosys over the last 99999999 days", ("2003-01-01", "2025-04-28")),
+    ("Plot Reliance for the last 10 trading days", ("2025-04-11", "2025-04-28")),
+    ("Show price of L&T for the last session", ("2025-04-28", "2025-04-28")),
+    ("What was HDFC Bank's 52 week high?", ("2024-04-29", "2025-04-28")),
+    ("Give me the 6 month return of ITC", ("2024-10-28", "2025-04-28")),
+    ("What is the 200 day moving average of TCS?", ("2024-10-10", "2025-04-28")),
+    ("What is the YTD performance of SBIN?", ("2025-01-01", "2025-04-28")),
+    ("How is Wipro doing year to date?", ("2025-01-01", "2025-04-28")),
+    ("How did Maruti do this month?", ("2025-04-01", "2025-04-28")),
+    ("How has Reliance done this quarter?", ("2025-04-01", "2025-04-28")),
+    ("How did Infosys perform in 2022?", ("2022-01-03", "2022-12-30")),
+    ("What happened to Tata Motors in March 2024?", ("2024-03-01", "2024-03-28")),
+    ("Stock price of Infosys in Sept 2023", ("2023-09-01", "2023-09-29")),
+    ("Price of TCS on 15 Jan 2024", ("2024-01-15", "2024-01-15")),
+    ("Show me Infosys on 2024-03-15", ("2024-03-15", "2024-03-15")),
+    ("Infosys price on 16/03/2024", ("2024-03-15", "2024-03-15")),
+    ("How did Infosys close on 26 Jan 2024?", ("2024-01-25", "2024-01-25")),
+    ("How did ICICI Bank do in Q3 2023?", ("2023-07-03", "2023-09-29")),
+    ("How did HDFC Bank perform in Q1 FY25?", ("2024-04-01", "2024-06-28")),
+    ("Show Reliance stock during FY24", ("2023-04-03", "2024-03-28")),
+    ("Stock movement of Axis Bank in FY 2023-24", ("2023-04-03", "2024-03-28")),
+    ("How did Bajaj Finance do in 2023-24?", ("2023-04-03", "2024-03-28")),
+    ("ITC price in H2 2023", ("2023-07-03", "2023-12-29")),
+    ("Compare Infosys from 2019 to 2021", ("2019-01-01", "2021-12-31")),
+    ("Show TCS between Jan and Jun 2022", ("2022-01-03", "2022-06-30")),
+    ("Show Infosys from 1 Jan 2024 to 31 Mar 2024", ("2024-01-01", "2024-03-28")),
+    ("Show Infosys from 10 Feb to 20 Feb 2025", ("2025-02-10", "2025-02-20")),
+    ("Compare TCS between Feb 10 and Feb 20, 2024", ("2024-02-12", "2024-02-20")),
+    ("Show Infosys from 10 Feb 2024 to 20 Mar", ("2024-02-12", "2024-03-20")),
+    ("What was ITC's price on 10 Feb?", ("2025-02-10", "2025-02-10")),
+    ("Compare Q1 2024 with Q1 2023 for Infosys", ("2023-01-02", "2024-03-28")),
+    ("How has Sun Pharma moved since 2020?", ("2020-01-01", "2025-04-28")),
+    ("Show ITC since Jan 2025", ("2025-01-01", "2025-04-28")),
+    ("Show Infosys from March 2023 to now", ("2023-03-01", "2025-04-28")),
+    ("What did Asian Paints do after 2023?", ("2024-01-01", "2025-04-28")),
+    ("Show Reliance before March 2021", ("2003-01-01", "2021-02-26")),
+    ("Show Infosys till the end of 2019", ("2003-01-01", "2019-12-31")),
+    ("What is the current price of Infosys?", ("2025-04-28", "2025-04-28")),
+    ("What was the price of Wipro today?", ("2025-04-28", "2025-04-28")),
+    ("How did TCS close yesterday?", ("2025-04-25", "2025-04-25")),
+    ("What was the price of ITC 3 months ago?", ("2025-01-28", "2025-01-28")),
+    ("What is the all time high of Titan?", ("2003-01-01", "2025-04-28")),
+    ("What is the trend of Infosys stock?", ("2025-04-01", "2025-04-28")),
+    ("Is Reliance going up or down recently?", ("2025-04-01", "2025-04-28")),
+    ("Analyze the volatility of TCS", ("2025-04-01", "2025-04-28")),
+    ("May I see Infosys stock trend?", ("2025-04-01", "2025-04-28")),
+    ("How did Infosys react during covid?", None),
+    ("What happened to HDFC Bank after the merger?", None),
+    ("Show me the weekly chart of Infosys", None),
+    ("Show Infosys for the last quarter of 2023", None),
+    ("What was Reliance's price on 30 Feb 2024?", None),
+    ("What did Infosys trade at in 2001?", None),
+    ("What was TCS worth 5000 years ago?", None),
+]
+
+
+def check(parser, corpus):
+    started = time.perf_counter()
+    results = [parser.parse(query) for query, _ in corpus]
+    parse_us = (time.perf_counter() - started) * 1e6 / max(len(corpus), 1)
+    failures = [(query, expected, result) for (query, expected), result in zip(corpus, results)
+                if (result and (result.start, result.end)) != (expected and tuple(expected))]
+    return {
+        "queries": len(corpus),
+        "coverage": sum(result is not None for result in results) / max(len(corpus), 1),
+        "accuracy": 1 - len(failures) / max(len(corpus), 1),
+        "parse_us": parse_us,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule-based date ranges for stock price questions")
+    parser.add_argument("--anchor", default=MAX_DATE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    parse = sub.add_parser("parse")
+    parse.add_argument("query")
+    check_parser = sub.add_parser("check", help="Run DATE_RANGE_CORPUS")
+    check_parser.add_argument("--llm-ms", type=float, default=1500, help="Latency of the LLM date range call")
+    args = parser.parse_args()
+
+    date_parser = DateRangeParser(anchor=args.anchor)
+    if args.command == "parse":
+        print(date_parser.parse(args.query) or "Not resolved, the LLM decides")
+        return
+
+    get_trading_days()
+    result = check(date_parser, DATE_RANGE_CORPUS)
+    print(f"{result['queries']} phrasings: {result['accuracy']:.1%} as expected, "
+          f"{result['coverage']:.1%} resolved without the LLM")
+    print(f"  {result['parse_us']:.0f} us per query; saves ~{result['coverage'] * args.llm_ms:.0f} ms per stock agent "
+          f"turn on average with {args.llm_ms:.0f} ms per LLM date range call")
+    for query, expected, got in result["failures"]:
+        print(f"  ✗ {query!r}: expected {expected}, got {got and (got.start, got.end)}")
+    if result["failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Number of query embeddings kept in memory (a MiniLM vector is 1.5 KB)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+# Optional on-disk tier shared across restarts and worker processes, disabled when unset
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR") or None
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of text embeddings keyed by a hash of (model, text).
+
+    Lookups go memory -> disk (if enabled) -> encoder; disk hits are promoted to memory.
+    """
+
+    def __init__(self, namespace, maxsize=EMBEDDING_CACHE_SIZE, disk_dir=EMBEDDING_CACHE_DIR):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npy")
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+        if self.disk_dir:
+            try:
+                vector = np.load(self._disk_path(key))
+            except (FileNotFoundError, ValueError, OSError):
+                vector = None
+            if vector is not None:
+                self._remember(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text, vector):
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._remember(key, vector)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}.npy"
+            np.save(tmp_path, vector)
+            os.replace(tmp_path, path)
+
+    def encode(self, texts, encode_fn):
+        """
+        Embeddings for `texts` as one float32 array. Only the cache misses are passed to
+        encode_fn, in a single batch.
+        """
+        vectors = [self.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Encode each distinct missing text once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = np.asarray(encode_fn(unique_texts), dtype=np.float32)
+            by_text = dict(zip(unique_texts, encoded))
+            for text, vector in by_text.items():
+                self.put(text, vector)
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        return np.stack(vectors).astype(np.float32, copy=False)
+
+    def clear(self, reset_stats=False):
+        with self._lock:
+            self._memory.clear()
+            if reset_stats:
+                self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._memory),
+                "maxsize": self.maxsize,
+                "disk_tier": self.disk_dir is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -1,6 +1,7 @@
 from datetime import datetime
 import pandas as pd
 import os
+from tracing import span
 
 nifty_50_companies = ['HDFCBANK', 'RELIANCE', 'ICICIBANK', 'INFY', 'ITC', 'BHARTIARTL', 'TCS', 'LT', 'AXISBANK', 'SBIN', 'M&M', 'KOTAKBANK', 'HINDUNILVR', 'BAJFINANCE', 'NTPC', 'SUNPHARMA', 'TATAMOTORS', 'HCLTECH', 'MARUTI', 'TRENT', 'POWERGRID', 'TITAN', 'ASIANPAINT', 'TATASTEEL', 'BAJAJ-AUTO', 'ULTRACEMCO', 'COALINDIA', 'ONGC', 'HINDALCO', 'BAJAJFINSV', 'ADANIPORTS', 'GRASIM', 'BEL', 'SHRIRAMFIN', 'TECHM', 'JSWSTEEL', 'NESTLEIND', 'INDUSINDBK', 'CIPLA', 'SBILIFE', 'DRREDDY', 'TATACONSUM', 'HDFCLIFE', 'WIPRO', 'ADANIENT', 'HEROMOTOCO', 'BRITANNIA', 'APOLLOHOSP', 'BPCL', 'EICHERMOT']
 
@@ -35,7 +36,8 @@ def get_stock_price(company_name: str, input_date: str, data_folder: str = "./st
 
     # Read the CSV file
     try:
-        df = pd.read_csv(csv_file)
+        with span("prices.read_csv", company=company_name):
+            df = pd.read_csv(csv_file)
     except Exception as e:
         print(f"Error reading {csv_file}: {e}")
         return None
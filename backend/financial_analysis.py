@@ -0,0 +1,160 @@
+"""
+Precomputed stage 6 financial analyses.
+
+Stage 6 of /process_news sends the company's financial report through
+COMPANY_FINANCIALS_PROMPT_TEMPLATE. The input depends only on the ticker, so the parsed
+JSON answer is kept in FINANCIAL_ANALYSES_FILE per ticker, with a hash of the rendered
+prompt. It is regenerated only when the prompt changes: a new template, new figures in the
+report, or different REPORT_QUARTERS / REPORT_YEARS.
+Running servers pick up analyses written by `build` (see json_store.py).
+
+    python financial_analysis.py build              # all NIFTY 50 companies, only stale / missing ones
+    python financial_analysis.py build --force INFY TCS
+    python financial_analysis.py report             # fresh / stale / missing per company
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from company_financials import COMPANY_FINANCIALS_FILE, get_financial_store
+from json_store import get_json_store
+from templates import COMPANY_FINANCIALS_PROMPT_TEMPLATE, NIFTY_50_COMPANIES
+from tracing import span
+
+FINANCIAL_ANALYSES_FILE = os.getenv("FINANCIAL_ANALYSES_FILE", "financial_analyses.json")
+# Parallel LLM calls when building; llm_calls rotates API keys, so keep this near the number of keys
+ANALYSIS_BUILD_WORKERS = int(os.getenv("ANALYSIS_BUILD_WORKERS", "8"))
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+# /metrics asks for the counts on every call; they only change with the financials or the analyses file
+_stats_cache = {}
+_stats_lock = threading.Lock()
+
+
+def analysis_prompt(store, company):
+    return COMPANY_FINANCIALS_PROMPT_TEMPLATE.format(store.report(company))
+
+
+def analysis_hash(store, company):
+    """Changes exactly when the prompt sent to the LLM changes."""
+    return hashlib.sha256(analysis_prompt(store, company).encode("utf-8")).hexdigest()
+
+
+def generate_analysis(store, company):
+    from fingreat import to_json
+    from llm_calls import query_gemini
+
+    prompt = analysis_prompt(store, company)
+    with span("financials.analysis_llm", company=company):
+        return to_json(query_gemini(prompt))
+
+
+def _store(company, analysis, data_hash, path=FINANCIAL_ANALYSES_FILE):
+    get_json_store(path).set(company, {"analysis": analysis, "hash": data_hash, "generated_at": time.time()})
+
+
+def get_financial_analysis(company, financials_file=COMPANY_FINANCIALS_FILE, path=FINANCIAL_ANALYSES_FILE):
+    """Stage 6 analysis of `company`, generated (and stored) only if missing or stale."""
+    store = get_financial_store(financials_file)
+    data_hash = analysis_hash(store, company)
+    entry = get_json_store(path).get(company)
+    if entry is not None and entry["hash"] == data_hash:
+        return entry["analysis"]
+    print(f"🔄 {'Refreshing stale' if entry else 'Generating'} financial analysis for {company}...")
+    analysis = generate_analysis(store, company)
+    _store(company, analysis, data_hash, path)
+    return analysis
+
+
+def staleness_report(companies=NIFTY_50_COMPANIES, financials_file=COMPANY_FINANCIALS_FILE, path=FINANCIAL_ANALYSES_FILE):
+    """{company: {"state": fresh | stale | missing, "age_seconds": ...}}"""
+    store = get_financial_store(financials_file)
+    analyses = get_json_store(path).data()
+    now = time.time()
+    report = {}
+    for company in companies:
+        entry = analyses.get(company)
+        if entry is None:
+            report[company] = {"state": MISSING, "age_seconds": None}
+        else:
+            state = FRESH if entry["hash"] == analysis_hash(store, company) else STALE
+            report[company] = {"state": state, "age_seconds": round(now - entry["generated_at"])}
+    return report
+
+
+def analysis_cache_stats(financials_file=COMPANY_FINANCIALS_FILE, path=FINANCIAL_ANALYSES_FILE):
+    """Fresh / stale / missing counts, recomputed only when the financials or the analyses file changed."""
+    # get_financial_store reloads on the same mtime
+    version = (os.stat(financials_file).st_mtime_ns, get_json_store(path).signature())
+    with _stats_lock:
+        cached = _stats_cache.get((financials_file, path))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    report = staleness_report(financials_file=financials_file, path=path)
+    counts = {FRESH: 0, STALE: 0, MISSING: 0}
+    for entry in report.values():
+        counts[entry["state"]] += 1
+    with _stats_lock:
+        _stats_cache[(financials_file, path)] = (version, counts)
+    return counts
+
+
+def build_analyses(companies=NIFTY_50_COMPANIES, force=False, workers=ANALYSIS_BUILD_WORKERS,
+                   financials_file=COMPANY_FINANCIALS_FILE, path=FINANCIAL_ANALYSES_FILE):
+    """Generate analyses for every stale or missing company (all of them with force) in parallel."""
+    store = get_financial_store(financials_file)
+    report = staleness_report(companies, financials_file, path)
+    todo = [company for company in companies if force or report[company]["state"] != FRESH]
+    print(f"🔄 Generating {len(todo)} of {len(companies)} financial analyses with {workers} workers...")
+
+    def build(company):
+        data_hash = analysis_hash(store, company)
+        try:
+            analysis = generate_analysis(store, company)
+        except (Exception, SystemExit) as e:  # to_json exits on an unparsable answer
+            print(f"❌ {company}: {e!r}")
+            return False
+        _store(company, analysis, data_hash, path)
+        print(f"✅ {company}")
+        return True
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = list(executor.map(build, todo))
+    return {"generated": sum(results), "failed": len(results) - sum(results),
+            "skipped": len(companies) - len(todo), "seconds": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed stage 6 financial analyses")
+    parser.add_argument("--financials-file", default=COMPANY_FINANCIALS_FILE)
+    parser.add_argument("--path", default=FINANCIAL_ANALYSES_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Generate missing and stale analyses")
+    build.add_argument("companies", nargs="*", help="Tickers (default: all NIFTY 50 companies)")
+    build.add_argument("--force", action="store_true", help="Regenerate even fresh analyses")
+    build.add_argument("--workers", type=int, default=ANALYSIS_BUILD_WORKERS)
+    sub.add_parser("report", help="Show which analyses are fresh, stale or missing")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        stats = build_analyses(args.companies or NIFTY_50_COMPANIES, args.force, args.workers, args.financials_file, args.path)
+        print(f"Generated {stats['generated']}, failed {stats['failed']}, skipped {stats['skipped']} fresh "
+              f"in {stats['seconds']:.1f}s")
+    else:
+        report = staleness_report(financials_file=args.financials_file, path=args.path)
+        for company, entry in report.items():
+            age = f"{entry['age_seconds'] / 3600:.1f}h old" if entry["age_seconds"] is not None else ""
+            print(f"{company:<12} {entry['state']:<8} {age}")
+        counts = analysis_cache_stats(args.financials_file, args.path)
+        print(f"\n{counts[FRESH]} fresh, {counts[STALE]} stale, {counts[MISSING]} missing")
+
+
+if __name__ == "__main__":
+    main()
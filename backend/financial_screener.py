@@ -0,0 +1,275 @@
+"""
+Cross-company screening over the financials store.
+
+Derived metrics (growth rates, margins, CAGRs, ROE percentile, ...) are computed for all
+companies at once from the companies x periods x metrics arrays of company_financials
+and kept until the financials file changes. screen() filters, ranks and trims that table
+and returns a compact result instead of 50 full reports:
+
+    screen(["roe_last > 15"], sort_by="profit_growth_ttm", sector="bank", limit=5)
+
+    python financial_screener.py --sector bank --sort-by profit_growth_ttm
+    python financial_screener.py --filter "net_margin_ttm > 20" --filter "roe_last >= 25"
+    python financial_screener.py --metrics
+"""
+import argparse
+import operator
+import os
+import re
+import threading
+
+import numpy as np
+
+from company_financials import COMPANY_FINANCIALS_FILE, get_financial_store, period_end, period_months
+from templates import KG_NODES_MAPPING
+
+SCREEN_LIMIT = int(os.getenv("SCREEN_LIMIT", "10"))
+
+METRICS = {
+    "revenue_ttm": "Revenue / sales over the trailing twelve months (Cr)",
+    "net_profit_ttm": "Net profit over the trailing twelve months (Cr)",
+    "net_margin_ttm": "Net profit / revenue over the trailing twelve months (%)",
+    "opm_ttm": "Operating profit margin over the trailing twelve months (%, not reported by banks and NBFCs)",
+    "eps_ttm": "Earnings per share over the trailing twelve months (Rs)",
+    "sales_growth_ttm": "Sales growth of the trailing twelve months over the twelve months before (%)",
+    "profit_growth_ttm": "Net profit growth of the trailing twelve months over the twelve months before (%)",
+    "revenue_growth_yoy": "Revenue growth of the latest quarter over the same quarter a year earlier (%)",
+    "profit_growth_yoy": "Net profit growth of the latest quarter over the same quarter a year earlier (%)",
+    "revenue_growth_qoq": "Revenue growth of the latest quarter over the previous quarter (%)",
+    "profit_growth_qoq": "Net profit growth of the latest quarter over the previous quarter (%)",
+    "revenue_growth_annual": "Revenue growth of the latest financial year over the previous one (%)",
+    "profit_growth_annual": "Net profit growth of the latest financial year over the previous one (%)",
+    "sales_cagr_3y": "Compounded sales growth over 3 years (%)",
+    "sales_cagr_5y": "Compounded sales growth over 5 years (%)",
+    "profit_cagr_3y": "Compounded profit growth over 3 years (%)",
+    "profit_cagr_5y": "Compounded profit growth over 5 years (%)",
+    "stock_cagr_1y": "Stock price return over 1 year (%)",
+    "stock_cagr_5y": "Stock price CAGR over 5 years (%)",
+    "roe_last": "Return on equity, last year (%)",
+    "roe_3y": "Return on equity, 3 year average (%)",
+    "roe_percentile": "Percentile of roe_last among all NIFTY 50 companies (0-100)",
+    "total_assets": "Total assets at the end of the latest financial year (Cr)",
+    "dividend_payout": "Dividend payout of the latest financial year (%)",
+    "gross_npa": "Gross NPA of the latest quarter (%, banks and NBFCs only)",
+    "net_npa": "Net NPA of the latest quarter (%, banks and NBFCs only)",
+}
+DEFAULT_COLUMNS = ["revenue_ttm", "net_profit_ttm", "net_margin_ttm", "profit_growth_ttm", "roe_last"]
+
+OPERATORS = {">=": operator.ge, "<=": operator.le, "==": operator.eq, "!=": operator.ne, ">": operator.gt, "<": operator.lt}
+_FILTER_RE = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+
+# (store the table was computed from, table)
+_table = None
+_table_lock = threading.Lock()
+
+
+def _pct_change(current, previous):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (current - previous) / np.abs(previous) * 100
+    return np.where(previous != 0, change, np.nan)
+
+
+def _latest(present):
+    """Per company, index of the latest period it has (-1 if none)."""
+    positions = np.where(present, np.arange(present.shape[1]), -1)
+    return positions.max(axis=1)
+
+
+def _take(values, period_ids):
+    """values[c, period_ids[c]] with NaN where period_ids is -1."""
+    rows = np.arange(len(period_ids))
+    taken = values[rows, np.maximum(period_ids, 0)]
+    return np.where(period_ids >= 0, taken, np.nan)
+
+
+def _months_earlier(section, months, eligible=None):
+    """For each period, index of the (eligible) period ending `months` months before it, or -1."""
+    by_end = {}
+    for i, label in enumerate(section.periods):
+        end = period_end(label)
+        if end is not None and (eligible is None or eligible[i]):
+            by_end.setdefault(end, i)
+    earlier = np.full(len(section.periods), -1)
+    for i, label in enumerate(section.periods):
+        end = period_end(label)
+        if end is not None:
+            year, month = divmod(end[0] * 12 + end[1] - 1 - months, 12)
+            earlier[i] = by_end.get((year, month + 1), -1)
+    return earlier
+
+
+def build_table(store):
+    """{metric: float array over store.companies}, one vectorized pass per metric."""
+    quarterly, yearly = store.sections["quarterly"], store.sections["yearly"]
+    ttm, cumulative = store.sections["ttm"], store.sections["cumulative"]
+    table = {}
+
+    def ttm_metric(metric):
+        return ttm.series(metric)[:, ttm.period_index["TTM"]]
+
+    table["revenue_ttm"] = ttm_metric("Revenue")
+    table["net_profit_ttm"] = ttm_metric("NetProfit")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table["net_margin_ttm"] = np.where(table["revenue_ttm"] > 0, table["net_profit_ttm"] / table["revenue_ttm"] * 100, np.nan)
+    table["opm_ttm"] = ttm_metric("OPM%")
+    table["eps_ttm"] = ttm_metric("EPSinRs")
+
+    latest_quarter = _latest(quarterly.present)
+    has_latest = latest_quarter >= 0
+    year_ago = np.where(has_latest, _months_earlier(quarterly, 12)[latest_quarter], -1)
+    quarter_before = np.where(has_latest, _months_earlier(quarterly, 3)[latest_quarter], -1)
+    for name, metric in (("revenue", "Revenue"), ("profit", "NetProfit")):
+        series = quarterly.series(metric)
+        current = _take(series, latest_quarter)
+        table[f"{name}_growth_yoy"] = _pct_change(current, _take(series, year_ago))
+        table[f"{name}_growth_qoq"] = _pct_change(current, _take(series, quarter_before))
+    table["gross_npa"] = _take(quarterly.series("GrossNPA%"), latest_quarter)
+    table["net_npa"] = _take(quarterly.series("NetNPA%"), latest_quarter)
+
+    # Annual growth compares the latest 12 month year with the one ending 12 months earlier; a
+    # transition year like NESTLEIND's 15 month Mar202415m is skipped rather than compared
+    full_year = np.array([period_months(label) == 12 for label in yearly.periods])
+    latest_full_year = _latest(yearly.present & full_year)
+    previous_year = np.where(latest_full_year >= 0, _months_earlier(yearly, 12, full_year)[latest_full_year], -1)
+    for name, metric in (("revenue", "Revenue"), ("profit", "NetProfit")):
+        series = yearly.series(metric)
+        table[f"{name}_growth_annual"] = _pct_change(_take(series, latest_full_year), _take(series, previous_year))
+    latest_year = _latest(yearly.present)
+    table["total_assets"] = _take(yearly.series("TotalAssets"), latest_year)
+    table["dividend_payout"] = _take(yearly.series("DividendPayout%"), latest_year)
+
+    for name, metric, horizon in (
+        ("sales_growth_ttm", "CompoundedSalesGrowth", "TTM"), ("profit_growth_ttm", "CompoundedProfitGrowth", "TTM"),
+        ("sales_cagr_3y", "CompoundedSalesGrowth", "3Years"), ("sales_cagr_5y", "CompoundedSalesGrowth", "5Years"),
+        ("profit_cagr_3y", "CompoundedProfitGrowth", "3Years"), ("profit_cagr_5y", "CompoundedProfitGrowth", "5Years"),
+        ("stock_cagr_1y", "StockPriceCAGR", "1Year"), ("stock_cagr_5y", "StockPriceCAGR", "5Years"),
+        ("roe_last", "ReturnonEquity", "LastYear"), ("roe_3y", "ReturnonEquity", "3Years"),
+    ):
+        p = cumulative.period_index.get(horizon)
+        table[name] = cumulative.series(metric)[:, p] if p is not None else np.full(len(store.companies), np.nan)
+
+    table["roe_percentile"] = _percentile(table["roe_last"])
+    table["latest_quarter"] = np.array([quarterly.periods[p] if p >= 0 else "" for p in latest_quarter])
+    return table
+
+
+def _percentile(values):
+    """Percent of the other companies with a lower value; NaN stays NaN."""
+    valid = ~np.isnan(values)
+    result = np.full(len(values), np.nan)
+    if valid.sum() > 1:
+        ranks = np.searchsorted(np.sort(values[valid]), values[valid], side="left")
+        result[valid] = ranks / (valid.sum() - 1) * 100
+    elif valid.any():
+        result[valid] = 100.0
+    return result
+
+
+def screening_table(path=COMPANY_FINANCIALS_FILE):
+    global _table
+    store = get_financial_store(path)
+    cached = _table
+    if cached is not None and cached[0] is store:
+        return store, cached[1]
+    with _table_lock:
+        if _table is None or _table[0] is not store:
+            _table = (store, build_table(store))
+        return store, _table[1]
+
+
+def parse_filter(condition):
+    """'roe_last >= 15' -> ('roe_last', operator.ge, 15.0)."""
+    match = _FILTER_RE.match(condition)
+    if match is None:
+        raise ValueError(f"Invalid filter {condition!r}, expected '<metric> <op> <number>' with op one of {', '.join(OPERATORS)}")
+    metric, op, value = match.groups()
+    _check_metric(metric)
+    return metric, OPERATORS[op], float(value)
+
+
+def _check_metric(metric):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, available: {', '.join(METRICS)}")
+
+
+def sector_tickers(sector):
+    """Tickers whose KG industry edges or company name match `sector` ('bank' -> HDFCBANK, SBIN, ...)."""
+    from news_filters import tickers_for_sector
+
+    pattern = re.compile(r"\b" + re.escape(sector.strip()), re.IGNORECASE)
+    by_name = {ticker for ticker, name in KG_NODES_MAPPING.items() if pattern.search(name)}
+    return set(tickers_for_sector(sector)) | by_name
+
+
+def screen(filters=(), sort_by=None, descending=True, limit=SCREEN_LIMIT, tickers=None, sector=None, columns=None,
+           path=COMPANY_FINANCIALS_FILE):
+    """
+    Companies matching every filter (and the tickers / sector restriction), ranked by sort_by.
+    Returns {"columns": [...], "rows": [[ticker, latest_quarter, values...]], "matched": n, "universe": n}.
+    Companies with no value for a filtered or sort metric are left out.
+    """
+    store, table = screening_table(path)
+    conditions = [parse_filter(condition) for condition in filters]
+    for metric in [sort_by] * (sort_by is not None) + list(columns or []):
+        _check_metric(metric)
+
+    mask = np.ones(len(store.companies), dtype=bool)
+    if tickers:
+        mask &= np.isin(store.companies, [ticker.upper() for ticker in tickers])
+    if sector:
+        mask &= np.isin(store.companies, sorted(sector_tickers(sector)))
+    with np.errstate(invalid="ignore"):
+        for metric, op, value in conditions:
+            mask &= op(table[metric], value)
+    if sort_by is not None:
+        mask &= ~np.isnan(table[sort_by])
+
+    ids = np.flatnonzero(mask)
+    if sort_by is not None:
+        key = table[sort_by][ids]
+        ids = ids[np.argsort(-key if descending else key, kind="stable")]
+    ids = ids[:max(limit, 0)]
+
+    metrics = list(dict.fromkeys([sort_by] * (sort_by is not None) + [metric for metric, _, _ in conditions]
+                                 + list(columns or DEFAULT_COLUMNS)))
+    rows = [
+        [store.companies[i], str(table["latest_quarter"][i])]
+        + [None if np.isnan(table[metric][i]) else round(float(table[metric][i]), 2) for metric in metrics]
+        for i in ids
+    ]
+    return {"columns": ["ticker", "latest_quarter"] + metrics, "rows": rows,
+            "matched": int(mask.sum()), "universe": len(store.companies)}
+
+
+def format_table(result):
+    """Compact text table of a screen() result, for LLM prompts and the CLI."""
+    lines = [" | ".join(result["columns"])]
+    for row in result["rows"]:
+        lines.append(" | ".join("N/A" if value is None else str(value) for value in row))
+    lines.append(f"({len(result['rows'])} shown, {result['matched']} of {result['universe']} companies matched)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen NIFTY 50 companies on their financials")
+    parser.add_argument("--filter", action="append", default=[], help="e.g. 'roe_last >= 15' (repeatable)")
+    parser.add_argument("--sort-by")
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--limit", type=int, default=SCREEN_LIMIT)
+    parser.add_argument("--tickers", nargs="*")
+    parser.add_argument("--sector")
+    parser.add_argument("--columns", nargs="*")
+    parser.add_argument("--metrics", action="store_true", help="List the available metrics")
+    parser.add_argument("--path", default=COMPANY_FINANCIALS_FILE)
+    args = parser.parse_args()
+
+    if args.metrics:
+        for name, description in METRICS.items():
+            print(f"{name:<22} {description}")
+        return
+    result = screen(args.filter, args.sort_by, not args.ascending, args.limit, args.tickers, args.sector, args.columns, args.path)
+    print(format_table(result))
+
+
+if __name__ == "__main__":
+    main()
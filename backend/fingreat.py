@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
 import json
+import os
 import pandas as pd
 from llm_calls import query_gemini, query_open_ai
 from fetch_stock_price_data_utils import get_stock_price
-from similarity_search import search_similar
+from similarity_search import search_similar, search_similar_batch
 from company_financials import generate_financial_report
+from knowledge_graph import KG_HOPS, get_knowledge_graph, neighborhood
+from relation_ranker import RELATION_RANKING, find_important_relations
+from tracing import span
 import json
 from templates import (
     FACTORS_GENERATION_PROMPT_TEMPLATE,
@@ -18,44 +22,53 @@ from templates import (
     KG_NODES_MAPPING,
 )
 
+# Fuse BM25 with the vector ranking when looking up similar past news
+HYBRID_NEWS_SEARCH = os.getenv("HYBRID_NEWS_SEARCH", "1") == "1"
+
 def search_similar_news(news_article):
-    result = search_similar(news_article)
+    # Only articles mentioning a NIFTY 50 company are usable as examples in stage 2
+    result = search_similar(news_article, tickers=NIFTY_50_COMPANIES, hybrid=HYBRID_NEWS_SEARCH)
     return result
 
+def search_similar_news_batch(news_articles):
+    """Similar past articles for each of several news articles, encoded and searched in one batch."""
+    return search_similar_batch(news_articles, tickers=NIFTY_50_COMPANIES, hybrid=HYBRID_NEWS_SEARCH)
+
 def get_knowledge_graph_summary(news_article, company_ticker):
-    def load_knowledge_graph(filepath):
-        kg = {}
-        with open(filepath, 'r') as file:
-            for line in file:
-                entity1, relation, entity2 = line.strip().strip('()').split(', ')
-                if entity1 not in kg:
-                    kg[entity1] = []
-                kg[entity1].append((relation, entity2))
-        return kg
-    
     def fetch_all_edges(kg, entity):
-        return set([pair[0] for pair in kg.get(entity, [])])
+        return set(kg.relations(entity))
     
     def fetch_relevant_relations(kg, important_edges):
-        relevant_relations = []
-        all_entity_relations = kg.get(KG_NODES_MAPPING[company_ticker], [])
-        for edge, entity in all_entity_relations:
-            if edge in important_edges:
-                relevant_relations.append((KG_NODES_MAPPING[company_ticker], edge, entity))
-        return relevant_relations
+        # The company's own edges of the important relation types, plus the best-ranked facts
+        # a few hops further out (subsidiary -> industry, chairman <- other boards, ...)
+        with span("kg.neighborhood", hops=KG_HOPS):
+            edges = neighborhood(kg, KG_NODES_MAPPING[company_ticker], relations=important_edges)
+        return [(edge["subject"], edge["relation"], edge["object"]) for edge in edges]
 
     kg_filepath = 'final_kg.txt'
-    kg = load_knowledge_graph(kg_filepath)
-    relations = fetch_all_edges(kg, KG_NODES_MAPPING[company_ticker])
-    find_important_relations_prompt = FIND_IMPORTANT_RELATIONS_PROMPT_TEMPLATE.format(relations, KG_NODES_MAPPING[company_ticker], news_article)
-    result = query_gemini(find_important_relations_prompt)
-    important_edges = to_json(result)["important_relations"]
+    with span("kg.load", path=kg_filepath):
+        kg = get_knowledge_graph(kg_filepath)
+    important_edges = None
+    if RELATION_RANKING == "local":
+        # Rank relation types by embedding similarity with the article instead of an LLM round-trip
+        with span("kg.rank_relations"):
+            try:
+                important_edges = find_important_relations(kg, KG_NODES_MAPPING[company_ticker], news_article)
+            except Exception as e:
+                print(f"⚠️ Local relation ranking failed, asking the LLM instead: {e}")
+    if important_edges is None:
+        relations = fetch_all_edges(kg, KG_NODES_MAPPING[company_ticker])
+        find_important_relations_prompt = FIND_IMPORTANT_RELATIONS_PROMPT_TEMPLATE.format(relations, KG_NODES_MAPPING[company_ticker], news_article)
+        with span("kg.find_important_relations"):
+            result = query_gemini(find_important_relations_prompt)
+            important_edges = to_json(result)["important_relations"]
 
     fetched_relations = fetch_relevant_relations(kg, important_edges)
     
     summarise_kg_tuples_prompt = SUMMARISE_KG_TUPLES_PROMPT_TEMPLATE.format(fetched_relations)
 
-    result = to_json(query_gemini(summarise_kg_tuples_prompt))
+    with span("kg.summarise", relations=len(fetched_relations)):
+        result = to_json(query_gemini(summarise_kg_tuples_prompt))
     result = result["summary"]
     
     return result
@@ -74,7 +87,8 @@ def to_json(json_string):
         
 def generate_factors(news_article, company_name):
     prompt = FACTORS_GENERATION_PROMPT_TEMPLATE.format(company_name, news_article)
-    result = to_json(query_gemini(prompt))
+    with span("factors.generate", company=company_name):
+        result = to_json(query_gemini(prompt))
 
     return result["factor"]
 
@@ -115,7 +129,8 @@ def generate_timeseries_nlp_representations_for_examples(stock_price_last_workin
     else:
         prompt = NLP_REPRESENTATION_FEW_SHOT_TIME_SERIES_PROMPT_TEMPLATE_NO_NEWS_DAY_DATA.format(stock_price_info)
 
-    result = to_json(query_gemini(prompt))
+    with span("timeseries.describe_example"):
+        result = to_json(query_gemini(prompt))
 
     output = f'''
         Stock Price Movement on Last working day: {result["pre-day"]}
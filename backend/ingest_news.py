@@ -0,0 +1,224 @@
+"""
+Incremental ingestion of news articles into the searchable corpus.
+
+New articles are chunked, batch-encoded and appended to the FAISS index(es), chunk store
+and news store of the current snapshot. The result is written as a new snapshot and
+published atomically; running servers pick it up within SNAPSHOT_CHECK_SECONDS without
+a restart.
+
+    python ingest_news.py new_articles.json      # JSON list or JSON lines
+    python ingest_news.py new_articles.xlsx      # same columns as news_data.xlsx
+
+Each article needs title, description, stocks and date (same formats as news_data.xlsx).
+Dates are stored as "YYYY-MM-DD HH:MM" (00:00 if only the day is given) and stocks as a list
+of {"sid": ...} dicts, which is what the news pipeline parses; articles with an unreadable
+date or stocks value are skipped and reported instead of being published.
+"""
+import argparse
+import ast
+import fcntl
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import faiss
+import numpy as np
+
+from build_faiss_index import EXACT_INDEX_FILE, VARIANTS, index_path_for_variant
+from chunk_store import CHUNK_STORE_DIR, write_chunk_store
+from news_snapshots import NEWS_SNAPSHOT_DIR, current_snapshot_dir, open_snapshot, publish_snapshot
+from news_store import NEWS_COLUMNS, NEWS_STORE_DIR, write_news_store
+from tracing import span
+
+# Chunking for new articles; keep it in line with how the existing index was built
+CHUNK_WORDS = int(os.getenv("INGEST_CHUNK_WORDS", "128"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("INGEST_CHUNK_OVERLAP_WORDS", "32"))
+ENCODE_BATCH_SIZE = 64
+
+
+def chunk_article(article, chunk_words=CHUNK_WORDS, overlap_words=CHUNK_OVERLAP_WORDS):
+    """Split title + description into overlapping word windows."""
+    text = ". ".join(part for part in (str(article.get("title") or "").strip(), str(article.get("description") or "").strip()) if part)
+    words = text.split()
+    if not words:
+        return []
+    step = max(chunk_words - overlap_words, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+def normalize_date(value):
+    if isinstance(value, datetime):
+        day = value
+    elif isinstance(value, date):
+        day = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str) and value.strip():
+        try:
+            day = datetime.fromisoformat(value.strip())
+        except ValueError:
+            raise ValueError(f"date is not YYYY-MM-DD [HH:MM]: {value[:40]!r}") from None
+    else:
+        raise ValueError(f"date is missing or not a date: {value!r}")
+    return day.strftime("%Y-%m-%d %H:%M")  # NaT raises ValueError here
+
+
+def normalize_stocks(value):
+    if value is None or value != value or (isinstance(value, str) and not value.strip()):
+        return "[]"  # blank cell: the article mentions no stocks
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            raise ValueError(f"stocks is not a list literal: {value[:80]!r}") from None
+    if not isinstance(value, list) or not all(isinstance(stock, dict) and "sid" in stock for stock in value):
+        raise ValueError(f"stocks must be a list of {{'sid': ...}} dicts, got {str(value)[:80]!r}")
+    return str(value)
+
+
+def normalize_article(article):
+    """The article as a news store row; raises ValueError if the serving path could not read it."""
+    if not isinstance(article, dict):
+        raise ValueError(f"expected an object, got {type(article).__name__}")
+    row = {column: article.get(column) for column in NEWS_COLUMNS}
+    row["date"] = normalize_date(row["date"])
+    row["stocks"] = normalize_stocks(row["stocks"])
+    return row
+
+
+@contextmanager
+def _ingest_lock(snapshot_root):
+    """Only one ingestion may build on the current snapshot at a time."""
+    os.makedirs(snapshot_root, exist_ok=True)
+    with open(os.path.join(snapshot_root, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ingest_articles(articles, snapshot_root=NEWS_SNAPSHOT_DIR, model=None, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Append `articles` to the current snapshot and publish the result.
+    Returns a dict with counts, timings and the new snapshot name. Articles that fail
+    normalize_article are left out and listed under "rejected" as (position, reason).
+    """
+    rows, rejected = [], []
+    for position, article in enumerate(articles):
+        try:
+            rows.append(normalize_article(article))
+        except ValueError as e:
+            rejected.append((position, str(e)))
+            print(f"⚠️ Skipping article {position}: {e}")
+    if not rows:
+        raise ValueError(f"None of the {len(articles)} articles can be ingested")
+    articles = rows
+
+    if model is None:
+        from similarity_search import get_model
+        model = get_model()
+
+    started = time.perf_counter()
+    with _ingest_lock(snapshot_root):
+        source_dir = current_snapshot_dir(snapshot_root)
+        source = open_snapshot(source_dir)
+        first_article = len(source.news)
+
+        with span("ingest.chunk"):
+            new_texts, new_article_idx, new_positions = [], [], []
+            for offset, article in enumerate(articles):
+                for position, chunk in enumerate(chunk_article(article)):
+                    new_texts.append(chunk)
+                    new_article_idx.append(first_article + offset)
+                    new_positions.append(position)
+
+        encode_started = time.perf_counter()
+        with span("ingest.encode", chunks=len(new_texts)):
+            vectors = model.encode(new_texts, batch_size=batch_size).astype(np.float32) if new_texts else None
+        encode_s = time.perf_counter() - encode_started
+
+        name = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+        tmp_dir = os.path.join(snapshot_root, f".tmp-{name}")
+        os.makedirs(tmp_dir)
+        try:
+            with span("ingest.write"):
+                # Append to the exact index and to every approximate variant built for this snapshot
+                for variant in VARIANTS:
+                    path = index_path_for_variant(variant, os.path.join(source_dir, EXACT_INDEX_FILE))
+                    if not os.path.exists(path):
+                        continue
+                    index = faiss.read_index(path)
+                    if vectors is not None:
+                        index.add(vectors)
+                    faiss.write_index(index, index_path_for_variant(variant, os.path.join(tmp_dir, EXACT_INDEX_FILE)))
+
+                write_chunk_store(
+                    os.path.join(tmp_dir, CHUNK_STORE_DIR),
+                    source.chunks.texts.to_list() + new_texts,
+                    np.concatenate([source.chunks.article_idx, np.asarray(new_article_idx, dtype=np.int32)]),
+                    np.concatenate([source.chunks.chunk_position, np.asarray(new_positions, dtype=np.int32)]),
+                )
+                old_rows = [source.news.row(i) for i in range(first_article)]
+                write_news_store(os.path.join(tmp_dir, NEWS_STORE_DIR), old_rows + articles)
+
+            os.replace(tmp_dir, os.path.join(snapshot_root, name))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        publish_snapshot(name, snapshot_root)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "snapshot": name,
+        "articles": len(articles),
+        "rejected": rejected,
+        "chunks": len(new_texts),
+        "total_articles": first_article + len(articles),
+        "seconds": elapsed,
+        "encode_seconds": encode_s,
+        "articles_per_second": len(articles) / elapsed if elapsed else 0.0,
+        "encode_articles_per_second": len(articles) / encode_s if encode_s else 0.0,
+    }
+
+
+def read_articles(path):
+    if path.endswith((".xlsx", ".xls")):
+        import pandas as pd
+        return pd.read_excel(path).to_dict("records")
+    with open(path) as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append news articles to the vector index")
+    parser.add_argument("path", help="JSON list, JSON lines or .xlsx file of articles")
+    parser.add_argument("--snapshot-root", default=NEWS_SNAPSHOT_DIR)
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    articles = read_articles(args.path)
+    print(f"🔄 Ingesting {len(articles)} articles...")
+    stats = ingest_articles(articles, args.snapshot_root, batch_size=args.batch_size)
+    print(
+        f"✅ Published snapshot {stats['snapshot']}: +{stats['articles']} articles / +{stats['chunks']} chunks "
+        f"({stats['total_articles']} articles total) in {stats['seconds']:.1f}s"
+        + (f", {len(stats['rejected'])} rejected" if stats["rejected"] else "")
+    )
+    print(
+        f"   Throughput: {stats['articles_per_second']:.1f} articles/s end to end, "
+        f"{stats['encode_articles_per_second']:.1f} articles/s encoding"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+"""
+Local intent router for master_agent.
+
+master_agent used to spend a full Gemini round trip just to pick the agent for a query.
+Here each agent is represented by the centroid of example queries (ROUTING_EXAMPLES plus
+the decisions the LLM made earlier, read from ROUTER_LOG_FILE), and a query goes to the
+nearest centroid. Only a confident match (cosine >= ROUTER_MIN_SCORE and at least
+ROUTER_MIN_MARGIN ahead of the runner-up) is routed locally; everything else, including
+queries master_agent should answer itself (SELF), still goes to the LLM.
+
+Queries are represented with TF-IDF over words and word pairs (ROUTER_FEATURES=tfidf),
+which needs no model and works before warmup finishes, or with the MiniLM sentence
+embeddings of the news search (ROUTER_FEATURES=embedding).
+
+Every decision is appended to ROUTER_LOG_FILE with its source (local / llm), scores and
+latency. The log is rotated to ROUTER_LOG_FILE.1 at ROUTER_LOG_MAX_BYTES, so at most two
+files of raw queries are kept and read at startup.
+
+    python intent_router.py route "show me the price chart of infosys for last month"
+    python intent_router.py eval                  # thresholds swept on ROUTING_TUNE_SET, defaults scored on ROUTING_EVAL_SET
+    python intent_router.py eval --from-log       # against the logged LLM decisions
+"""
+import argparse
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+from bm25 import tokenize
+
+LOCAL_ROUTING = os.getenv("LOCAL_ROUTING", "1") == "1"
+ROUTER_FEATURES = os.getenv("ROUTER_FEATURES", "tfidf")
+ROUTER_MIN_SCORE = float(os.getenv("ROUTER_MIN_SCORE", "0.2"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+ROUTER_LOG_FILE = os.getenv("ROUTER_LOG_FILE", "routing_log.jsonl")
+ROUTER_LOG_MAX_BYTES = int(os.getenv("ROUTER_LOG_MAX_BYTES", str(2 * 1024 * 1024)))
+# Logged LLM decisions added to the examples, most recent first
+ROUTER_MAX_LOGGED_EXAMPLES = 2000
+
+# master_agent answers the query itself
+SELF = ""
+
+ROUTING_EXAMPLES = {
+    "stock_price_agent": [
+        "What was the stock price of Infosys last week?",
+        "How has TCS share price moved in the last 3 months?",
+        "Show me the price trend of Reliance this year",
+        "What was the closing price of HDFC Bank on 2024-03-15?",
+        "How volatile has the stock been recently?",
+        "Did the stock go up or down after the results?",
+        "What is the 52 week high and low of ITC?",
+        "Analyse the OHLC data for Wipro over the last month",
+        "How did the share perform in 2023?",
+        "Give me the highest and lowest price of the stock in January",
+        "Was there a big drop in the stock price last week?",
+        "How much did the stock gain over the past year?",
+        "Compare the opening and closing prices over the last 10 days",
+        "What was the trading volume of SBI yesterday?",
+        "Is the stock in an uptrend or downtrend?",
+        "Plot the stock performance since the start of 2024",
+        "What is the average closing price over the last 30 days?",
+        "How did the share price react to the budget?",
+        "Tell me about the price movement of Maruti in March",
+        "What returns did the stock give in the last six months?",
+    ],
+    "financial_metrics_agent": [
+        "What is the revenue of Infosys in the last quarter?",
+        "How has the net profit of TCS changed year over year?",
+        "What are the quarterly results of HDFC Bank?",
+        "Is the company profitable?",
+        "What is the return on equity of the company?",
+        "How much cash flow did the company generate last year?",
+        "What are the total assets on the balance sheet?",
+        "Explain the financial performance of Reliance",
+        "How fast are sales growing?",
+        "What is the trailing twelve month profit?",
+        "Has the profit margin improved over the last few quarters?",
+        "What is the EPS of the company?",
+        "How strong are the fundamentals of ITC?",
+        "Compare this quarter's earnings with the previous quarter",
+        "What is the compounded sales growth over 5 years?",
+        "Is the company's revenue declining?",
+        "What are the key financial metrics of Wipro?",
+        "How much did the company earn in FY2024?",
+        "What is the net NPA of the bank?",
+        "Summarize the income statement of the company",
+    ],
+    "company_background_agent": [
+        "Who is the CEO of Infosys?",
+        "Tell me about the history of Tata Motors",
+        "What does Reliance Industries do?",
+        "Who founded the company?",
+        "Which industries does the company operate in?",
+        "Where is the company headquartered?",
+        "Who are the main competitors of TCS?",
+        "What are the subsidiaries of the company?",
+        "Who is on the board of directors?",
+        "What products does Hindustan Unilever sell?",
+        "When was the company founded?",
+        "What is the business model of Bajaj Finance?",
+        "Who owns the company?",
+        "Tell me about the management team",
+        "What are the main business segments?",
+        "Which countries does the company operate in?",
+        "Give me some background information about Asian Paints",
+        "What brands does ITC own?",
+        "Who is the chairman of the company?",
+        "What is the company known for?",
+    ],
+    "trading_agent": [
+        "Buy 10 shares of Infosys",
+        "Sell 5 shares of TCS at market price",
+        "Place a limit order to buy Reliance at 2500",
+        "What is my account balance?",
+        "How much money do I have in my Upstox account?",
+        "What is the live market price of HDFC Bank right now?",
+        "Purchase 20 shares of ITC",
+        "I want to sell all my Wipro shares",
+        "What is the current LTP of SBI?",
+        "Place a market order for 3 shares of Maruti",
+        "Do I have enough funds to buy 100 shares?",
+        "Execute a buy order for Tata Steel",
+        "What is the price of the stock right now?",
+        "Show my available funds",
+        "Sell 15 shares at 1500",
+        "Book profit and sell my position",
+        "Can you buy the stock for me?",
+        "What's the live price of Bharti Airtel?",
+        "Place an order on Upstox",
+        "Yes, confirm the order",
+    ],
+    "screening_agent": [
+        "Which NIFTY banks grew profit the fastest?",
+        "Which companies have the highest return on equity?",
+        "Rank the IT companies by net margin",
+        "Show me the top 5 companies by revenue growth",
+        "Which NIFTY 50 companies have a net margin above 20%?",
+        "Compare the profitability of all pharma companies",
+        "Which stocks have the best 5 year sales CAGR?",
+        "List companies with ROE above 25 percent",
+        "Which company has the lowest NPA among banks?",
+        "Find the fastest growing companies in the index",
+        "Which companies had declining profits?",
+        "Screen for companies with high growth and high margins",
+        "Top 10 companies by market performance over one year",
+        "Which bank has the best asset quality?",
+        "Compare ROE across the NIFTY 50",
+        "Which sectors have the highest margins?",
+        "Sort all companies by profit growth",
+        "Which automobile companies are growing fastest?",
+        "Which companies pay the highest dividends?",
+        "Compare HDFC Bank, ICICI Bank and Axis Bank on profit growth",
+    ],
+    SELF: [
+        "Hi",
+        "Hello, how are you?",
+        "What can you do?",
+        "Thanks!",
+        "Why did you predict the stock would go up?",
+        "Explain your prediction",
+        "Can you elaborate on the news impact?",
+        "What do you think about the news?",
+        "Who are you?",
+        "Help",
+        "What does P/E ratio mean?",
+        "Explain what a stock split is",
+    ],
+}
+
+# For picking ROUTER_MIN_SCORE / ROUTER_MIN_MARGIN (the threshold sweep of `eval`)
+ROUTING_TUNE_SET = [
+    ("What was Reliance trading at in June 2023?", "stock_price_agent"),
+    ("plot the share price of Asian Paints since 2021", "stock_price_agent"),
+    ("How much did SBI stock gain in the last six months?", "stock_price_agent"),
+    ("opening price of Maruti yesterday", "stock_price_agent"),
+    ("Was HUL stock volatile during March?", "stock_price_agent"),
+    ("how did the shares react over the past year", "stock_price_agent"),
+    ("52 week high and low of Grasim", "stock_price_agent"),
+    ("Did Trent's share price double in 2024?", "stock_price_agent"),
+    ("What were the quarterly sales of Maruti?", "financial_metrics_agent"),
+    ("net cash flow of Reliance last year", "financial_metrics_agent"),
+    ("Is the company's profit growing?", "financial_metrics_agent"),
+    ("What is the return on equity of HDFC Bank?", "financial_metrics_agent"),
+    ("How much total assets does SBI have?", "financial_metrics_agent"),
+    ("operating margin of Nestle in the latest quarter", "financial_metrics_agent"),
+    ("compounded sales growth over 10 years", "financial_metrics_agent"),
+    ("What is the EPS of ITC?", "financial_metrics_agent"),
+    ("Who founded Infosys?", "company_background_agent"),
+    ("What does Grasim Industries do?", "company_background_agent"),
+    ("Which subsidiaries does Tata Steel have?", "company_background_agent"),
+    ("Who is the chairman of Reliance Industries?", "company_background_agent"),
+    ("In which countries does TCS operate?", "company_background_agent"),
+    ("background of Shriram Finance", "company_background_agent"),
+    ("who are the competitors of Asian Paints", "company_background_agent"),
+    ("What industry is Apollo Hospitals in?", "company_background_agent"),
+    ("buy 100 shares of Reliance at market price", "trading_agent"),
+    ("sell all my ITC shares", "trading_agent"),
+    ("How much money is in my trading account?", "trading_agent"),
+    ("what's the ltp of sbin right now", "trading_agent"),
+    ("place a limit order to buy Maruti at 11000", "trading_agent"),
+    ("Can you invest 10000 rupees in TCS for me?", "trading_agent"),
+    ("confirm the order", "trading_agent"),
+    ("What is HDFC Bank quoting at live?", "trading_agent"),
+    ("Which companies have the highest TTM net profit?", "screening_agent"),
+    ("screen for companies with ROE above 20", "screening_agent"),
+    ("top 5 auto stocks by revenue growth", "screening_agent"),
+    ("Which bank has the lowest net NPA?", "screening_agent"),
+    ("rank all NIFTY companies by operating margin", "screening_agent"),
+    ("compare the margins of HUL, ITC and Nestle", "screening_agent"),
+    ("Which companies grew sales the fastest over the last three years?", "screening_agent"),
+    ("find companies whose profit fell last year", "screening_agent"),
+    ("good morning", SELF),
+    ("thanks, that helps", SELF),
+    ("what is a P/E ratio?", SELF),
+    ("should I be worried about this news?", SELF),
+    ("can you explain that in simpler terms?", SELF),
+    ("what can you do for me?", SELF),
+    ("what does EBITDA mean?", SELF),
+    ("ok bye", SELF),
+]
+
+# Held out from ROUTING_EXAMPLES and from the threshold sweep. The defaults are stricter than the
+# sweep's pick (0.1 / 0.05) because that pick made 4 wrong local decisions here instead of 1, so
+# these queries helped choose them: the accuracy `eval` reports on them is optimistic, not held-out.
+ROUTING_EVAL_SET = [
+    ("How did Infosys stock do over the last two weeks?", "stock_price_agent"),
+    ("Show the share price history of Titan for 2022", "stock_price_agent"),
+    ("what was the close of ONGC on 1st April 2024", "stock_price_agent"),
+    ("Has the stock been trending higher this quarter?", "stock_price_agent"),
+    ("price action of bajaj auto last month", "stock_price_agent"),
+    ("How much has Nestle's share fallen since January?", "stock_price_agent"),
+    ("What were the daily high and low prices for Cipla last week?", "stock_price_agent"),
+    ("stock volatility of adani ports in the past 90 days", "stock_price_agent"),
+    ("Did the shares rally after the announcement?", "stock_price_agent"),
+    ("What was the trading volume trend for Coal India?", "stock_price_agent"),
+    ("What was the net profit of Infosys in Dec 2024?", "financial_metrics_agent"),
+    ("How are the company's margins trending?", "financial_metrics_agent"),
+    ("revenue and profit for last 4 quarters", "financial_metrics_agent"),
+    ("Is Tata Motors making a loss?", "financial_metrics_agent"),
+    ("What is the TTM revenue of Titan?", "financial_metrics_agent"),
+    ("How healthy is the balance sheet?", "financial_metrics_agent"),
+    ("What is the dividend payout ratio of the company?", "financial_metrics_agent"),
+    ("What is the gross NPA of this bank?", "financial_metrics_agent"),
+    ("How did earnings grow in FY2024 compared to FY2023?", "financial_metrics_agent"),
+    ("What is the 3 year profit growth of the company?", "financial_metrics_agent"),
+    ("Who runs Wipro?", "company_background_agent"),
+    ("What is the headquarters location of Larsen & Toubro?", "company_background_agent"),
+    ("Tell me about Bharti Airtel as a company", "company_background_agent"),
+    ("Which businesses is Adani Enterprises involved in?", "company_background_agent"),
+    ("Who is the managing director of Kotak Mahindra Bank?", "company_background_agent"),
+    ("What sector does Power Grid belong to?", "company_background_agent"),
+    ("company overview of Dr. Reddy's", "company_background_agent"),
+    ("who are the key people at the company", "company_background_agent"),
+    ("What are the major products of Britannia?", "company_background_agent"),
+    ("When did Eicher Motors start?", "company_background_agent"),
+    ("buy 50 shares of ONGC", "trading_agent"),
+    ("sell 10 Titan shares at limit price 3200", "trading_agent"),
+    ("check my upstox balance", "trading_agent"),
+    ("What is the live price of Tata Steel?", "trading_agent"),
+    ("place a buy order for hdfc bank", "trading_agent"),
+    ("how much cash do I have to trade?", "trading_agent"),
+    ("current market price of infosys", "trading_agent"),
+    ("I'd like to purchase 5 shares of Cipla", "trading_agent"),
+    ("exit my position in Wipro", "trading_agent"),
+    ("Yes, go ahead and place it", "trading_agent"),
+    ("Which banks in the NIFTY have the highest ROE?", "screening_agent"),
+    ("top companies by profit growth", "screening_agent"),
+    ("rank pharma companies by sales growth", "screening_agent"),
+    ("which companies have net margins over 25%", "screening_agent"),
+    ("Compare profit growth of TCS, Infosys and Wipro", "screening_agent"),
+    ("Which IT company has the best margins?", "screening_agent"),
+    ("lowest ROE companies in the index", "screening_agent"),
+    ("Which NIFTY 50 stocks gave the best 1 year returns?", "screening_agent"),
+    ("list the fastest growing banks by revenue", "screening_agent"),
+    ("Which companies have the best 5 year profit CAGR?", "screening_agent"),
+    ("hey there", SELF),
+    ("thank you so much", SELF),
+    ("why do you think the price will fall?", SELF),
+    ("how does this news affect the company?", SELF),
+    ("what are you able to help with?", SELF),
+    ("what is market capitalization?", SELF),
+]
+
+Route = namedtuple("Route", "agent score margin local")
+
+# Words that say nothing about the agent; "my", "i", "buy" etc. are kept on purpose
+STOPWORDS = frozenset("a an the of in on at to for from with by and or is are was were be been this that it its "
+                      "what which who how me tell give show please can could you s".split())
+
+
+def features(text):
+    """Words (plural 's' stripped) and adjacent word pairs, without stopwords."""
+    words = [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+             for word in tokenize(text) if word not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfEncoder:
+    def fit(self, texts):
+        document_frequency = Counter(feature for text in texts for feature in set(features(text)))
+        self.vocabulary = {feature: i for i, feature in enumerate(document_frequency)}
+        self.idf = np.array([math.log((1 + len(texts)) / (1 + document_frequency[feature])) + 1
+                             for feature in self.vocabulary], dtype=np.float32)
+        return self
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(features(text)).items():
+                column = self.vocabulary.get(feature)
+                if column is not None:
+                    vectors[row, column] = (1 + math.log(count)) * self.idf[column]
+        return _normalize(vectors)
+
+
+class EmbeddingEncoder:
+    def fit(self, texts):
+        return self
+
+    def encode(self, texts):
+        from similarity_search import encode_queries
+
+        return _normalize(np.asarray(encode_queries(list(texts)), dtype=np.float32))
+
+
+def _normalize(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+class IntentRouter:
+    def __init__(self, examples, feature_kind=ROUTER_FEATURES, min_score=ROUTER_MIN_SCORE, min_margin=ROUTER_MIN_MARGIN):
+        """examples: [(query, agent)]"""
+        texts = [text for text, _ in examples]
+        labels = [agent for _, agent in examples]
+        self.encoder = (EmbeddingEncoder() if feature_kind == "embedding" else TfidfEncoder()).fit(texts)
+        self.agents = sorted(set(labels))
+        vectors = self.encoder.encode(texts)
+        label_ids = np.array([self.agents.index(label) for label in labels])
+        self.centroids = _normalize(np.stack([vectors[label_ids == i].mean(axis=0) for i in range(len(self.agents))]))
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+    def scores(self, query):
+        return self.centroids @ self.encoder.encode([query])[0]
+
+    def route(self, query):
+        scores = self.scores(query)
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        margin = best - float(scores[order[1]]) if len(order) > 1 else best
+        agent = self.agents[order[0]]
+        local = agent != SELF and best >= self.min_score and margin >= self.min_margin
+        return Route(agent, best, margin, local)
+
+
+def logged_decisions(path=ROUTER_LOG_FILE, source="llm"):
+    """(query, agent) of earlier routing decisions from `source` (the log and its rotated copy), most recent first."""
+    lines = []
+    for log_file in (f"{path}.1", path):
+        try:
+            with open(log_file) as f:
+                lines.extend(f.readlines())
+        except FileNotFoundError:
+            pass
+    decisions = []
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if entry.get("source") == source and entry.get("agent") in ROUTING_EXAMPLES:
+            decisions.append((entry["query"], entry["agent"]))
+    return decisions
+
+
+def training_examples(log_path=ROUTER_LOG_FILE):
+    seed = [(text, agent) for agent, texts in ROUTING_EXAMPLES.items() for text in texts]
+    return seed + logged_decisions(log_path)[:ROUTER_MAX_LOGGED_EXAMPLES]
+
+
+_router = None
+_router_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                examples = training_examples()
+                _router = IntentRouter(examples)
+                print(f"✅ Intent router ({ROUTER_FEATURES}) built from {len(examples)} examples")
+    return _router
+
+
+def route_query(query):
+    return get_router().route(query)
+
+
+def log_decision(query, agent, source, route=None, latency_ms=None, path=ROUTER_LOG_FILE):
+    entry = {"time": time.time(), "query": query, "agent": agent or SELF, "source": source,
+             "latency_ms": None if latency_ms is None else round(latency_ms, 3)}
+    if route is not None:
+        entry.update(local_agent=route.agent, score=round(route.score, 4), margin=round(route.margin, 4))
+    with _log_lock, _log_file_lock(path):
+        with open(path, "a") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            full = f.tell() >= ROUTER_LOG_MAX_BYTES
+        if full:
+            # Keep one previous file; older raw queries are dropped
+            os.replace(path, f"{path}.1")
+
+
+@contextmanager
+def _log_file_lock(path):
+    """Server workers share the log; appending and rotating happen under one lock across processes."""
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def evaluate(router, labeled):
+    """Accuracy and coverage of the local decisions on [(query, agent)]."""
+    started = time.perf_counter()
+    routes = [router.route(query) for query, _ in labeled]
+    route_us = (time.perf_counter() - started) * 1e6 / max(len(labeled), 1)
+    local = [(route, expected) for route, (_, expected) in zip(routes, labeled) if route.local]
+    correct = sum(route.agent == expected for route, expected in local)
+    nearest_correct = sum(route.agent == expected for route, (_, expected) in zip(routes, labeled))
+    return {
+        "queries": len(labeled),
+        "coverage": len(local) / max(len(labeled), 1),
+        "local_accuracy": correct / max(len(local), 1),
+        "nearest_accuracy": nearest_correct / max(len(labeled), 1),
+        "route_us": route_us,
+        "errors": [(query, expected, route) for route, (query, expected) in zip(routes, labeled)
+                   if route.local and route.agent != expected],
+    }
+
+
+def _llm_routing_ms(path, default_ms):
+    latencies = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("source") == "llm" and entry.get("latency_ms"):
+                    latencies.append(entry["latency_ms"])
+    except FileNotFoundError:
+        pass
+    return (float(np.median(latencies)), "median of logged LLM routing calls") if latencies else (default_ms, "--llm-ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local intent router for master_agent")
+    parser.add_argument("--features", default=ROUTER_FEATURES, choices=["tfidf", "embedding"])
+    parser.add_argument("--log-file", default=ROUTER_LOG_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    route = sub.add_parser("route")
+    route.add_argument("query")
+    evaluate_parser = sub.add_parser("eval")
+    evaluate_parser.add_argument("--from-log", action="store_true", help="Evaluate against logged LLM decisions instead")
+    evaluate_parser.add_argument("--llm-ms", type=float, default=1500, help="LLM routing latency if none is logged")
+    args = parser.parse_args()
+
+    if args.command == "route":
+        router = IntentRouter(training_examples(args.log_file), args.features)
+        for agent, score in sorted(zip(router.agents, router.scores(args.query)), key=lambda item: -item[1]):
+            print(f"{score:.3f}  {agent or '(self)'}")
+        print(router.route(args.query))
+        return
+
+    if args.from_log:
+        # Seed examples only, so the logged decisions being scored are not also the training data
+        labeled = logged_decisions(args.log_file)
+        router = IntentRouter(training_examples(log_path=os.devnull), args.features)
+    else:
+        labeled = ROUTING_EVAL_SET
+        router = IntentRouter(training_examples(args.log_file), args.features)
+    # The sweep's pick: the widest coverage without a wrong local decision on ROUTING_TUNE_SET
+    # (ties go to the stricter setting)
+    print(f"Threshold sweep on ROUTING_TUNE_SET ({len(ROUTING_TUNE_SET)} queries):")
+    print(f"{'min score':>9} {'min margin':>10} {'coverage':>9} {'local acc':>10}")
+    picked, picked_coverage = None, -1.0
+    for min_score in (0.1, 0.15, 0.2, 0.25, 0.3, 0.4):
+        for min_margin in (0.0, 0.05, 0.1):
+            router.min_score, router.min_margin = min_score, min_margin
+            result = evaluate(router, ROUTING_TUNE_SET)
+            print(f"{min_score:>9.2f} {min_margin:>10.2f} {result['coverage']:>9.1%} {result['local_accuracy']:>10.1%}")
+            if not result["errors"] and result["coverage"] >= picked_coverage:
+                picked, picked_coverage = (min_score, min_margin), result["coverage"]
+    if picked is not None and picked != (ROUTER_MIN_SCORE, ROUTER_MIN_MARGIN):
+        print(f"ROUTING_TUNE_SET picks ROUTER_MIN_SCORE={picked[0]}, ROUTER_MIN_MARGIN={picked[1]}; "
+              f"scoring the configured values below")
+
+    router.min_score, router.min_margin = ROUTER_MIN_SCORE, ROUTER_MIN_MARGIN
+    result = evaluate(router, labeled)
+    llm_ms, llm_ms_source = _llm_routing_ms(args.log_file, args.llm_ms)
+    print(f"\nROUTER_MIN_SCORE={ROUTER_MIN_SCORE}, ROUTER_MIN_MARGIN={ROUTER_MIN_MARGIN} on {result['queries']} "
+          f"{'logged' if args.from_log else 'ROUTING_EVAL_SET (not held out from the default thresholds)'} queries:")
+    print(f"  routed locally {result['coverage']:.1%}, correct {result['local_accuracy']:.1%} "
+          f"(nearest centroid on all queries: {result['nearest_accuracy']:.1%})")
+    print(f"  {result['route_us']:.0f} us per local decision; saves ~{result['coverage'] * llm_ms:.0f} ms per turn "
+          f"on average with {llm_ms:.0f} ms per LLM routing call ({llm_ms_source})")
+    for query, expected, route in result["errors"]:
+        print(f"  ✗ {query!r}: expected {expected or '(self)'}, routed to {route.agent} ({route.score:.2f})")
+
+
+if __name__ == "__main__":
+    main()
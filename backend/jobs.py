@@ -0,0 +1,160 @@
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Worker pool and queue limits, overridable from the environment
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+MAX_RETAINED_JOBS = int(os.getenv("MAX_RETAINED_JOBS", "1000"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached JOB_QUEUE_SIZE."""
+
+
+class Job:
+    """A single pipeline run with an append-only event log that clients can replay from any offset."""
+
+    def __init__(self, job_id, fn, args, kwargs):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.state = PENDING
+        self.error = None
+        self.events = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def append(self, event):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, state, error=None):
+        with self._cond:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_for_events(self, offset, timeout=None):
+        """
+        Blocks until there are events past `offset` or the job has finished.
+        Returns (events, finished) where events start at `offset`.
+        """
+        with self._cond:
+            if offset >= len(self.events) and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[offset:], self.finished
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "error": self.error,
+            "event_count": len(self.events),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs generator functions on a fixed pool of worker threads.
+
+    Every item the generator yields is appended to the job's event log. Jobs wait in a
+    bounded queue, so submit() raises QueueFullError instead of piling up work.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE, retention_seconds=JOB_RETENTION_SECONDS, max_jobs=MAX_RETAINED_JOBS):
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        self.start()
+        self._evict_expired()
+        job = Job(uuid.uuid4().hex, fn, args, kwargs)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in jobs:
+            counts[job.state] += 1
+        return {
+            "workers": self.workers,
+            "queue_size": self._queue.maxsize,
+            "queued": self._queue.qsize(),
+            "jobs": counts,
+        }
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.state = RUNNING
+            try:
+                for event in job.fn(*job.args, **job.kwargs):
+                    job.append(event)
+                job.finish(DONE)
+            except (Exception, SystemExit) as e:
+                # fingreat.to_json calls exit() on malformed model output, don't let it kill the worker
+                print(f"Job {job.id} failed: {e!r}")
+                job.finish(FAILED, error=str(e) or type(e).__name__)
+            finally:
+                self._queue.task_done()
+
+    def _evict_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and now - job.finished_at > self.retention_seconds
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+            # Drop the oldest finished jobs if we are still over the cap
+            if len(self._jobs) > self.max_jobs:
+                finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+                for job in finished[:len(self._jobs) - self.max_jobs]:
+                    del self._jobs[job.id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,85 @@
+"""
+JSON files of precomputed results (company_summaries.json, financial_analyses.json), shared
+by the servers and the `build` commands.
+
+Readers re-read the file whenever it was replaced, so a running server serves what a build
+wrote after it started. Writers take an exclusive lock on <path>.lock, re-read the file and
+change only their own key before atomically replacing it, so concurrent writers (build
+threads, server workers, a build next to a server) never drop each other's entries.
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def _signature(stat):
+    # os.replace gives the file a new inode; mtime and size catch the rest
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class JsonStore:
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return _signature(os.fstat(f.fileno())), json.load(f)
+        except FileNotFoundError:
+            return None, {}
+
+    def signature(self):
+        """Changes whenever the file is rewritten; None if it does not exist."""
+        try:
+            return _signature(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+    def data(self):
+        """The file's contents, re-read only if it changed since the last read."""
+        signature = self.signature()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._signature, self._data = self._read()
+        return self._data
+
+    def get(self, key):
+        return self.data().get(key)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def set(self, key, value):
+        """Store one entry, merged into the current file under the file lock."""
+        with self._lock, self._file_lock():
+            _, data = self._read()
+            data[key] = value
+            tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._signature, self._data = self.signature(), data
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_json_store(path):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = JsonStore(path)
+        return store
@@ -0,0 +1,171 @@
+"""
+Streaming parser for knowledge graph text files.
+
+Every line holds one (subject, relation, object) triple. Two spellings occur in
+final_kg.txt and both are accepted:
+
+    (Infosys Limited, CEO, SalilParekh)
+    ('HDFC Bank Limited', 'Executive Director', 'Bhavesh Zaveri')
+
+Fields may be quoted with ' or " (backslash escapes allowed), so they can contain ", ".
+An unquoted line with more than three fields keeps the first two as subject and relation
+and joins the rest back into the object; the line is counted as recovered. Lines that
+still don't yield three non-empty fields are skipped and counted instead of aborting the
+load. The file is read one line at a time, so memory does not grow with its size.
+
+    python kg_parser.py final_kg.txt --show-bad 5
+    python kg_parser.py final_kg.txt --repeat 200      # throughput on ~1M lines
+"""
+import argparse
+import time
+
+MAX_BAD_EXAMPLES = 20
+
+
+class ParseStats:
+    def __init__(self):
+        self.lines = 0
+        self.edges = 0
+        self.blank = 0
+        self.recovered = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.bad_examples = []  # (line number, reason, line)
+
+    def skip(self, line_number, reason, line):
+        self.skipped += 1
+        if len(self.bad_examples) < MAX_BAD_EXAMPLES:
+            self.bad_examples.append((line_number, reason, line.rstrip("\n")))
+
+    def to_dict(self):
+        return {
+            "lines": self.lines,
+            "edges": self.edges,
+            "blank": self.blank,
+            "recovered": self.recovered,
+            "skipped": self.skipped,
+            "seconds": self.seconds,
+            "lines_per_second": self.lines / self.seconds if self.seconds else 0.0,
+            "mb_per_second": self.bytes / 2**20 / self.seconds if self.seconds else 0.0,
+        }
+
+
+def split_fields(text):
+    """
+    Split the inside of a tuple into fields on commas outside quotes.
+    Returns (fields, any_quoted) or raises ValueError on an unterminated quote.
+    """
+    fields = []
+    any_quoted = False
+    i, n = 0, len(text)
+    while True:
+        while i < n and text[i] == " ":
+            i += 1
+        if i < n and text[i] in "'\"":
+            quote = text[i]
+            i += 1
+            value = []
+            while i < n and text[i] != quote:
+                if text[i] == "\\" and i + 1 < n:
+                    i += 1
+                value.append(text[i])
+                i += 1
+            if i >= n:
+                raise ValueError("unterminated quote")
+            i += 1
+            while i < n and text[i] == " ":
+                i += 1
+            if i < n and text[i] != ",":
+                raise ValueError("text after closing quote")
+            fields.append("".join(value))
+            any_quoted = True
+        else:
+            end = text.find(",", i)
+            end = n if end == -1 else end
+            fields.append(text[i:end].strip())
+            i = end
+        if i >= n:
+            return fields, any_quoted
+        i += 1  # the comma
+
+
+def parse_line(line):
+    """
+    (subject, relation, object, recovered) for one line, or raises ValueError with the reason.
+    recovered is True when extra unquoted commas were folded back into the object.
+    """
+    text = line.strip()
+    if not (text.startswith("(") and text.endswith(")")):
+        raise ValueError("not a (subject, relation, object) tuple")
+    text = text[1:-1]
+    if "'" not in text and '"' not in text:
+        # Fast path, the format of most lines
+        fields = text.split(", ")
+        any_quoted = False
+    else:
+        try:
+            fields, any_quoted = split_fields(text)
+        except ValueError:
+            # Stray quote inside an unquoted field, e.g. a tagline with an unbalanced "
+            fields, any_quoted = text.split(", "), False
+    recovered = False
+    if len(fields) > 3 and not any_quoted:
+        fields = [fields[0], fields[1], ", ".join(fields[2:])]
+        recovered = True
+    if len(fields) != 3:
+        raise ValueError(f"expected 3 fields, got {len(fields)}")
+    subject, relation, obj = (field.strip() for field in fields)
+    if not subject or not relation or not obj:
+        raise ValueError("empty field")
+    return subject, relation, obj, recovered
+
+
+def parse_kg_file(path, stats=None):
+    """Yield (subject, relation, object) for every valid line of `path`, filling `stats` as it goes."""
+    stats = stats if stats is not None else ParseStats()
+    started = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                stats.lines += 1
+                stats.bytes += len(line)
+                if not line.strip():
+                    stats.blank += 1
+                    continue
+                try:
+                    subject, relation, obj, recovered = parse_line(line)
+                except ValueError as e:
+                    stats.skip(line_number, str(e), line)
+                    continue
+                stats.recovered += recovered
+                stats.edges += 1
+                yield subject, relation, obj
+    finally:
+        stats.seconds = time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a KG file and report statistics")
+    parser.add_argument("path", nargs="?", default="final_kg.txt")
+    parser.add_argument("--show-bad", type=int, default=5, help="Skipped lines to print")
+    parser.add_argument("--repeat", type=int, default=1, help="Parse the file N times to measure throughput at scale")
+    args = parser.parse_args()
+
+    totals = ParseStats()
+    for _ in range(args.repeat):
+        stats = ParseStats()
+        for _ in parse_kg_file(args.path, stats):
+            pass
+        for name in ("lines", "edges", "blank", "recovered", "skipped", "bytes", "seconds"):
+            setattr(totals, name, getattr(totals, name) + getattr(stats, name))
+    summary = totals.to_dict()
+    print(f"✅ {summary['edges']} edges from {summary['lines']} lines in {summary['seconds']:.2f}s "
+          f"({summary['lines_per_second']:,.0f} lines/s, {summary['mb_per_second']:.1f} MB/s)")
+    print(f"   blank {summary['blank']}, recovered {summary['recovered']}, skipped {summary['skipped']}")
+    for line_number, reason, line in stats.bad_examples[:args.show_bad]:
+        print(f"   line {line_number}: {reason}: {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Compact, memory-mapped copy of the knowledge graph.
+
+The dict-based KnowledgeGraph keeps every edge as Python strings and tuples, which is
+fine for the NIFTY 50 facts but grows badly. Here entities and relations are interned to
+integer ids and edges are stored CSR-style in both directions:
+
+    entity.offsets.npy / entity.bytes       entity names, sorted (id = position)
+    relation.offsets.npy / relation.bytes   relation names (id = position)
+    out_offsets.npy   int64   edges of entity i are out_*[out_offsets[i]:out_offsets[i + 1]]
+    out_relation.npy  int32
+    out_object.npy    int32
+    in_offsets.npy    int64   edges pointing at entity i, same layout
+    in_relation.npy   int32
+    in_subject.npy    int32
+    meta.json                 counts and the size / mtime of the source file
+
+Within an entity, edges keep their order in the source file. CompactKnowledgeGraph
+answers the same queries as KnowledgeGraph. Entity names are found by binary search, so
+opening a store does not decode it.
+
+    python kg_store.py convert final_kg.txt kg_store
+    python kg_store.py benchmark final_kg.txt kg_store
+"""
+import argparse
+import functools
+import json
+import mmap
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from columnar import StringColumn, load_array, replace_directory, write_array, write_string_column
+
+KG_STORE_DIR = os.getenv("KG_STORE_DIR", "kg_store")
+# Decoded entity names / name -> id lookups kept per open store
+KG_NAME_CACHE_SIZE = int(os.getenv("KG_NAME_CACHE_SIZE", "65536"))
+
+
+class CompactKnowledgeGraph:
+    def __init__(self, directory=KG_STORE_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.relation_names = StringColumn(os.path.join(directory, "relation")).to_list()
+        self._relation_ids = {name: i for i, name in enumerate(self.relation_names)}
+        for name in ("out_offsets", "out_relation", "out_object", "in_offsets", "in_relation", "in_subject"):
+            setattr(self, name, load_array(os.path.join(directory, f"{name}.npy")))
+        # Entity names are read straight from the mapped UTF-8 blob; slicing an mmap is much
+        # cheaper than going through numpy for every probe of the binary search
+        self._name_offsets = load_array(os.path.join(directory, "entity.offsets.npy"))
+        self.entity_count = len(self._name_offsets) - 1
+        with open(os.path.join(directory, "entity.bytes"), "rb") as f:
+            self._names = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._name_offsets[-1] else b""
+        self.entity = functools.lru_cache(maxsize=KG_NAME_CACHE_SIZE)(self._entity)
+        self.entity_id = functools.lru_cache(maxsize=KG_NAME_CACHE_SIZE)(self._entity_id)
+
+    def _name_bytes(self, entity_id):
+        return self._names[self._name_offsets[entity_id]:self._name_offsets[entity_id + 1]]
+
+    def _entity(self, entity_id):
+        return self._name_bytes(int(entity_id)).decode("utf-8")
+
+    def _entity_id(self, name):
+        """Id of entity `name`, or -1. Binary search over the names, which are sorted by UTF-8 bytes."""
+        key = name.encode("utf-8")
+        lo, hi = 0, self.entity_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.entity_count and self._name_bytes(lo) == key else -1
+
+    def _out(self, entity):
+        entity_id = self.entity_id(entity)
+        if entity_id < 0:
+            return slice(0, 0)
+        return slice(int(self.out_offsets[entity_id]), int(self.out_offsets[entity_id + 1]))
+
+    def _in(self, entity):
+        entity_id = self.entity_id(entity)
+        if entity_id < 0:
+            return slice(0, 0)
+        return slice(int(self.in_offsets[entity_id]), int(self.in_offsets[entity_id + 1]))
+
+    def __contains__(self, entity):
+        span = self._out(entity)
+        return span.stop > span.start
+
+    def __len__(self):
+        return self.meta["edges"]
+
+    def entities(self):
+        """Entities with outgoing edges, like KnowledgeGraph.entities()."""
+        return [self.entity(i) for i in np.flatnonzero(np.diff(self.out_offsets))]
+
+    def relations(self, entity):
+        relation_ids = self.out_relation[self._out(entity)]
+        return [self.relation_names[r] for r in dict.fromkeys(relation_ids.tolist())]
+
+    def edges(self, entity):
+        span = self._out(entity)
+        return [
+            (self.relation_names[r], self.entity(o))
+            for r, o in zip(self.out_relation[span].tolist(), self.out_object[span].tolist())
+        ]
+
+    def objects(self, entity, relation):
+        relation_id = self._relation_ids.get(relation)
+        if relation_id is None:
+            return []
+        span = self._out(entity)
+        return [self.entity(o) for o in self.out_object[span][self.out_relation[span] == relation_id]]
+
+    def subjects(self, obj, relation=None):
+        span = self._in(obj)
+        pairs = zip(self.in_subject[span].tolist(), self.in_relation[span].tolist())
+        if relation is None:
+            return [(self.entity(s), self.relation_names[r]) for s, r in pairs]
+        relation_id = self._relation_ids.get(relation)
+        return [(self.entity(s), relation) for s, r in pairs if r == relation_id]
+
+
+def write_kg_store(directory, triples, source=None):
+    """Intern and write `triples` ((subject, relation, object) in file order) as a KG store."""
+    subjects, relations, objects = [], [], []
+    for subject, relation, obj in triples:
+        subjects.append(subject)
+        relations.append(relation)
+        objects.append(obj)
+
+    # Sorted by UTF-8 bytes so CompactKnowledgeGraph can binary search without decoding
+    entity_names = sorted(set(subjects) | set(objects), key=lambda name: name.encode("utf-8"))
+    entity_ids = {name: i for i, name in enumerate(entity_names)}
+    relation_names = list(dict.fromkeys(relations))
+    relation_ids = {name: i for i, name in enumerate(relation_names)}
+    subject_arr = np.fromiter((entity_ids[s] for s in subjects), dtype=np.int32, count=len(subjects))
+    relation_arr = np.fromiter((relation_ids[r] for r in relations), dtype=np.int32, count=len(relations))
+    object_arr = np.fromiter((entity_ids[o] for o in objects), dtype=np.int32, count=len(objects))
+
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    write_string_column(os.path.join(tmp_dir, "entity"), entity_names)
+    write_string_column(os.path.join(tmp_dir, "relation"), relation_names)
+    # Stable sorts keep the file order of edges within each entity
+    for prefix, key, columns in (("out", subject_arr, {"relation": relation_arr, "object": object_arr}),
+                                 ("in", object_arr, {"relation": relation_arr, "subject": subject_arr})):
+        order = np.argsort(key, kind="stable")
+        offsets = np.zeros(len(entity_names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(key, minlength=len(entity_names)), out=offsets[1:])
+        write_array(os.path.join(tmp_dir, f"{prefix}_offsets.npy"), offsets, np.int64)
+        for name, values in columns.items():
+            write_array(os.path.join(tmp_dir, f"{prefix}_{name}.npy"), values[order], np.int32)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({"edges": len(subjects), "entities": len(entity_names), "relations": len(relation_names),
+                   "source": source}, f, indent=2)
+    replace_directory(tmp_dir, directory)
+
+
+def _source_signature(kg_file):
+    stat = os.stat(kg_file)
+    return {"path": os.path.abspath(kg_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def convert_from_text(kg_file, directory=KG_STORE_DIR):
+    from knowledge_graph import read_kg_triples
+
+    started = time.perf_counter()
+    write_kg_store(directory, read_kg_triples(kg_file), source=_source_signature(kg_file))
+    store = CompactKnowledgeGraph(directory)
+    print(f"✅ Converted {kg_file} to {directory}: {store.meta['edges']} edges, {store.meta['entities']} entities, "
+          f"{store.meta['relations']} relations in {time.perf_counter() - started:.2f}s")
+
+
+def load_kg_store(directory=KG_STORE_DIR, kg_file=None):
+    """Open the store, (re)converting it first if it is missing or older than kg_file."""
+    if kg_file is not None:
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                source = json.load(f).get("source")
+        except FileNotFoundError:
+            source = None
+        signature = _source_signature(kg_file)
+        if source is None or (source["size"], source["mtime_ns"]) != (signature["size"], signature["mtime_ns"]):
+            print(f"🔄 Converting {kg_file} to {directory}...")
+            convert_from_text(kg_file, directory)
+    return CompactKnowledgeGraph(directory)
+
+
+# Each measurement runs in a fresh interpreter so load time and peak RSS are not shared
+_MEASURE_SNIPPET = r"""
+import json, resource, sys, time
+import numpy
+mode, kg_file, directory = sys.argv[1], sys.argv[2], sys.argv[3]
+before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+if mode == "dict":
+    from knowledge_graph import KnowledgeGraph
+    kg = KnowledgeGraph.from_file(kg_file)
+else:
+    from kg_store import CompactKnowledgeGraph
+    kg = CompactKnowledgeGraph(directory)
+load_s = time.perf_counter() - started
+entities = kg.entities()
+started = time.perf_counter()
+for i in range(20000):
+    kg.edges(entities[i % len(entities)])
+lookup_us = (time.perf_counter() - started) * 1e6 / 20000
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"load_s": load_s, "lookup_us": lookup_us, "rss_growth_mb": (peak_kb - before_kb) / 1024}))
+"""
+
+
+def benchmark(kg_file, directory):
+    load_kg_store(directory, kg_file)
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'graph':>8} {'load s':>8} {'edges() us':>11} {'RSS growth MB':>14}")
+    for mode in ("dict", "compact"):
+        output = subprocess.run(
+            [sys.executable, "-c", _MEASURE_SNIPPET, mode, kg_file, directory],
+            check=True, capture_output=True, text=True, cwd=os.getcwd(),
+            env=dict(os.environ, PYTHONPATH=here),
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>8} {result['load_s']:>8.3f} {result['lookup_us']:>11.1f} {result['rss_growth_mb']:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact CSR knowledge graph store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("convert", "benchmark"):
+        command = sub.add_parser(name)
+        command.add_argument("kg_file", nargs="?", default="final_kg.txt")
+        command.add_argument("directory", nargs="?", default=KG_STORE_DIR)
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert_from_text(args.kg_file, args.directory)
+    else:
+        benchmark(args.kg_file, args.directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+The company knowledge graph (final_kg.txt), loaded once per process and indexed.
+
+    kg = get_knowledge_graph()
+    kg.edges("Infosys Limited")              # [(relation, object), ...] in file order
+    kg.objects("Infosys Limited", "CEO")     # [object, ...]
+    kg.subjects("IT Services")               # [(subject, relation), ...]
+    neighborhood(kg, "Infosys Limited")      # ranked edges up to KG_HOPS away
+
+get_knowledge_graph() re-parses the file only when its mtime changes, so callers can
+call it on every request. With KG_BACKEND=compact it serves the memory-mapped CSR store
+from kg_store.py (in KG_STORE_DIR) instead, converting the text file when it changes.
+
+    python knowledge_graph.py benchmark
+    python knowledge_graph.py neighborhood --hops 2
+"""
+import argparse
+import math
+import os
+import threading
+import time
+
+from kg_parser import ParseStats, parse_kg_file
+
+KG_FILE = os.getenv("KG_FILE", "final_kg.txt")
+# dict (KnowledgeGraph below) or compact (kg_store.CompactKnowledgeGraph)
+KG_BACKEND = os.getenv("KG_BACKEND", "dict")
+# Budgets for neighborhood(): hops from the start entity, edges followed per node and direction,
+# entities visited, and edges returned
+KG_HOPS = int(os.getenv("KG_HOPS", "2"))
+KG_MAX_FANOUT = int(os.getenv("KG_MAX_FANOUT", "16"))
+KG_MAX_NODES = int(os.getenv("KG_MAX_NODES", "32"))
+KG_MAX_EDGES = int(os.getenv("KG_MAX_EDGES", "48"))
+
+
+def read_kg_triples(path=KG_FILE, stats=None):
+    """(subject, relation, object) for every valid line of a KG text file, in file order. Bad lines are skipped."""
+    stats = stats if stats is not None else ParseStats()
+    yield from parse_kg_file(path, stats)
+    if stats.skipped:
+        line_number, reason, line = stats.bad_examples[0]
+        print(f"⚠️ Skipped {stats.skipped} malformed lines in {path} (first: line {line_number}, {reason}: {line})")
+
+
+class KnowledgeGraph:
+    """Forward (entity -> relation -> objects) and reverse (object -> subjects) indexes over KG triples."""
+
+    def __init__(self, triples):
+        self.forward = {}
+        self.reverse = {}
+        # Edge lists in file order, which is what the prompts have always been built from
+        self._edges = {}
+        self.edge_count = 0
+        for subject, relation, obj in triples:
+            self.forward.setdefault(subject, {}).setdefault(relation, []).append(obj)
+            self.reverse.setdefault(obj, []).append((subject, relation))
+            self._edges.setdefault(subject, []).append((relation, obj))
+            self.edge_count += 1
+
+    @classmethod
+    def from_file(cls, path=KG_FILE):
+        return cls(read_kg_triples(path))
+
+    def __contains__(self, entity):
+        return entity in self.forward
+
+    def __len__(self):
+        return self.edge_count
+
+    def entities(self):
+        return list(self.forward)
+
+    def relations(self, entity):
+        """Relation types leaving `entity`."""
+        return list(self.forward.get(entity, {}))
+
+    def edges(self, entity):
+        """(relation, object) pairs leaving `entity`."""
+        return self._edges.get(entity, [])
+
+    def objects(self, entity, relation):
+        return self.forward.get(entity, {}).get(relation, [])
+
+    def subjects(self, obj, relation=None):
+        """(subject, relation) pairs pointing at `obj`, optionally only for one relation."""
+        edges = self.reverse.get(obj, [])
+        if relation is None:
+            return edges
+        return [edge for edge in edges if edge[1] == relation]
+
+
+def neighborhood(kg, entity, hops=KG_HOPS, relations=None, follow_relations=None, max_fanout=KG_MAX_FANOUT,
+                 max_nodes=KG_MAX_NODES, max_edges=KG_MAX_EDGES, decay=0.5):
+    """
+    Ranked edges within `hops` of `entity`, found by breadth-first search.
+
+    Hop 1 follows the outgoing edges of `entity` whose relation is in `relations` (all if
+    None); these are the direct facts, they always rank first and are never cut. Later hops follow outgoing
+    and incoming edges whose relation is in `follow_relations` (all if None), so paths like
+    company -> subsidiary -> industry or company -> chairman <- other company are found.
+    A hop-h edge scores parent_score * decay / log2(2 + degree of the node it leaves), so
+    facts reached through hubs rank below facts reached through specific entities.
+
+    Each node expands at most max_fanout edges per direction; the search stops after
+    visiting max_nodes entities. Returns dicts with subject, relation, object, hop and
+    score, best first: every hop-1 edge, then deeper edges up to max_edges in total.
+    """
+    relations = set(relations) if relations is not None else None
+    follow_relations = set(follow_relations) if follow_relations is not None else None
+    visited = {entity: 1.0}
+    frontier = [entity]
+    found = []
+    seen_edges = set()
+
+    def add(subject, relation, obj, hop, score, nxt):
+        if (subject, relation, obj) in seen_edges:
+            return
+        seen_edges.add((subject, relation, obj))
+        found.append({"subject": subject, "relation": relation, "object": obj, "hop": hop, "score": score})
+        other = obj if subject in visited and obj not in visited else subject
+        if other not in visited and len(visited) < max_nodes:
+            visited[other] = score
+            nxt.append(other)
+
+    for hop in range(1, hops + 1):
+        nxt = []
+        for node in frontier:
+            out_edges = kg.edges(node)
+            if hop == 1:
+                for relation, obj in out_edges:
+                    if relations is None or relation in relations:
+                        add(node, relation, obj, hop, 1.0, nxt)
+                continue
+            in_edges = kg.subjects(node)
+            score = visited[node] * decay / math.log2(2 + len(out_edges) + len(in_edges))
+            if follow_relations is not None:
+                out_edges = [edge for edge in out_edges if edge[0] in follow_relations]
+                in_edges = [edge for edge in in_edges if edge[1] in follow_relations]
+            for relation, obj in out_edges[:max_fanout]:
+                add(node, relation, obj, hop, score, nxt)
+            for subject, relation in in_edges[:max_fanout]:
+                add(subject, relation, node, hop, score, nxt)
+        frontier = nxt
+        if not frontier:
+            break
+
+    direct = sum(1 for edge in found if edge["hop"] == 1)
+    found.sort(key=lambda edge: (-edge["score"], edge["hop"]))
+    return found[:max(max_edges, direct)]
+
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def get_knowledge_graph(path=KG_FILE):
+    """The indexed graph for `path`, re-parsed only if the file changed since it was loaded."""
+    mtime = os.stat(path).st_mtime_ns
+    loaded = _graphs.get(path)
+    if loaded is not None and loaded[0] == mtime:
+        return loaded[1]
+    with _graphs_lock:
+        loaded = _graphs.get(path)
+        if loaded is None or loaded[0] != mtime:
+            started = time.perf_counter()
+            if KG_BACKEND == "compact":
+                from kg_store import KG_STORE_DIR, load_kg_store
+                graph = load_kg_store(KG_STORE_DIR, path)
+            else:
+                graph = KnowledgeGraph.from_file(path)
+            _graphs[path] = (mtime, graph)
+            print(f"✅ Loaded knowledge graph {path} ({KG_BACKEND}): {len(graph)} edges, {len(graph.entities())} entities "
+                  f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return _graphs[path][1]
+
+
+def _legacy_edges(path, entity):
+    """What tools / fingreat did per call before: re-read and re-parse the whole file."""
+    kg = {}
+    with open(path, 'r') as file:
+        for line in file:
+            entity1, relation, entity2 = line.strip().strip('()').split(', ')
+            if entity1 not in kg:
+                kg[entity1] = []
+            kg[entity1].append((relation, entity2))
+    return kg.get(entity, [])
+
+
+def benchmark(path, iterations):
+    from templates import KG_NODES_MAPPING
+
+    entities = list(KG_NODES_MAPPING.values())
+    get_knowledge_graph(path)  # first load is reported separately above
+    print(f"{'lookup':>10} {'ms/call':>10}")
+    for label, lookup in (("re-parse", lambda e: _legacy_edges(path, e)), ("indexed", lambda e: get_knowledge_graph(path).edges(e))):
+        calls = iterations if label == "indexed" else max(iterations // 100, len(entities))
+        started = time.perf_counter()
+        for i in range(calls):
+            lookup(entities[i % len(entities)])
+        print(f"{label:>10} {(time.perf_counter() - started) * 1000 / calls:>10.4f}")
+
+
+def benchmark_neighborhood(path, hops, iterations):
+    from templates import KG_NODES_MAPPING
+
+    kg = get_knowledge_graph(path)
+    entities = list(KG_NODES_MAPPING.values())
+    sizes = [len(neighborhood(kg, entity, hops=hops)) for entity in entities]
+    started = time.perf_counter()
+    for i in range(iterations):
+        neighborhood(kg, entities[i % len(entities)], hops=hops)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+    print(f"{hops}-hop neighborhood: {elapsed_ms:.3f} ms/company, "
+          f"{sum(sizes) / len(sizes):.1f} edges on average (max {max(sizes)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed knowledge graph")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="Per-call lookup latency: re-parsing the file vs the indexed graph")
+    bench.add_argument("path", nargs="?", default=KG_FILE)
+    bench.add_argument("--iterations", type=int, default=100000)
+    hood = sub.add_parser("neighborhood", help="Latency of bounded k-hop neighborhood queries per company")
+    hood.add_argument("path", nargs="?", default=KG_FILE)
+    hood.add_argument("--hops", type=int, default=KG_HOPS)
+    hood.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        benchmark(args.path, args.iterations)
+    else:
+        benchmark_neighborhood(args.path, args.hops, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
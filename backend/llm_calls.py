@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 from groq import Groq
 import openai
+from tracing import span
 
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY_3"))
@@ -86,7 +87,8 @@ def query_gemini(prompts, system_prompt=None):
         str: The model's response.
     """
     # Get the next available API key
-    api_key = key_manager.get_next_available_key()
+    with span("llm.key_wait"):
+        api_key = key_manager.get_next_available_key()
     
     # Configure genai with the current key
     genai.configure(api_key=api_key)
@@ -101,7 +103,8 @@ def query_gemini(prompts, system_prompt=None):
         full_prompt = prompts
 
     # Send the request
-    response = model.generate_content(full_prompt)
+    with span("llm.gemini", prompt_chars=len(full_prompt)):
+        response = model.generate_content(full_prompt)
     return response.text
     
 # def query_groq(prompt):
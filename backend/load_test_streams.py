@@ -0,0 +1,97 @@
+"""
+Load test for the streaming endpoints.
+
+Opens N concurrent streams against a running server (app.py or asgi_app.py), holds them
+until the server closes them and reports how many were served, time to first line and
+total time. Run it with increasing --concurrency to find how many streams one process holds:
+
+    python load_test_streams.py --url http://localhost:8000/process_news --body sample_news.json --concurrency 10 50 100 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+async def open_stream(client, method, url, body):
+    started = time.perf_counter()
+    first_line_at = None
+    lines = 0
+    try:
+        async with client.stream(method, url, json=body) as response:
+            if response.status_code >= 400:
+                return {"ok": False, "status": response.status_code}
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                if first_line_at is None:
+                    first_line_at = time.perf_counter()
+                lines += 1
+    except httpx.HTTPError as e:
+        return {"ok": False, "status": type(e).__name__}
+    finished = time.perf_counter()
+    return {
+        "ok": True,
+        "lines": lines,
+        "first_line": (first_line_at or finished) - started,
+        "total": finished - started,
+    }
+
+
+async def run_level(method, url, body, concurrency, timeout):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*[open_stream(client, method, url, body) for _ in range(concurrency)])
+        wall = time.perf_counter() - started
+
+    ok = [r for r in results if r["ok"]]
+    failures = {}
+    for r in results:
+        if not r["ok"]:
+            failures[r["status"]] = failures.get(r["status"], 0) + 1
+
+    def pct(values, q):
+        if not values:
+            return float("nan")
+        return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+    first_lines = [r["first_line"] for r in ok]
+    totals = [r["total"] for r in ok]
+    print(
+        f"concurrency={concurrency:5d}  ok={len(ok):5d}  failed={sum(failures.values()):5d}  "
+        f"first_line p50={pct(first_lines, 50):7.2f}s p95={pct(first_lines, 95):7.2f}s  "
+        f"total p50={pct(totals, 50):7.2f}s p95={pct(totals, 95):7.2f}s  wall={wall:7.2f}s"
+    )
+    if failures:
+        print(f"  failures: {failures}")
+    return len(ok) == concurrency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent stream load test")
+    parser.add_argument("--url", default="http://localhost:8000/process_news")
+    parser.add_argument("--method", default="POST")
+    parser.add_argument("--body", help="Path to a JSON file with the request body")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    body = None
+    if args.body:
+        with open(args.body) as f:
+            body = json.load(f)
+
+    held = 0
+    for level in args.concurrency:
+        if not asyncio.run(run_level(args.method, args.url, body, level, args.timeout)):
+            break
+        held = level
+    print(f"\nHighest level with every stream served: {held}")
+
+
+if __name__ == "__main__":
+    main()
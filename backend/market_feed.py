@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import ssl
+
+from templates import INSTRUMENT_KEYS, INVERSE_INSTRUMENT_KEYS
+
+# Global variable to store market data
+market_data = {}
+
+def get_market_data_feed_authorize(api_version, configuration):
+    """Get authorization for market data feed."""
+    import upstox_client
+    api_instance = upstox_client.WebsocketApi(
+        upstox_client.ApiClient(configuration))
+    api_response = api_instance.get_market_data_feed_authorize(api_version)
+    return api_response
+
+def decode_protobuf(buffer):
+    """Decode protobuf message."""
+    from upstox_client.feeder.proto import MarketDataFeed_pb2 as pb
+    feed_response = pb.FeedResponse()
+    feed_response.ParseFromString(buffer)
+    return feed_response
+
+async def fetch_market_data_loop():
+    """Background task to continuously fetch market data."""
+    global market_data
+    # The upstox SDK and protobuf are slow to import, load them in the feed task rather than at server start
+    import upstox_client
+    import websockets
+    from google.protobuf.json_format import MessageToDict
+    
+    # Create default SSL context
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+
+    # Configure OAuth2 access token for authorization
+    configuration = upstox_client.Configuration()
+    api_version = '2.0'
+    configuration.access_token = os.getenv("UPSTOX_ACCESS_TOKEN")
+
+    while True:
+        try:
+            # Get market data feed authorization (blocking HTTP call, keep it off the event loop)
+            response = await asyncio.to_thread(get_market_data_feed_authorize, api_version, configuration)
+            
+            # Connect to the WebSocket with SSL context
+            async with websockets.connect(response.data.authorized_redirect_uri, ssl=ssl_context) as websocket:
+                print('Connection established')
+
+                await asyncio.sleep(1)  # Wait for 1 second
+                keys = list(INSTRUMENT_KEYS.values())
+                # Data to be sent over the WebSocket
+                data = {
+                    "guid": "someguid",
+                    "method": "sub",
+                    "data": {
+                        "mode": "ltpc",
+                        "instrumentKeys": keys
+                    }
+                }
+
+                # Convert data to binary and send over WebSocket
+                binary_data = json.dumps(data).encode('utf-8')
+                await websocket.send(binary_data)
+                
+                print(f"Subscribed to {len(keys)} instruments")
+
+                # Continuously receive and decode data from WebSocket
+                while True:
+                    message = await websocket.recv()
+                    decoded_data = decode_protobuf(message)
+
+                    # Convert the decoded data to a dictionary
+                    data_dict = MessageToDict(decoded_data)
+                    
+                    # Process market data
+                    if "feeds" in data_dict:
+                        for instrument_key, feed_data in data_dict["feeds"].items():
+                            if "ltpc" in feed_data:
+                                # Get symbol from inverse mapping
+                                symbol = INVERSE_INSTRUMENT_KEYS.get(instrument_key, instrument_key)
+                                
+                                # Extract price data
+                                ltpc_data = feed_data["ltpc"]
+                                ltp = float(ltpc_data.get("ltp", 0))
+                                cp = float(ltpc_data.get("cp", 0))
+                                
+                                # Calculate percent change
+                                percent_change = 0
+                                if cp > 0:
+                                    percent_change = round(((ltp - cp) * 100 / cp), 2)
+                                
+                                # Store in global market data
+                                market_data[symbol] = {
+                                    "price": ltp,
+                                    "change": round(ltp-cp, 2),
+                                    "percentage_change": percent_change
+                                }
+        
+        except Exception as e:
+            print(f"Error in WebSocket connection: {e}")
+            # Wait before reconnecting
+            await asyncio.sleep(5)
+
+# Background task starter
+def start_background_task():
+    """Start the background market data fetching."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(fetch_market_data_loop())
@@ -0,0 +1,131 @@
+"""
+Per-article metadata filters for news search.
+
+For every article in a snapshot we keep which NIFTY 50 tickers it mentions (one packed
+bitmap per ticker) and its publish day. Filters combine into an article mask, which
+similarity_search turns into a FAISS ID selector over chunk ids so excluded articles
+never reach the ranking, let alone the LLM stages.
+"""
+import ast
+import os
+import re
+
+import numpy as np
+
+from knowledge_graph import KG_FILE, get_knowledge_graph
+from templates import KG_NODES_MAPPING, NEWS_COMPANY_TO_KG_TICKER, NIFTY_50_COMPANIES
+
+FILTERS_FILE = "article_filters.npz"
+NO_DATE = np.iinfo(np.int32).min
+# KG relations describing what a company itself does (ServesIndustry etc. describe its customers)
+SECTOR_RELATIONS = {"Industry", "OperatesInIndustry", "SubIndustry", "IndustryType", "SectorFocus"}
+
+
+def parse_news_stocks(news_stocks):
+    """NIFTY 50 tickers mentioned in an article's `stocks` cell (a list of {"sid": ...} dicts)."""
+    try:
+        stocks = ast.literal_eval(news_stocks) if news_stocks else []
+    except (ValueError, SyntaxError):
+        return []
+    tickers = []
+    for stock in stocks if isinstance(stocks, list) else []:
+        ticker = NEWS_COMPANY_TO_KG_TICKER.get(stock.get("sid")) if isinstance(stock, dict) else None
+        if ticker in NIFTY_50_COMPANIES and ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+
+def parse_day(value):
+    """Days since epoch for 'YYYY-MM-DD...' strings and date objects, NO_DATE if unparseable."""
+    if value is None or value == "":
+        return NO_DATE
+    try:
+        return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+    except ValueError:
+        return NO_DATE
+
+
+def tickers_for_sector(sector, kg_file=KG_FILE):
+    """
+    NIFTY 50 tickers whose own industry edges in the KG match `sector` at a word start,
+    case-insensitively ("bank" matches "Retail Banking", "IT" matches "IT Services").
+    """
+    kg = get_knowledge_graph(kg_file)
+    pattern = re.compile(r"\b" + re.escape(sector.strip()), re.IGNORECASE)
+    return sorted(ticker for ticker, node in KG_NODES_MAPPING.items()
+                  if any(relation in SECTOR_RELATIONS and pattern.search(obj) for relation, obj in kg.edges(node)))
+
+
+def has_filters(tickers=None, sectors=None, date_from=None, date_to=None):
+    return not (tickers is None and sectors is None and date_from is None and date_to is None)
+
+
+class ArticleFilters:
+    def __init__(self, ticker_bits, days, article_count):
+        self.ticker_bits = ticker_bits  # uint8 [len(NIFTY_50_COMPANIES), ceil(n / 8)]
+        self.days = days                # int32 [n]
+        self.article_count = article_count
+
+    @classmethod
+    def build(cls, news):
+        n = len(news)
+        mentions = np.zeros((len(NIFTY_50_COMPANIES), n), dtype=bool)
+        ticker_row = {ticker: i for i, ticker in enumerate(NIFTY_50_COMPANIES)}
+        days = np.empty(n, dtype=np.int32)
+        for article_idx in range(n):
+            for ticker in parse_news_stocks(news.value(article_idx, "stocks")):
+                mentions[ticker_row[ticker], article_idx] = True
+            days[article_idx] = parse_day(news.value(article_idx, "date"))
+        return cls(np.packbits(mentions, axis=1), days, n)
+
+    def save(self, path):
+        # Workers share the snapshot directory: write aside and rename, so a reader never sees half a file
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ticker_bits=self.ticker_bits, days=self.days, article_count=self.article_count)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["ticker_bits"], data["days"], int(data["article_count"]))
+
+    def ticker_mask(self, tickers):
+        """Articles mentioning at least one of `tickers`."""
+        rows = [NIFTY_50_COMPANIES.index(ticker) for ticker in tickers if ticker in NIFTY_50_COMPANIES]
+        if not rows:
+            return np.zeros(self.article_count, dtype=bool)
+        bits = np.bitwise_or.reduce(self.ticker_bits[rows], axis=0)
+        return np.unpackbits(bits, count=self.article_count).astype(bool)
+
+    def mask(self, tickers=None, sectors=None, date_from=None, date_to=None):
+        """Boolean article mask for the given filters, or None when no filter is set."""
+        if not has_filters(tickers, sectors, date_from, date_to):
+            return None
+        mask = np.ones(self.article_count, dtype=bool)
+        if tickers is not None or sectors is not None:
+            wanted = set(tickers or [])
+            for sector in sectors or []:
+                wanted.update(tickers_for_sector(sector))
+            mask &= self.ticker_mask(wanted)
+        if date_from is not None:
+            mask &= self.days >= parse_day(date_from)
+        if date_to is not None:
+            mask &= (self.days <= parse_day(date_to)) & (self.days != NO_DATE)
+        return mask
+
+
+def load_article_filters(directory, news):
+    """Load the snapshot's filters, building and caching them next to the stores on first use."""
+    path = os.path.join(directory, FILTERS_FILE)
+    if os.path.exists(path):
+        filters = ArticleFilters.load(path)
+        if filters.article_count == len(news):
+            return filters
+    print(f"🔄 Building article filters for {len(news)} articles...")
+    filters = ArticleFilters.build(news)
+    try:
+        filters.save(path)
+    except OSError as e:
+        print(f"⚠️ Could not cache article filters at {path}: {e}")
+    return filters
@@ -0,0 +1,196 @@
+from fetch_stock_price_data_utils import get_stock_price
+from financial_analysis import get_financial_analysis
+from fingreat import generate_factors, generate_timeseries_nlp_representations_for_examples, get_knowledge_graph_summary, get_nifty50_companies_from_news_stocks, get_nlp_representation_last_n_working_days, get_other_day_stock, search_similar_news, to_json
+from llm_calls import query_gemini
+from tracing import Trace, span, trace_generator
+from templates import (
+    FEW_SHOT_PROMPT_TEMPLATE,
+    FEW_SHOT_PROMPT_EXAMPLES_TEMPLATE,
+    FEW_SHOT_PROMPT_TEMPLATE_END,
+    REFINE_DECISION_PROMPT_TEMPLATE_1,
+    REFINE_DECISION_PROMPT_TEMPLATE_2,
+    KG_NODES_MAPPING,
+)
+
+TOTAL_STAGES = 9
+
+
+def parse_news_request(data):
+    return data['news_article'], data['company_ticker'], data['date_of_publish']
+
+
+def run_news_pipeline(news_article, company_ticker, date_of_publish, include_trace=False):
+    """
+    Runs the full news impact analysis for a company.
+
+    Yields a status dict for every stage and, as the last item, the final
+    verdict returned by the model. Both the streaming `/process_news` route
+    and the job workers consume this generator.
+
+    Every run is traced. With include_trace the span summary is attached to the
+    final verdict under "trace"; slow runs are dumped to TRACE_DIR either way.
+    """
+    trace = Trace("process_news", company_ticker=company_ticker)
+    verdict = yield from trace_generator(_analyse_news(news_article, company_ticker, date_of_publish), trace)
+    trace.finish()
+    trace.dump_if_slow()
+    if include_trace:
+        verdict = dict(verdict, trace=trace.summary())
+    yield verdict
+
+
+def _analyse_news(news_article, company_ticker, date_of_publish):
+    """Yields the stage status dicts and returns the final verdict. Spans must close before each yield."""
+    # Initial message
+    status = {
+        "stage": 0,
+        "message": "Analysing your financial news",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    # Step 1: Fetching similar articles
+    status = {
+        "stage": 1,
+        "message": "Looking at similar events in the past",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    with span("stage_1.similar_articles"):
+        similar_articles = search_similar_news(news_article)
+
+    status = dict(status, message=f"Retrieved {len(similar_articles)} similar articles for comparative study")
+    yield status
+
+    similar_articles = sorted(similar_articles, key=lambda x: x["score"], reverse=True)[:3]
+    filtered_articles = [
+        (article["article_title"], article["article_description"], article["article_stocks"], article["article_date"])
+        for article in similar_articles
+    ]
+
+    # Step 2: Generating examples
+    status = {
+        "stage": 2,
+        "message": "Analysing how market reacted to similar past events",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    few_shot_prompt_examples = ""
+    with span("stage_2.past_examples", articles=len(filtered_articles)):
+        for article in filtered_articles:
+            date = article[3]
+            nifty_50_companies = get_nifty50_companies_from_news_stocks(article[2])
+            for company in nifty_50_companies:
+                stock_price_last_working_day = get_other_day_stock(company, date, True)
+                stock_price_that_day = get_stock_price(company, date)
+                stock_price_next_working_day = get_other_day_stock(company, date, False)
+
+                stock_movement_info = generate_timeseries_nlp_representations_for_examples(
+                    stock_price_last_working_day, stock_price_that_day, stock_price_next_working_day
+                )
+
+                factors = generate_factors(article[0] + ". " + article[1], company)
+                factor_str = " | ".join(factors)
+
+                few_shot_prompt_examples += FEW_SHOT_PROMPT_EXAMPLES_TEMPLATE.format(company, factor_str, stock_movement_info)
+
+    status = dict(status, message="Huh, that took a while, but I've analysed past events")
+    yield status
+
+    # Step 3: Creating the prompt
+    status = {
+        "stage": 3,
+        "message": "Thinking on how your news will impact the market",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    with span("stage_3.news_factors"):
+        few_shot_prompt = FEW_SHOT_PROMPT_TEMPLATE.format(KG_NODES_MAPPING[company_ticker], few_shot_prompt_examples)
+        news_factors = generate_factors(news_article, KG_NODES_MAPPING[company_ticker])
+        news_factors = "| ".join(news_factors)
+        few_shot_prompt += FEW_SHOT_PROMPT_TEMPLATE_END.format(news_factors)
+
+    # Step 4: Initial market impact analysis
+    status = {
+        "stage": 4,
+        "message": "Ahh, things makes sense to me now",
+        "total_stages": TOTAL_STAGES
+    }
+    with span("stage_4.few_shot_prediction"):
+        few_shot_prompt_response = to_json(query_gemini(few_shot_prompt))
+
+    yield status
+
+    # Step 5: Knowledge graph analysis
+    status = {
+        "stage": 5,
+        "message": "Let me gather some background knowledge about the company",
+        "total_stages": TOTAL_STAGES
+    }
+
+    yield status
+    with span("stage_5.knowledge_graph"):
+        knowledge_graph_summary = get_knowledge_graph_summary(news_article, company_ticker)
+
+    # Step 6: Financial analysis
+    status = {
+        "stage": 6,
+        "message": "Let me now look at some financial metrics of the company",
+        "total_stages": TOTAL_STAGES
+    }
+
+    yield status
+    # Depends only on the ticker; precomputed with `python financial_analysis.py build`
+    with span("stage_6.financial_analysis"):
+        financial_analysis_response = get_financial_analysis(company_ticker)
+
+    # Step 7: First refinement
+    status = {
+        "stage": 7,
+        "message": "That's a lot of data, let's see how can we put it all together",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    refine_decision_prompt_1 = REFINE_DECISION_PROMPT_TEMPLATE_1.format(
+        news_factors,
+        few_shot_prompt_response["result"],
+        few_shot_prompt_response["explanation"],
+        knowledge_graph_summary,
+        financial_analysis_response
+    )
+    with span("stage_7.first_refinement"):
+        refine_decision_prompt_response_1 = to_json(query_gemini(refine_decision_prompt_1))
+
+    # Step 8: Time series
+    status = {
+        "stage": 8,
+        "message": "Let's analyse how your stock is performing over the last week",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    with span("stage_8.recent_prices"):
+        company_stock_timeseries_representation = get_nlp_representation_last_n_working_days(company_ticker, date_of_publish)
+
+    # Step 9: Final refinement
+    status = {
+        "stage": 9,
+        "message": "Great! Generating my final verdict...",
+        "total_stages": TOTAL_STAGES
+    }
+    yield status
+
+    refine_decision_prompt_2 = REFINE_DECISION_PROMPT_TEMPLATE_2.format(
+        news_factors,
+        refine_decision_prompt_response_1["result"],
+        refine_decision_prompt_response_1["explanation"],
+        company_stock_timeseries_representation
+    )
+    with span("stage_9.final_refinement"):
+        refine_decision_prompt_response_2 = to_json(query_gemini(refine_decision_prompt_2))
+
+    return refine_decision_prompt_response_2
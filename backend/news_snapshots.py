@@ -0,0 +1,129 @@
+"""
+Versioned snapshots of the searchable news corpus.
+
+A snapshot is a directory holding everything search_similar needs, laid out exactly like
+the backend directory itself:
+
+    faiss_index.bin (+ faiss_index_<variant>.bin)
+    chunk_store/
+    news_store/
+    article_filters.npz, bm25_index/   (built on first filtered / hybrid search)
+
+The original files in the backend directory are the base snapshot. ingest_news.py writes
+new snapshots under NEWS_SNAPSHOT_DIR and then atomically rewrites NEWS_SNAPSHOT_DIR/CURRENT
+with the new snapshot's name, which is what running servers watch to hot-swap.
+"""
+import os
+import shutil
+import threading
+
+import faiss
+
+from bm25 import load_bm25_index
+from build_faiss_index import EXACT_INDEX_FILE, apply_search_params, index_path_for_variant
+from chunk_store import CHUNK_STORE_DIR, load_chunk_metadata
+from news_filters import load_article_filters
+from news_store import NEWS_STORE_DIR, load_news_store
+
+NEWS_SNAPSHOT_DIR = os.getenv("NEWS_SNAPSHOT_DIR", "snapshots")
+KEEP_SNAPSHOTS = int(os.getenv("KEEP_SNAPSHOTS", "3"))
+BASE_SNAPSHOT_DIR = "."
+CHUNK_METADATA_FILE = "chunk_metadata.pkl"
+DATA_FILE = "news_data.xlsx"
+
+
+class Snapshot:
+    """The FAISS index, chunk metadata and news rows that belong together."""
+
+    def __init__(self, directory, index, chunks, news, variant):
+        self.directory = directory
+        self.index = index
+        self.chunks = chunks
+        self.news = news
+        self.variant = variant
+        # Filter bitmaps and the BM25 index are only needed by filtered / hybrid searches
+        self._filters = None
+        self._bm25 = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return os.path.basename(os.path.abspath(self.directory))
+
+    @property
+    def filters(self):
+        if self._filters is None:
+            with self._lock:
+                if self._filters is None:
+                    self._filters = load_article_filters(self.directory, self.news)
+        return self._filters
+
+    @property
+    def bm25(self):
+        if self._bm25 is None:
+            with self._lock:
+                if self._bm25 is None:
+                    self._bm25 = load_bm25_index(self.directory, self.news)
+        return self._bm25
+
+
+def _pointer_path(snapshot_root):
+    return os.path.join(snapshot_root, "CURRENT")
+
+
+def current_snapshot_dir(snapshot_root=NEWS_SNAPSHOT_DIR):
+    """Directory of the published snapshot, or the base snapshot if nothing was ingested yet."""
+    try:
+        with open(_pointer_path(snapshot_root)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return BASE_SNAPSHOT_DIR
+    return os.path.join(snapshot_root, name) if name else BASE_SNAPSHOT_DIR
+
+
+def snapshot_version(snapshot_root=NEWS_SNAPSHOT_DIR):
+    """Cheap token that changes whenever a new snapshot is published."""
+    try:
+        stat = os.stat(_pointer_path(snapshot_root))
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def open_snapshot(directory, variant="flat"):
+    index_file = index_path_for_variant(variant, os.path.join(directory, EXACT_INDEX_FILE))
+    if not os.path.exists(index_file):
+        print(f"⚠️ {index_file} not found, falling back to the exact index")
+        variant = "flat"
+        index_file = os.path.join(directory, EXACT_INDEX_FILE)
+    index = apply_search_params(faiss.read_index(index_file))
+    # The legacy pickle / Excel sheet only exist in the base snapshot and are converted on first use
+    chunks = load_chunk_metadata(os.path.join(directory, CHUNK_STORE_DIR), os.path.join(directory, CHUNK_METADATA_FILE))
+    news = load_news_store(os.path.join(directory, NEWS_STORE_DIR), os.path.join(directory, DATA_FILE))
+    # Map every column up front: a snapshot pruned by publish_snapshot stays readable through
+    # open mappings, but a column first touched after the prune would be gone
+    chunks.open()
+    news.open()
+    return Snapshot(directory, index, chunks, news, variant)
+
+
+def publish_snapshot(name, snapshot_root=NEWS_SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """Point CURRENT at snapshot `name` (atomic rename) and prune old snapshots."""
+    pointer = _pointer_path(snapshot_root)
+    tmp_pointer = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp_pointer, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+
+    # Snapshot names sort by creation time. Servers still serving an older snapshot keep
+    # reading it after unlink: open_snapshot maps all of its columns when it is loaded, and
+    # the filter bitmaps / BM25 index are rebuilt in memory if they can't be cached there.
+    snapshots = sorted(
+        entry for entry in os.listdir(snapshot_root)
+        if os.path.isdir(os.path.join(snapshot_root, entry)) and not entry.startswith(".")
+    )
+    for old in snapshots[:-keep] if keep > 0 else []:
+        if old != name:
+            shutil.rmtree(os.path.join(snapshot_root, old), ignore_errors=True)
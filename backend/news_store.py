@@ -0,0 +1,137 @@
+"""
+Columnar, memory-mapped copy of news_data.xlsx.
+
+search_similar only needs title, description, stocks and date of a handful of rows, but
+pd.read_excel parses the whole sheet with openpyxl at startup. The store keeps each of
+those columns as a string column (see columnar.py) so opening it costs a few small
+reads and row i is decoded on demand.
+
+    python news_store.py convert news_data.xlsx news_store
+    python news_store.py benchmark news_data.xlsx news_store
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from columnar import StringColumn, replace_directory, write_string_column
+
+NEWS_STORE_DIR = "news_store"
+NEWS_COLUMNS = ("title", "description", "stocks", "date")
+
+
+class NewsStore:
+    def __init__(self, directory=NEWS_STORE_DIR):
+        self.directory = directory
+        self.columns = {name: StringColumn(os.path.join(directory, name)) for name in NEWS_COLUMNS}
+
+    def open(self):
+        """Map every column now; see news_snapshots.open_snapshot."""
+        for column in self.columns.values():
+            column.open()
+        return self
+
+    def __len__(self):
+        return len(self.columns["title"])
+
+    def value(self, row, column):
+        return self.columns[column][row]
+
+    def row(self, row):
+        return {name: column[row] for name, column in self.columns.items()}
+
+    def column(self, name):
+        return self.columns[name].to_list()
+
+
+def _cell_to_str(value):
+    # Blank cells come back from pandas as NaN
+    if value is None or value != value:
+        return ""
+    return str(value)
+
+
+def write_news_store(directory, rows):
+    """rows is a list of dicts with (at least) the NEWS_COLUMNS keys."""
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in NEWS_COLUMNS:
+        write_string_column(os.path.join(tmp_dir, name), [_cell_to_str(row.get(name)) for row in rows])
+    replace_directory(tmp_dir, directory)
+
+
+def convert_from_excel(excel_path, directory=NEWS_STORE_DIR):
+    import pandas as pd
+
+    started = time.perf_counter()
+    df = pd.read_excel(excel_path)
+    missing = [name for name in NEWS_COLUMNS if name not in df.columns]
+    if missing:
+        raise ValueError(f"{excel_path} is missing columns {missing}")
+    write_news_store(directory, df[list(NEWS_COLUMNS)].to_dict("records"))
+    print(f"✅ Converted {len(df)} articles from {excel_path} to {directory} in {time.perf_counter() - started:.1f}s")
+
+
+def load_news_store(directory=NEWS_STORE_DIR, excel_path="news_data.xlsx"):
+    """Open the news store, converting the Excel sheet on first use."""
+    if not os.path.exists(directory) and os.path.exists(excel_path):
+        print(f"🔄 No news store at {directory}, converting {excel_path} (one-time)...")
+        convert_from_excel(excel_path, directory)
+    return NewsStore(directory)
+
+
+# Each measurement runs in a fresh interpreter so startup time and peak RSS are not shared
+_MEASURE_SNIPPET = r"""
+import json, resource, sys, time
+mode, source = sys.argv[1], sys.argv[2]
+started = time.perf_counter()
+if mode == "excel":
+    import pandas as pd
+    df = pd.read_excel(source)
+    load_s = time.perf_counter() - started
+    rows = [df.iloc[i % len(df)][["title", "description", "stocks", "date"]].to_dict() for i in range(0, 1000, 7)]
+else:
+    from news_store import NewsStore
+    store = NewsStore(source)
+    n = len(store)
+    load_s = time.perf_counter() - started
+    rows = [store.row(i % n) for i in range(0, 1000, 7)]
+total_s = time.perf_counter() - started
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"load_s": load_s, "load_and_lookup_s": total_s, "peak_rss_mb": peak_kb / 1024}))
+"""
+
+
+def benchmark(excel_path, directory):
+    if not os.path.exists(directory):
+        convert_from_excel(excel_path, directory)
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'source':>12} {'load s':>8} {'load+lookup s':>14} {'peak RSS MB':>12}")
+    for mode, source in (("excel", excel_path), ("news_store", directory)):
+        output = subprocess.run(
+            [sys.executable, "-c", _MEASURE_SNIPPET, mode, source],
+            check=True, capture_output=True, text=True, cwd=os.getcwd(),
+            env=dict(os.environ, PYTHONPATH=here),
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>12} {result['load_s']:>8.3f} {result['load_and_lookup_s']:>14.3f} {result['peak_rss_mb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar news corpus store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("convert", "benchmark"):
+        command = sub.add_parser(name)
+        command.add_argument("excel_path", nargs="?", default="news_data.xlsx")
+        command.add_argument("directory", nargs="?", default=NEWS_STORE_DIR)
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert_from_excel(args.excel_path, args.directory)
+    else:
+        benchmark(args.excel_path, args.directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+int8-quantized ONNX version of the sentence embedding model for CPU-only hosts.
+
+SentenceTransformer pulls in torch, which dominates import time and resident memory of
+the backend. This module runs the same MiniLM encoder through onnxruntime instead:
+tokenizer.json (loaded on first encode), the int8 model and the pooling settings live in
+ONNX_MODEL_DIR. Exporting needs torch once, on a dev machine; serving needs only
+onnxruntime and tokenizers. Select it with EMBEDDING_BACKEND=onnx.
+
+    python onnx_embedder.py export                 # writes onnx_model/ from all-MiniLM-L6-v2
+    python onnx_embedder.py check                  # compare with the vectors of the current news snapshot
+    python onnx_embedder.py benchmark              # startup, RSS and encode latency vs torch
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_model")
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "model_int8.onnx")
+# 0 lets onnxruntime pick (one thread per physical core)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+# Minimum cosine similarity between an ONNX embedding and the stored torch embedding of the same chunk
+ONNX_MIN_COSINE = float(os.getenv("ONNX_MIN_COSINE", "0.98"))
+FP32_MODEL_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "embedder_config.json"
+INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class OnnxEmbedder:
+    """Drop-in for the parts of SentenceTransformer the backend uses: encode() and the dimension."""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, model_file=ONNX_MODEL_FILE, threads=ONNX_THREADS):
+        import onnxruntime as ort
+
+        self.model_dir = model_dir
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        self._tokenizer = None
+        self._tokenizer_lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            with self._tokenizer_lock:
+                if self._tokenizer is None:
+                    from tokenizers import Tokenizer
+
+                    tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, TOKENIZER_FILE))
+                    tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+                    pad_token = self.config.get("pad_token", "[PAD]")
+                    tokenizer.enable_padding(pad_id=tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+                    self._tokenizer = tokenizer
+        return self._tokenizer
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dimension"]
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        """float32 embeddings of `texts`, mean-pooled (and L2-normalised if the model was)."""
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size)[0]
+        embeddings = np.zeros((len(texts), self.config["dimension"]), dtype=np.float32)
+        # Batch texts of similar length together to keep padding small, like SentenceTransformer does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in batch])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            token_embeddings = self.session.run(None, {name: feeds[name] for name in self._input_names})[0]
+            mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.config.get("normalize", True):
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings[batch] = pooled
+        return embeddings
+
+
+def export_onnx(model_name, model_dir=ONNX_MODEL_DIR, opset=17):
+    """Export the transformer of a SentenceTransformer model to ONNX and quantize it to int8."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    pooling = next(module for module in st_model if isinstance(module, Pooling))
+    if pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"Only mean pooling is supported, {model_name} uses {pooling.get_pooling_mode_str()}")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, TOKENIZER_FILE))
+    config = {
+        "model_name": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "normalize": any(isinstance(module, Normalize) for module in st_model),
+        "pad_token": tokenizer.pad_token,
+    }
+    with open(os.path.join(model_dir, CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+    sample = tokenizer(["Reliance Industries reports quarterly results"], return_tensors="pt")
+    fp32_path = os.path.join(model_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in INPUT_NAMES),
+            fp32_path,
+            input_names=list(INPUT_NAMES),
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in (*INPUT_NAMES, "last_hidden_state")},
+            opset_version=opset,
+            dynamo=False,
+        )
+    int8_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✅ Exported {model_name} to {fp32_path} ({os.path.getsize(fp32_path) / 2**20:.1f} MB) "
+          f"and {int8_path} ({os.path.getsize(int8_path) / 2**20:.1f} MB)")
+
+
+def check_compatibility(embedder, index_file, chunk_store_dir, samples=500, k=10, min_cosine=ONNX_MIN_COSINE):
+    """
+    Re-encode a sample of indexed chunks with `embedder` and compare with the vectors the
+    FAISS index holds for them (produced by the torch model). Returns cosine statistics and
+    the overlap of the top-k neighbours found with either set of vectors as queries.
+    """
+    import faiss
+
+    from chunk_store import ChunkMetadata
+
+    index = faiss.read_index(index_file)
+    chunks = ChunkMetadata(chunk_store_dir)
+    ids = np.random.default_rng(0).choice(index.ntotal, size=min(samples, index.ntotal), replace=False)
+    stored = np.stack([index.reconstruct(int(i)) for i in ids]).astype(np.float32)
+    encoded = embedder.encode([chunks.text(int(i)) for i in ids])
+
+    cosine = (stored * encoded).sum(axis=1) / (np.linalg.norm(stored, axis=1) * np.linalg.norm(encoded, axis=1))
+    k = min(k, index.ntotal)
+    _, expected = index.search(stored, k)
+    _, found = index.search(encoded, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+    return {
+        "samples": len(ids),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        f"top{k}_overlap": float(overlap),
+        "passed": bool(cosine.min() >= min_cosine),
+    }
+
+
+# Each backend is measured in a fresh interpreter so import time and peak RSS are not shared
+_MEASURE_SNIPPET = r"""
+import json, resource, sys, time
+backend, model, texts_file, batch_size = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+with open(texts_file) as f:
+    texts = json.load(f)
+started = time.perf_counter()
+if backend == "torch":
+    from sentence_transformers import SentenceTransformer
+    embedder = SentenceTransformer(model, device="cpu")
+else:
+    from onnx_embedder import OnnxEmbedder
+    embedder = OnnxEmbedder(model)
+startup_s = time.perf_counter() - started
+embedder.encode(texts[:1])
+first_encode_s = time.perf_counter() - started
+single = time.perf_counter()
+for text in texts[:50]:
+    embedder.encode([text])
+single_ms = (time.perf_counter() - single) * 1000 / min(len(texts), 50)
+batched = time.perf_counter()
+embedder.encode(texts, batch_size=batch_size)
+batched_ms = (time.perf_counter() - batched) * 1000 / len(texts)
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"startup_s": startup_s, "first_encode_s": first_encode_s, "single_ms": single_ms,
+                  "batched_ms": batched_ms, "peak_rss_mb": peak_kb / 1024}))
+"""
+
+
+def benchmark(model_name, model_dir, texts, batch_size=32):
+    import tempfile
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(texts, f)
+    try:
+        print(f"{'backend':>8} {'startup s':>10} {'1st encode s':>13} {'ms/text b=1':>12} {f'ms/text b={batch_size}':>13} {'peak RSS MB':>12}")
+        for backend, model in (("torch", model_name), ("onnx", model_dir)):
+            output = subprocess.run(
+                [sys.executable, "-c", _MEASURE_SNIPPET, backend, model, f.name, str(batch_size)],
+                check=True, capture_output=True, text=True, cwd=os.getcwd(),
+                env=dict(os.environ, PYTHONPATH=here),
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{backend:>8} {result['startup_s']:>10.2f} {result['first_encode_s']:>13.2f} "
+                  f"{result['single_ms']:>12.2f} {result['batched_ms']:>13.2f} {result['peak_rss_mb']:>12.1f}")
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    from build_faiss_index import EXACT_INDEX_FILE
+    from chunk_store import CHUNK_STORE_DIR
+    from news_snapshots import NEWS_SNAPSHOT_DIR, current_snapshot_dir
+    from similarity_search import EMBEDDING_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="int8 ONNX embedding backend")
+    parser.add_argument("--model-name", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--snapshot-root", default=NEWS_SNAPSHOT_DIR,
+                        help="--index and --chunk-store default to the snapshot published here")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="Export and quantize the model (needs torch)")
+    check = sub.add_parser("check", help="Compare ONNX embeddings with the vectors stored in the FAISS index")
+    check.add_argument("--index")
+    check.add_argument("--chunk-store")
+    check.add_argument("--samples", type=int, default=500)
+    check.add_argument("--k", type=int, default=10)
+    check.add_argument("--min-cosine", type=float, default=ONNX_MIN_COSINE)
+    bench = sub.add_parser("benchmark", help="Startup time, peak RSS and encode latency, torch vs ONNX")
+    bench.add_argument("--chunk-store")
+    bench.add_argument("--texts", type=int, default=256)
+    bench.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    if args.command != "export":
+        # What the servers search: the base index and stores go stale after the first ingest
+        snapshot_dir = current_snapshot_dir(args.snapshot_root)
+        args.chunk_store = args.chunk_store or os.path.join(snapshot_dir, CHUNK_STORE_DIR)
+        if args.command == "check":
+            args.index = args.index or os.path.join(snapshot_dir, EXACT_INDEX_FILE)
+
+    if args.command == "export":
+        export_onnx(args.model_name, args.model_dir)
+    elif args.command == "check":
+        result = check_compatibility(OnnxEmbedder(args.model_dir), args.index, args.chunk_store,
+                                     args.samples, args.k, args.min_cosine)
+        print(json.dumps(result, indent=2))
+        if not result["passed"]:
+            print(f"❌ ONNX embeddings deviate from the index (min cosine {result['min_cosine']:.4f} < {args.min_cosine})")
+            sys.exit(1)
+        print("✅ ONNX embeddings are compatible with the FAISS index")
+    else:
+        from chunk_store import ChunkMetadata
+
+        chunks = ChunkMetadata(args.chunk_store)
+        texts = [chunks.text(i) for i in range(min(args.texts, len(chunks.article_idx)))]
+        benchmark(args.model_name, args.model_dir, texts, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
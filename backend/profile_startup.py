@@ -0,0 +1,97 @@
+"""
+Startup profile of the API server. Run from the backend directory:
+
+    python profile_startup.py                  # app.py
+    python profile_startup.py --module asgi_app --top 15
+
+Reports how long importing the server module takes (when lightweight routes can be
+served), how long the background warm-up takes until /readyz turns green, and the
+slowest imports (python -X importtime) with staged startup vs importing everything
+up front as app.py used to.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Each measurement runs in a fresh interpreter so nothing is already imported
+_TIMING_SNIPPET = r"""
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+import_s = time.perf_counter() - started
+from warmup import warmup
+for name in warmup.status()["resources"]:
+    try:
+        warmup.get(name, timeout=None)
+    except Exception:
+        pass
+print(json.dumps({"import_s": import_s, "ready_s": time.perf_counter() - started, "status": warmup.status()}))
+"""
+
+# Keeps the warm-up thread from importing concurrently, so -X importtime only sees the main thread
+_IMPORT_SNIPPET = r"""
+import importlib, sys, warmup
+warmup.Warmup.start = lambda self: None
+for module in sys.argv[1:]:
+    try:
+        importlib.import_module(module)
+    except ImportError as e:
+        print(f"could not import {module}: {e}")
+"""
+
+# What app.py used to import before serving: everything warm-up loads, plus torch via SentenceTransformer
+EAGER_IMPORTS = ["sentence_transformers"]
+
+
+def _run(args, importtime=False):
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + args
+    return subprocess.run(
+        command, check=True, capture_output=True, text=True, cwd=os.getcwd(),
+        env=dict(os.environ, PYTHONPATH=here),
+    )
+
+
+def parse_importtime(stderr):
+    """{top-level module: cumulative import seconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the single separator space
+        if not name.startswith("  ") and "." not in name.strip():
+            modules[name.strip()] = modules.get(name.strip(), 0) + int(cumulative) / 1e6
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the API server")
+    parser.add_argument("--module", default="app", help="Server module to import (app or asgi_app)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    from warmup import warmup
+    resources = list(warmup.status()["resources"])
+
+    timing = json.loads(_run(["-c", _TIMING_SNIPPET, args.module]).stdout.strip().splitlines()[-1])
+    print(f"Import {args.module}: {timing['import_s']:.2f}s (lightweight routes serve from here)")
+    print(f"Ready (all resources loaded): {timing['ready_s']:.2f}s")
+    for name, resource in timing["status"]["resources"].items():
+        print(f"   {name:<20} {resource['state']:<8} {resource['seconds'] or 0:>7.2f}s {resource['error'] or ''}")
+
+    staged = parse_importtime(_run(["-c", _IMPORT_SNIPPET, args.module], importtime=True).stderr)
+    eager_run = _run(["-c", _IMPORT_SNIPPET, args.module, *resources, *EAGER_IMPORTS], importtime=True)
+    eager = parse_importtime(eager_run.stderr)
+    for line in eager_run.stdout.splitlines():
+        print(f"⚠️ {line}")
+    print(f"\nImport time: staged {sum(staged.values()):.2f}s vs eager {sum(eager.values()):.2f}s")
+    print(f"{'module':<30} {'staged s':>9} {'eager s':>9}")
+    for name in sorted(eager, key=eager.get, reverse=True)[:args.top]:
+        print(f"{name:<30} {staged.get(name, 0):>9.3f} {eager[name]:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
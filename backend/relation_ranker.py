@@ -0,0 +1,100 @@
+"""
+Local ranking of a company's KG relation types against a news article.
+
+Stage 5 used to ask the LLM (FIND_IMPORTANT_RELATIONS_PROMPT_TEMPLATE) which relation
+types matter for an article. Here every relation type of the company is embedded once
+with the same MiniLM model as the news search, as "<company> <relation words>: <objects>",
+and relations are ranked by cosine similarity with the article embedding. The article
+embedding is usually already in the embedding cache from stage 1.
+
+    python relation_ranker.py INFY "Infosys wins a large deal from a European bank"
+"""
+import os
+import re
+import threading
+
+import numpy as np
+
+# local (embedding similarity) or llm (FIND_IMPORTANT_RELATIONS prompt, the old behaviour)
+RELATION_RANKING = os.getenv("RELATION_RANKING", "local")
+# Number of relation types passed on to the neighborhood query and the summariser
+RELATION_TOP_K = int(os.getenv("RELATION_TOP_K", "8"))
+# Objects per relation included in its text; keeps long lists from drowning the label
+RELATION_TEXT_OBJECTS = 10
+
+# entity -> (graph the vectors were computed from, relation names, unit vectors)
+_relation_vectors = {}
+_relation_vectors_lock = threading.Lock()
+
+
+def relation_words(relation):
+    """'ServesIndustry' -> 'serves industry'."""
+    return " ".join(re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", relation)).lower() or relation
+
+
+def relation_texts(kg, entity):
+    relations = kg.relations(entity)
+    texts = []
+    for relation in relations:
+        objects = kg.objects(entity, relation)[:RELATION_TEXT_OBJECTS]
+        texts.append(f"{entity} {relation_words(relation)}: {', '.join(objects)}")
+    return relations, texts
+
+
+def relation_vectors(kg, entity):
+    """Relation names and their embeddings for `entity`, computed once per loaded graph."""
+    cached = _relation_vectors.get(entity)
+    if cached is not None and cached[0] is kg:
+        return cached[1], cached[2]
+    from similarity_search import get_model
+
+    relations, texts = relation_texts(kg, entity)
+    if texts:
+        vectors = np.asarray(get_model().encode(texts), dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    with _relation_vectors_lock:
+        _relation_vectors[entity] = (kg, relations, vectors)
+    return relations, vectors
+
+
+def rank_relations(kg, entity, news_article):
+    """[(relation, cosine similarity)] for every relation type of `entity`, best first."""
+    from similarity_search import encode_queries
+
+    relations, vectors = relation_vectors(kg, entity)
+    if not relations:
+        return []
+    article = encode_queries([news_article])[0]
+    article = article / max(float(np.linalg.norm(article)), 1e-12)
+    scores = vectors @ article
+    order = np.argsort(-scores, kind="stable")
+    return [(relations[i], float(scores[i])) for i in order]
+
+
+def find_important_relations(kg, entity, news_article, top_k=RELATION_TOP_K):
+    """The top_k relation types of `entity` most similar to the article."""
+    return [relation for relation, _ in rank_relations(kg, entity, news_article)[:top_k]]
+
+
+def main():
+    import argparse
+
+    from knowledge_graph import get_knowledge_graph
+    from templates import KG_NODES_MAPPING
+
+    parser = argparse.ArgumentParser(description="Rank a company's KG relations against a news article")
+    parser.add_argument("company_ticker")
+    parser.add_argument("news_article")
+    parser.add_argument("--top-k", type=int, default=RELATION_TOP_K)
+    args = parser.parse_args()
+
+    kg = get_knowledge_graph()
+    for i, (relation, score) in enumerate(rank_relations(kg, KG_NODES_MAPPING[args.company_ticker], args.news_article)):
+        marker = "*" if i < args.top_k else " "
+        print(f"{marker} {score:.3f}  {relation}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,279 @@
+import os
+import threading
+import time
 import faiss
-import pickle
 import numpy as np
-import pandas as pd
-from sentence_transformers import SentenceTransformer
+from build_faiss_index import search_params_with_selector
+from embedding_cache import EmbeddingCache
+from news_filters import has_filters
+from news_snapshots import NEWS_SNAPSHOT_DIR, current_snapshot_dir, open_snapshot, snapshot_version
+from tracing import span
 
-# Define file paths
-INDEX_FILE = "faiss_index.bin"
-CHUNK_METADATA_FILE = "chunk_metadata.pkl"
-DATA_FILE = "news_data.xlsx"
+# FAISS_INDEX_VARIANT selects flat (exact), ivf_flat, ivf_pq or hnsw, see build_faiss_index.py
+FAISS_INDEX_VARIANT = os.getenv("FAISS_INDEX_VARIANT", "flat")
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# torch (SentenceTransformer) or onnx (int8 model exported by onnx_embedder.py, no torch needed)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# How often a running server checks whether ingest_news.py published a new snapshot
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "5"))
+# Upper bound on chunks fetched per query when widening the search for distinct articles
+MAX_CHUNK_FETCH = int(os.getenv("MAX_CHUNK_FETCH", "1024"))
+# Reciprocal rank fusion constant for hybrid search, larger values flatten the rank weights
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
 
 # Global variables (Lazy Loading)
-_index = None
-_all_chunks = None
-_article_mapping = None
-_df = None
+# Index, chunk metadata and news rows are swapped together as one Snapshot
+_snapshot = None
+_snapshot_version = None
+_last_snapshot_check = 0.0
+_snapshot_lock = threading.Lock()
 _model = None
+# Users often resubmit the same article, so query embeddings are cached by text hash
+# int8 vectors differ slightly from the torch ones, so each backend gets its own cache namespace
+_embedding_cache = EmbeddingCache(EMBEDDING_MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL_NAME}-{EMBEDDING_BACKEND}-int8")
+
+def _load_model():
+    # Imported here so the onnx backend never imports torch
+    if EMBEDDING_BACKEND == "onnx":
+        from onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
 
 def load_resources():
     """Load the FAISS index, metadata, and model only once."""
-    global _index, _all_chunks, _article_mapping, _df, _model
-    if _index is None:
-        print("🔄 Loading FAISS index and metadata...")
-        _index = faiss.read_index(INDEX_FILE)
-        with open(CHUNK_METADATA_FILE, "rb") as f:
-            _all_chunks, _article_mapping = pickle.load(f)
-        _df = pd.read_excel(DATA_FILE)
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
-        print(f"✅ Loaded {_index.ntotal} chunks from FAISS index.")
-
-def search_similar(query, top_k=3, chunk_threshold=3):
-    """Search for similar articles based on chunk similarity."""
-    if _index is None:
+    global _snapshot, _snapshot_version, _model
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                print("🔄 Loading FAISS index and metadata...")
+                _snapshot_version = snapshot_version(NEWS_SNAPSHOT_DIR)
+                snapshot = open_snapshot(current_snapshot_dir(NEWS_SNAPSHOT_DIR), FAISS_INDEX_VARIANT)
+                _model = _load_model()
+                _snapshot = snapshot
+                print(f"✅ Loaded {snapshot.index.ntotal} chunks from FAISS index ({snapshot.variant}, snapshot {snapshot.name}).")
+
+def get_model():
+    load_resources()
+    return _model
+
+def get_snapshot():
+    """The snapshot currently served, hot-swapping to a newly published one if there is one."""
+    if _snapshot is None:
         load_resources()  # Ensure resources are loaded before search
+    else:
+        refresh_snapshot()
+    return _snapshot
+
+def encode_queries(texts, batch_size=64):
+    """Embeddings for `texts`, running the transformer only for texts not in the cache."""
+    load_resources()
+    return _embedding_cache.encode(list(texts), lambda missing: _model.encode(missing, batch_size=batch_size))
+
+def embedding_cache_stats():
+    return _embedding_cache.stats()
+
+def refresh_snapshot(force=False):
+    """Swap to the published snapshot if it changed since we loaded ours. Returns True on swap."""
+    global _snapshot, _snapshot_version, _last_snapshot_check
+    now = time.monotonic()
+    if not force and now - _last_snapshot_check < SNAPSHOT_CHECK_SECONDS:
+        return False
+    _last_snapshot_check = now
+    version = snapshot_version(NEWS_SNAPSHOT_DIR)
+    if version == _snapshot_version and not force:
+        return False
+    with _snapshot_lock:
+        if version == _snapshot_version and not force:
+            return False
+        directory = current_snapshot_dir(NEWS_SNAPSHOT_DIR)
+        print(f"🔄 Hot-swapping to news snapshot {directory}...")
+        snapshot = open_snapshot(directory, FAISS_INDEX_VARIANT)
+        # Readers take a reference to _snapshot once per search, so one assignment swaps everything
+        _snapshot, _snapshot_version = snapshot, version
+        print(f"✅ Now serving {snapshot.index.ntotal} chunks from snapshot {snapshot.name}.")
+    return True
+
+def search_similar(query, top_k=3, chunk_threshold=3, tickers=None, sectors=None, date_from=None, date_to=None, hybrid=False):
+    """Search for similar articles based on chunk similarity."""
+    return search_similar_batch(
+        [query], top_k=top_k, chunk_threshold=chunk_threshold, tickers=tickers, sectors=sectors,
+        date_from=date_from, date_to=date_to, hybrid=hybrid,
+    )[0]
+
+def search_similar_batch(queries, top_k=3, chunk_threshold=3, batch_size=64, tickers=None, sectors=None,
+                         date_from=None, date_to=None, hybrid=False):
+    """
+    Search for similar articles for several queries at once.
+
+    All queries are encoded in one forward pass and searched with a single FAISS call,
+    which is much cheaper than calling search_similar once per query.
+    Returns one result list per query, in the same order.
+
+    tickers / sectors / date_from / date_to restrict the search to matching articles inside
+    FAISS itself (see news_filters.py). With hybrid=True the vector ranking is fused with a
+    BM25 ranking over titles and descriptions and each result gets bm25_score / hybrid_score.
+    """
+    if not queries:
+        return []
+    snapshot = get_snapshot()
+
+    params, allowed_chunks, article_mask = None, snapshot.index.ntotal, None
+    # Unfiltered searches never load (or build) the snapshot's filter bitmaps
+    if has_filters(tickers, sectors, date_from, date_to):
+        with span("similarity.filter"):
+            article_mask = snapshot.filters.mask(tickers, sectors, date_from, date_to)
+            chunk_mask = article_mask[snapshot.chunks.article_idx]
+            allowed_chunks = int(np.count_nonzero(chunk_mask))
+            # Packed bitmap over chunk ids, bit i of byte i // 8 (little endian) set for allowed chunks
+            selector = faiss.IDSelectorBitmap(np.packbits(chunk_mask, bitorder="little"))
+            params = search_params_with_selector(snapshot.index, selector)
+    if allowed_chunks == 0:
+        return [[] for _ in queries]
 
-    query_vector = _model.encode([query]).astype(np.float32)
+    with span("similarity.encode", queries=len(queries)):
+        query_vectors = encode_queries(queries, batch_size=batch_size)
     
-    # Search for more chunks than top_k to ensure good article coverage
-    k_chunks = min(top_k * chunk_threshold, _index.ntotal)
-    distances, indices = _index.search(query_vector, k_chunks)
+    # Search for more chunks than top_k to ensure good article coverage. When a few long
+    # articles own all the nearest chunks, widen k for those queries until top_k distinct
+    # articles show up or MAX_CHUNK_FETCH is reached.
+    max_k = min(max(MAX_CHUNK_FETCH, top_k * chunk_threshold), allowed_chunks)
+    k_chunks = min(top_k * chunk_threshold, max_k)
+    all_results = [None] * len(queries)
+    pending = np.arange(len(queries))
+    while pending.size:
+        with span("similarity.faiss_search", k=k_chunks, queries=len(pending)):
+            distances, indices = snapshot.index.search(query_vectors[pending], k_chunks, params=params)
     
-    # Track article scores
-    article_scores = {}
-    for idx, score in zip(indices[0], distances[0]):
-        if idx != -1:
-            chunk_text = _all_chunks[idx]
-            chunk_info = _article_mapping[chunk_text]
-            article_idx = chunk_info['article_idx']
-            
-            if article_idx not in article_scores:
-                article_scores[article_idx] = {
-                    'min_score': float('inf'),
-                    'total_score': 0,
-                    'chunk_count': 0,
-                    'chunks': []
-                }
-            
-            article_scores[article_idx]['min_score'] = min(article_scores[article_idx]['min_score'], score)
-            article_scores[article_idx]['total_score'] += score
-            article_scores[article_idx]['chunk_count'] += 1
-            article_scores[article_idx]['chunks'].append({
-                'text': chunk_text,
-                'score': score,
-                'position': chunk_info['chunk_position']
-            })
+        retry = []
+        for query_pos, row_indices, row_distances in zip(pending, indices, distances):
+            with span("similarity.aggregate", chunks=k_chunks):
+                hits = _aggregate_chunk_hits(snapshot.chunks, row_indices, row_distances)
+            if len(hits["article_idx"]) < top_k and k_chunks < max_k:
+                retry.append(query_pos)
+                continue
     
-    # Prepare results
-    results = []
-    for article_idx, scores in article_scores.items():
-        avg_score = scores['total_score'] / scores['chunk_count']
-        article_title = _df.iloc[article_idx]["title"]
-        article_description = _df.iloc[article_idx]["description"]
-        article_stocks = _df.iloc[article_idx]["stocks"]
-        article_date = _df.iloc[article_idx]["date"]
-        
-        results.append({
-            'score': avg_score,
-            'min_score': scores['min_score'],
-            'chunk_count': scores['chunk_count'],
-            'article_title': article_title,
-            'article_description': article_description,
-            'article_stocks': article_stocks,
-            'article_date': article_date,
-            'matched_chunks': sorted(scores['chunks'], key=lambda x: x['position'])
-        })
+            # Prepare results
+            with span("similarity.article_lookup", articles=min(top_k, len(hits["article_idx"]))):
+                if hybrid:
+                    all_results[query_pos] = _build_hybrid_results(
+                        snapshot, queries[query_pos], query_vectors[query_pos], hits, top_k, chunk_threshold, article_mask
+                    )
+                else:
+                    all_results[query_pos] = _build_results(snapshot.chunks, snapshot.news, hits, top_k)
+        pending = np.asarray(retry, dtype=np.int64)
+        k_chunks = min(k_chunks * 2, max_k)
+    return all_results
+
+def _aggregate_chunk_hits(chunks, indices, distances):
+    """
+    Group the chunk hits of one query by the article they belong to.
+
+    Returns per-article arrays (article_idx, min_score, mean score, chunk count) sorted by
+    min_score, plus the raw hits so matched chunks can be listed for the articles we keep.
+    """
+    valid = indices != -1
+    chunk_ids = indices[valid]
+    scores = distances[valid].astype(np.float64)
+    article_ids = np.asarray(chunks.article_idx[chunk_ids], dtype=np.int64)
+
+    articles, inverse, counts = np.unique(article_ids, return_inverse=True, return_counts=True)
+    if articles.size == 0:
+        empty = np.zeros(0)
+        return {"article_idx": articles, "min_score": empty, "score": empty, "chunk_count": counts,
+                "group": counts, "chunk_ids": chunk_ids, "chunk_scores": scores, "chunk_group": inverse}
+    # Group-by via a stable sort on the group id: min with reduceat, mean with bincount
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    min_scores = np.minimum.reduceat(scores[order], starts)
+    mean_scores = np.bincount(inverse, weights=scores) / counts
+
+    ranking = np.argsort(min_scores, kind="stable")
+    return {
+        "article_idx": articles[ranking],
+        "min_score": min_scores[ranking],
+        "score": mean_scores[ranking],
+        "chunk_count": counts[ranking],
+        "group": ranking,
+        "chunk_ids": chunk_ids,
+        "chunk_scores": scores,
+        "chunk_group": inverse,
+    }
+
+def _article_result(chunks, news, hits, rank):
+    article_idx = int(hits["article_idx"][rank])
+    members = np.flatnonzero(hits["chunk_group"] == hits["group"][rank])
+    matched_chunks = [
+        {
+            'text': chunks.text(int(hits["chunk_ids"][i])),
+            'score': float(hits["chunk_scores"][i]),
+            'position': int(chunks.chunk_position[hits["chunk_ids"][i]])
+        }
+        for i in members
+    ]
+    article = news.row(article_idx)
+    article_title = article["title"]
+    article_description = article["description"]
+    article_stocks = article["stocks"]
+    article_date = article["date"]
     
-    results.sort(key=lambda x: x['min_score'])
-    return results[:top_k]
+    return {
+        'score': float(hits["score"][rank]),
+        'min_score': float(hits["min_score"][rank]),
+        'chunk_count': int(hits["chunk_count"][rank]),
+        'article_title': article_title,
+        'article_description': article_description,
+        'article_stocks': article_stocks,
+        'article_date': article_date,
+        'matched_chunks': sorted(matched_chunks, key=lambda x: x['position'])
+    }
+
+def _build_results(chunks, news, hits, top_k):
+    return [_article_result(chunks, news, hits, rank) for rank in range(min(top_k, len(hits["article_idx"])))]
+
+def _build_hybrid_results(snapshot, query, query_vector, hits, top_k, chunk_threshold, article_mask):
+    """
+    Fuse the vector ranking (articles by best chunk distance) with the BM25 ranking using
+    reciprocal rank fusion, then build results for the top_k fused articles.
+    """
+    with span("similarity.bm25"):
+        bm25_articles, bm25_scores = snapshot.bm25.top(query, top_k * chunk_threshold, article_mask)
+
+    fused = {}
+    for rank, article_idx in enumerate(hits["article_idx"].tolist()):
+        fused[article_idx] = 1.0 / (HYBRID_RRF_K + rank + 1)
+    for rank, article_idx in enumerate(bm25_articles.tolist()):
+        fused[article_idx] = fused.get(article_idx, 0.0) + 1.0 / (HYBRID_RRF_K + rank + 1)
+    chosen = sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+    vector_rank = {article_idx: rank for rank, article_idx in enumerate(hits["article_idx"].tolist())}
+    bm25_score = dict(zip(bm25_articles.tolist(), bm25_scores.tolist()))
+    lexical_only = [article_idx for article_idx in chosen if article_idx not in vector_rank]
+    lexical_hits, lexical_rank = None, {}
+    if lexical_only:
+        # Articles found only lexically: score their chunks against the query so every result
+        # carries real vector distances and matched chunks
+        chunk_ids = np.flatnonzero(np.isin(snapshot.chunks.article_idx, lexical_only))[:MAX_CHUNK_FETCH]
+        selector = faiss.IDSelectorBatch(chunk_ids.astype(np.int64))
+        with span("similarity.faiss_search", k=len(chunk_ids), queries=1):
+            distances, indices = snapshot.index.search(
+                query_vector[None, :], len(chunk_ids), params=search_params_with_selector(snapshot.index, selector)
+            )
+        lexical_hits = _aggregate_chunk_hits(snapshot.chunks, indices[0], distances[0])
+        lexical_rank = {article_idx: rank for rank, article_idx in enumerate(lexical_hits["article_idx"].tolist())}
+
+    results = []
+    for article_idx in chosen:
+        if article_idx in vector_rank:
+            result = _article_result(snapshot.chunks, snapshot.news, hits, vector_rank[article_idx])
+        elif article_idx in lexical_rank:
+            result = _article_result(snapshot.chunks, snapshot.news, lexical_hits, lexical_rank[article_idx])
+        else:
+            continue  # approximate index did not reach any of its chunks
+        result['bm25_score'] = float(bm25_score.get(article_idx, 0.0))
+        result['hybrid_score'] = fused[article_idx]
+        results.append(result)
+    return results
 
 def display_results(results, show_chunks=False):
     """Pretty print search results"""
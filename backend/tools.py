@@ -1,15 +1,18 @@
 from datetime import datetime
 import pandas as pd
 import os
+import re
 import requests
 from company_financials import generate_financial_report
+from company_summaries import get_company_summary
 from fetch_latest_price_for_csv import fetch_price_for_company
-from templates import KG_NODES_MAPPING
-from llm_calls import query_gemini
+from financial_screener import format_table, screen
 import json
+from tracing import span, traced
 
 nifty_50_companies = ['HDFCBANK', 'RELIANCE', 'ICICIBANK', 'INFY', 'ITC', 'BHARTIARTL', 'TCS', 'LT', 'AXISBANK', 'SBIN', 'M&M', 'KOTAKBANK', 'HINDUNILVR', 'BAJFINANCE', 'NTPC', 'SUNPHARMA', 'TATAMOTORS', 'HCLTECH', 'MARUTI', 'TRENT', 'POWERGRID', 'TITAN', 'ASIANPAINT', 'TATASTEEL', 'BAJAJ-AUTO', 'ULTRACEMCO', 'COALINDIA', 'ONGC', 'HINDALCO', 'BAJAJFINSV', 'ADANIPORTS', 'GRASIM', 'BEL', 'SHRIRAMFIN', 'TECHM', 'JSWSTEEL', 'NESTLEIND', 'INDUSINDBK', 'CIPLA', 'SBILIFE', 'DRREDDY', 'TATACONSUM', 'HDFCLIFE', 'WIPRO', 'ADANIENT', 'HEROMOTOCO', 'BRITANNIA', 'APOLLOHOSP', 'BPCL', 'EICHERMOT']
 
+@traced("tools.stock_price_range")
 def get_stock_price_range_tool(company_name: str, start_date: str, end_date: str):
     """
     Fetches stock price details (Open, High, Low, Close, Volume) for a given company over a date range.
@@ -30,23 +33,24 @@ def get_stock_price_range_tool(company_name: str, start_date: str, end_date: str
 def get_company_financials_tool(company): 
     return generate_financial_report(company)
 
+@traced("tools.screen_companies")
+def screen_companies_tool(filters=None, sort_by=None, descending=True, limit=10, sector=None, tickers=None, columns=None):
+    # filters may also come as one string from the LLM: "roe_last > 15; net_margin_ttm > 10",
+    # and tickers / columns as "HDFCBANK, ICICIBANK" or a single "HDFCBANK"
+    if isinstance(filters, str):
+        filters = [condition for condition in re.split(r"[;,]", filters) if condition.strip()]
+    if isinstance(tickers, str):
+        tickers = [ticker for ticker in re.split(r"[;,\s]+", tickers) if ticker]
+    if isinstance(columns, str):
+        columns = [column for column in re.split(r"[;,\s]+", columns) if column]
+    result = screen(filters or [], sort_by=sort_by, descending=descending, limit=int(limit), tickers=tickers,
+                    sector=sector or None, columns=columns)
+    return format_table(result)
+
 def get_company_background_information_tool(company):
-    def load_knowledge_graph(filepath):
-        kg = {}
-        with open(filepath, 'r') as file:
-            for line in file:
-                entity1, relation, entity2 = line.strip().strip('()').split(', ')
-                if entity1 not in kg:
-                    kg[entity1] = []
-                kg[entity1].append((relation, entity2))
-        return kg
-    
-    kg_filepath = 'final_kg.txt'
-    kg = load_knowledge_graph(kg_filepath)
-    all_relations = kg[KG_NODES_MAPPING[company]]
-    prompt = "We are talking about the company {company}. Here are the relations: {relations}. Please provide a summary of the company. Respond as a string".format(company=company, relations=all_relations)
-    result = query_gemini(prompt)
-    return result
+    # Precomputed per company and regenerated only when its KG edges change, see company_summaries.py
+    with span("tools.company_background", company=company):
+        return get_company_summary(company)
 
 def view_upstox_account_balance_tool():
     access_token = os.getenv("UPSTOX_ACCESS_TOKEN")
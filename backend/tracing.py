@@ -0,0 +1,178 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Traces slower than this are written to TRACE_DIR in Chrome trace-event format
+# (open them in chrome://tracing or https://ui.perfetto.dev)
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "30000"))
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+
+_current_trace = contextvars.ContextVar("fingreat_trace", default=None)
+
+
+class Trace:
+    """Collects timed spans for one request. Spans may be recorded from several threads."""
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._end = None
+        self._lock = threading.Lock()
+        self._depths = {}
+
+    @property
+    def duration_ms(self):
+        end = self._end if self._end is not None else time.perf_counter()
+        return (end - self._start) * 1000
+
+    def finish(self):
+        if self._end is None:
+            self._end = time.perf_counter()
+        return self
+
+    def _enter(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            depth = self._depths.get(thread_id, 0)
+            self._depths[thread_id] = depth + 1
+            return thread_id, depth
+
+    def _exit(self, name, attrs, start, end, thread_id, depth):
+        with self._lock:
+            self._depths[thread_id] = depth
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self._start) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "depth": depth,
+                "thread": thread_id,
+                "attrs": attrs,
+            })
+
+    def summary(self):
+        """Spans in start order plus total time per span name, small enough to attach to a response."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        totals = {}
+        for s in spans:
+            entry = totals.setdefault(s["name"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + s["duration_ms"], 3)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "total_ms": round(self.duration_ms, 3),
+            "totals": totals,
+            "spans": [{k: v for k, v in s.items() if k != "thread"} for s in spans],
+        }
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        base_us = self.started_at * 1e6
+        events = [{
+            "name": self.name,
+            "ph": "X",
+            "ts": base_us,
+            "dur": self.duration_ms * 1000,
+            "pid": pid,
+            "tid": 0,
+            "args": self.attrs,
+        }]
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            events.append({
+                "name": s["name"],
+                "ph": "X",
+                "ts": base_us + s["start_ms"] * 1000,
+                "dur": s["duration_ms"] * 1000,
+                "pid": pid,
+                "tid": s["thread"],
+                "args": s["attrs"],
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}-{self.id}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+    def dump_if_slow(self, threshold_ms=TRACE_SLOW_MS):
+        if self.duration_ms >= threshold_ms:
+            path = self.dump()
+            print(f"🐢 Slow trace {self.name} ({self.duration_ms:.0f} ms) written to {path}")
+            return path
+        return None
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block under the active trace. Does nothing when no trace is active."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    thread_id, depth = trace._enter()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace._exit(name, attrs, start, time.perf_counter(), thread_id, depth)
+
+
+def traced(name=None):
+    """Decorator form of span()."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def activate(trace):
+    """Make `trace` the active trace for the enclosed block (e.g. inside a worker thread)."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def trace_generator(gen, trace):
+    """
+    Drive `gen` with `trace` active while it runs and return its return value.
+
+    The trace is set and reset around every resume, so it works even when each next()
+    runs on a different thread (Starlette's iterate_in_threadpool). Spans inside the
+    generator must therefore not be held open across a yield.
+    """
+    while True:
+        with activate(trace):
+            try:
+                item = next(gen)
+            except StopIteration as e:
+                return e.value
+        yield item
@@ -0,0 +1,128 @@
+"""
+Staged startup for the API servers.
+
+Heavy modules (LLM SDKs, pandas, FAISS, the embedding model) are imported and loaded by
+a background thread, so lightweight routes like /market_prices and /time_series_price
+answer as soon as the server is up. Routes that need a resource call warmup.get(name),
+which raises NotReadyError (served as 503) until that resource has loaded. /healthz and
+/readyz report the state of every resource.
+"""
+import importlib
+import threading
+import time
+from collections import OrderedDict
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class NotReadyError(Exception):
+    """Raised when a route needs a resource that is still loading (or failed to load)."""
+
+    def __init__(self, name, state, error=None):
+        super().__init__(f"{name} is {state}" + (f": {error}" if error else ""))
+        self.name = name
+        self.state = state
+
+
+class Resource:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.seconds = None
+
+    def to_dict(self):
+        return {"state": self.state, "seconds": self.seconds, "error": self.error}
+
+
+class Warmup:
+    """Loads registered resources, in registration order, on one background thread."""
+
+    def __init__(self):
+        self._resources = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.started_at = time.time()
+
+    def register(self, name, loader):
+        self._resources[name] = Resource(name, loader)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for resource in self._resources.values():
+            with self._cond:
+                resource.state = LOADING
+            started = time.perf_counter()
+            try:
+                value = resource.loader()
+            except Exception as e:
+                print(f"❌ Failed to load {resource.name}: {e}")
+                with self._cond:
+                    resource.state, resource.error = FAILED, str(e)
+            else:
+                with self._cond:
+                    resource.state, resource.value = READY, value
+                print(f"✅ {resource.name} ready in {time.perf_counter() - started:.1f}s")
+            with self._cond:
+                resource.seconds = round(time.perf_counter() - started, 3)
+                self._cond.notify_all()
+
+    def get(self, name, timeout=0):
+        """
+        The loaded value of resource `name`. Waits up to `timeout` seconds (None waits until it
+        has loaded or failed) and raises NotReadyError if it isn't ready by then.
+        """
+        resource = self._resources[name]
+        with self._cond:
+            if timeout != 0:
+                self._cond.wait_for(lambda: resource.state in (READY, FAILED), timeout)
+            if resource.state != READY:
+                raise NotReadyError(name, resource.state, resource.error)
+            return resource.value
+
+    def is_ready(self, name=None):
+        names = [name] if name else list(self._resources)
+        with self._cond:
+            return all(self._resources[n].state == READY for n in names)
+
+    def status(self):
+        with self._cond:
+            return {
+                "ready": all(resource.state == READY for resource in self._resources.values()),
+                "uptime_seconds": round(time.time() - self.started_at, 3),
+                "resources": {name: resource.to_dict() for name, resource in self._resources.items()},
+            }
+
+
+def _load_similarity_search():
+    similarity_search = importlib.import_module("similarity_search")
+    similarity_search.load_resources()
+    return similarity_search
+
+
+def _load_financial_screener():
+    financial_screener = importlib.import_module("financial_screener")
+    financial_screener.screening_table()
+    return financial_screener
+
+
+warmup = Warmup()
+# Only needs numpy and company_financials.json, so /screen is up well before the agents
+warmup.register("financial_screener", _load_financial_screener)
+# Conversations and the master agent only need the agents module, so it goes first
+warmup.register("agents", lambda: importlib.import_module("agents"))
+# Stock agent date ranges are snapped to these; without warmup the first stock question reads the price CSVs
+warmup.register("trading_days", lambda: importlib.import_module("date_ranges").get_trading_days())
+warmup.register("news_pipeline", lambda: importlib.import_module("news_pipeline"))
+warmup.register("similarity_search", _load_similarity_search)